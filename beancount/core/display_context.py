@@ -153,6 +153,16 @@ class _CurrencyContext:
         integer_digits = len(num_tuple.digits) + num_tuple.exponent
         self.integer_max = max(self.integer_max, integer_digits)
 
+    def update_from(self, other):
+        """Update the context with the numbers accumulated in another one.
+
+        Args:
+          other: Another _CurrencyContext instance.
+        """
+        self.has_sign = self.has_sign or other.has_sign
+        self.integer_max = max(self.integer_max, other.integer_max)
+        self.fractional_dist.update_from(other.fractional_dist)
+
     def get_fractional(self, precision):
         """
         Returns:
@@ -201,6 +211,16 @@ class DisplayContext:
         """
         self.ccontexts[currency].update(number)
 
+    def update_from(self, other):
+        """Update the builder with the numbers accumulated in another one.
+
+        Args:
+          other: Another DisplayContext instance, e.g. built from another part
+            of the input.
+        """
+        for currency, ccontext in other.ccontexts.items():
+            self.ccontexts[currency].update_from(ccontext)
+
     def quantize(self, number, currency, precision=Precision.MOST_COMMON):
         """Quantize the given number to the given precision.
 
@@ -56,6 +56,19 @@ class TestDisplayContext(DisplayContextBaseTest):
         dcontext.update(Decimal('7'), 'HOOL')
         self.assertRegex(str(dcontext), 'sign=')
 
+    def test_update_from(self):
+        numbers = [('1.234', 'USD'), ('-100.2', 'USD'), ('7', 'HOOL'), ('1.23', 'USD')]
+        expected = display_context.DisplayContext()
+        for number, currency in numbers:
+            expected.update(Decimal(number), currency)
+
+        dcontext = display_context.DisplayContext()
+        other = display_context.DisplayContext()
+        for index, (number, currency) in enumerate(numbers):
+            (dcontext if index % 2 else other).update(Decimal(number), currency)
+        dcontext.update_from(other)
+        self.assertEqual(str(expected), str(dcontext))
+
 
 class TestDisplayContextNatural(DisplayContextBaseTest):
 
@@ -26,6 +26,20 @@ class TestDistribution(unittest.TestCase):
         self.assertEqual(4, dist.max())
         self.assertEqual(False, dist.empty())
 
+    def test_update_from(self):
+        dist = distribution.Distribution()
+        dist.update(1)
+        dist.update(3)
+        other = distribution.Distribution()
+        other.update(2)
+        other.update(2)
+        dist.update_from(other)
+        self.assertEqual(2, dist.mode())
+        self.assertEqual(1, dist.min())
+        self.assertEqual(3, dist.max())
+        dist.update_from(distribution.Distribution())
+        self.assertEqual({1: 1, 2: 2, 3: 1}, dist.hist)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -36,7 +36,9 @@ specific date. You do these conversions using the reduce() method:
 __copyright__ = "Copyright (C) 2013-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
 import collections
+import datetime
 from collections.abc import Iterable
 from decimal import Decimal
 import enum
@@ -68,12 +70,102 @@ class MatchResult(enum.Enum):
     IGNORED = 4
 
 
+def _lot_order(cost):
+    """Return the key by which the lots held at cost are ordered.
+
+    Args:
+      cost: An instance of Cost.
+    Returns:
+      The date of the cost. Costs without a date are ordered first.
+    """
+    return cost.date or datetime.date.min
+
+
+class _CurrencyLots:
+    """An index of the positions of an inventory in a single currency.
+
+    Attributes:
+      num_signs: A list of the number of positions with negative units, and of
+        those with positive units.
+      costs: A dict of cost currency to a pair of lists, of the dates and of
+        the Cost instances of the positions held at cost, ordered by date.
+      sequence: A dict of the Cost instances of the positions held at cost to
+        an integer increasing with the order of the positions in the inventory.
+      next_sequence: An integer, the sequence number of the next new position.
+    """
+    __slots__ = ('num_signs', 'costs', 'sequence', 'next_sequence')
+
+    def __init__(self):
+        self.num_signs = [0, 0]
+        self.costs = {}
+        self.sequence = {}
+        self.next_sequence = 0
+
+    def copy(self):
+        """Return a copy of this index, which can be updated independently."""
+        new_lots = _CurrencyLots()
+        new_lots.num_signs = list(self.num_signs)
+        new_lots.costs = {cost_currency: (dates[:], costs[:])
+                          for cost_currency, (dates, costs) in self.costs.items()}
+        new_lots.sequence = self.sequence.copy()
+        new_lots.next_sequence = self.next_sequence
+        return new_lots
+
+    def is_empty(self):
+        """Return true if this index holds no position."""
+        return not any(self.num_signs)
+
+    def add(self, number, cost):
+        """Index a new position.
+
+        Args:
+          number: A Decimal, the non-zero number of units of the position.
+          cost: An instance of Cost, or None.
+        """
+        self.num_signs[number >= ZERO] += 1
+        if cost is not None:
+            dates, costs = self.costs.setdefault(cost.currency, ([], []))
+            date = _lot_order(cost)
+            index = bisect.bisect_right(dates, date)
+            dates.insert(index, date)
+            costs.insert(index, cost)
+            # New positions are inserted at the end of the inventory.
+            self.sequence[cost] = self.next_sequence
+            self.next_sequence += 1
+
+    def remove(self, number, cost):
+        """Remove an indexed position.
+
+        Args:
+          number: A Decimal, the number of units the position was indexed with.
+          cost: An instance of Cost, or None.
+        """
+        self.num_signs[number >= ZERO] -= 1
+        if cost is not None:
+            dates, costs = self.costs[cost.currency]
+            index = costs.index(cost, bisect.bisect_left(dates, _lot_order(cost)))
+            del dates[index]
+            del costs[index]
+            del self.sequence[cost]
+            if not costs:
+                del self.costs[cost.currency]
+
+
 # FIXME: You should disallow __getitem__, __delitem__ and __setitem__.
 # Move the dict inside the container.
 class Inventory(dict):
     """An Inventory is a set of positions, indexed for efficiency.
+
+    The positions are also indexed by currency, with their lots held at cost
+    ordered by date, for the lookups of the booking. This index is built on its
+    first use and maintained by the methods which add to the inventory; it is
+    discarded, to be rebuilt, if the inventory is modified through the methods
+    of dict.
     """
 
+    # A dict of currency to _CurrencyLots instances, or None if not built yet.
+    _lots = None
+
     def __init__(self, positions=None):
         """Create a new inventory using a list of existing positions.
 
@@ -94,6 +186,44 @@ class Inventory(dict):
         """Iterate over the positions. Note that there is no guaranteed order."""
         return iter(self.values())
 
+    # The methods of dict which modify the positions discard the index of lots.
+
+    def __setitem__(self, key, position):
+        self._lots = None
+        dict.__setitem__(self, key, position)
+
+    def __delitem__(self, key):
+        self._lots = None
+        dict.__delitem__(self, key)
+
+    def __ior__(self, other):
+        self._lots = None
+        return dict.__ior__(self, other)
+
+    def pop(self, *args):
+        self._lots = None
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._lots = None
+        return dict.popitem(self)
+
+    def clear(self):
+        self._lots = None
+        dict.clear(self)
+
+    def setdefault(self, *args):
+        self._lots = None
+        return dict.setdefault(self, *args)
+
+    def update(self, *args, **kwargs):
+        self._lots = None
+        dict.update(self, *args, **kwargs)
+
+    def __getstate__(self):
+        # Don't serialize the index; it gets rebuilt if needed.
+        return None
+
     def __lt__(self, other):
         """Inequality comparison operator."""
         return sorted(self) < sorted(other)
@@ -141,7 +271,11 @@ class Inventory(dict):
         Returns:
           An instance of Inventory, equal to this one.
         """
-        return Inventory(self)
+        new_inventory = Inventory(self)
+        if self._lots is not None:
+            new_inventory._lots = {currency: currency_lots.copy()
+                                   for currency, currency_lots in self._lots.items()}
+        return new_inventory
 
     def is_small(self, tolerances):
         """Return true if all the positions in the inventory are small.
@@ -188,12 +322,9 @@ class Inventory(dict):
         """
         if ramount.number == ZERO:
             return False
-        for position in self:
-            units = position.units
-            if (ramount.currency == units.currency and
-                not same_sign(ramount.number, units.number)):
-                return True
-        return False
+        currency_lots = self._get_lots().get(ramount.currency)
+        return (currency_lots is not None and
+                currency_lots.num_signs[ramount.number < ZERO] > 0)
 
     def __neg__(self):
         """Return an inventory with the negative of values of this one.
@@ -284,6 +415,53 @@ class Inventory(dict):
                 total_units += position.units.number
         return Amount(total_units, currency)
 
+    def get_lots(self, currency, cost_currency=None, date=None):
+        """Return the positions held at cost in a currency.
+
+        Args:
+          currency: A string, the currency of the units.
+          cost_currency: A string, the currency of the cost, or None for all.
+          date: A datetime.date, the date of the cost, or None for all.
+        Returns:
+          A list of Position instances, in the order of the inventory.
+        """
+        currency_lots = self._get_lots().get(currency)
+        if currency_lots is None:
+            return []
+        if cost_currency is None:
+            lots_lists = list(currency_lots.costs.values())
+        elif cost_currency in currency_lots.costs:
+            lots_lists = [currency_lots.costs[cost_currency]]
+        else:
+            return []
+        costs = []
+        for dates, lot_costs in lots_lists:
+            if date is None:
+                costs.extend(lot_costs)
+            else:
+                begin = bisect.bisect_left(dates, date)
+                costs.extend(lot_costs[begin:bisect.bisect_right(dates, date, begin)])
+        # The lots are indexed by date for the lookups; return them in the
+        # order of the inventory, which the booking methods depend on.
+        costs.sort(key=currency_lots.sequence.__getitem__)
+        return [self[(currency, cost)] for cost in costs]
+
+    def _get_lots(self):
+        """Return the index of the positions, building it if needed.
+
+        Returns:
+          A dict of currency to _CurrencyLots instances.
+        """
+        lots = self._lots
+        if lots is None:
+            lots = self._lots = {}
+            for (currency, cost), position in self.items():
+                currency_lots = lots.get(currency)
+                if currency_lots is None:
+                    currency_lots = lots[currency] = _CurrencyLots()
+                currency_lots.add(position.units.number, cost)
+        return lots
+
     # TODO(blais): Remove this, use split() below instead when needed.
     def segregate_units(self, currencies):
         """Split up the list of positions to the given currencies.
@@ -422,20 +600,45 @@ class Inventory(dict):
             number = pos.units.number + units.number
             if number == ZERO:
                 # If empty, delete the position.
-                del self[key]
+                dict.__delitem__(self, key)
+                if self._lots is not None:
+                    self._unindex(pos.units.number, units.currency, cost)
             else:
                 # Otherwise update it.
-                self[key] = Position(Amount(number, units.currency), cost)
+                dict.__setitem__(self, key, Position(Amount(number, units.currency), cost))
+                if (self._lots is not None and
+                    (number >= ZERO) != (pos.units.number >= ZERO)):
+                    num_signs = self._lots[units.currency].num_signs
+                    num_signs[number >= ZERO] += 1
+                    num_signs[number < ZERO] -= 1
         else:
             # If not found, create a new one.
             if units.number == ZERO:
                 booking = MatchResult.IGNORED
             else:
-                self[key] = Position(units, cost)
+                dict.__setitem__(self, key, Position(units, cost))
                 booking = MatchResult.CREATED
+                if self._lots is not None:
+                    currency_lots = self._lots.get(units.currency)
+                    if currency_lots is None:
+                        currency_lots = self._lots[units.currency] = _CurrencyLots()
+                    currency_lots.add(units.number, cost)
 
         return pos, booking
 
+    def _unindex(self, number, currency, cost):
+        """Remove a deleted position from the index.
+
+        Args:
+          number: A Decimal, the number of units of the position.
+          currency: A string, the currency of the units.
+          cost: An instance of Cost, or None.
+        """
+        currency_lots = self._lots[currency]
+        currency_lots.remove(number, cost)
+        if currency_lots.is_empty():
+            del self._lots[currency]
+
     def add_position(self, position):
         """Add using a position (with strict lot matching).
         Return True if this position was booked against and reduced another.
@@ -510,6 +713,175 @@ class Inventory(dict):
 from_string = Inventory.from_string
 
 
+class OverlayInventory:
+    """A tentative inventory, recording changes on top of a base inventory.
+
+    The base inventory is shared and never modified; only the positions added
+    to the overlay are stored, so creating and updating it costs in proportion
+    to the changes, not to the size of the base. This supports the subset of
+    the methods of Inventory used to book reductions.
+    """
+
+    def __init__(self, base):
+        """Create an overlay over an inventory.
+
+        Args:
+          base: An instance of Inventory, which must not be modified for the
+            lifetime of this overlay.
+        """
+        self.base = base
+        self.changes = Inventory()
+
+    def add_amount(self, units, cost=None):
+        """Add to this inventory using amount and cost.
+
+        Args:
+          units: An Amount instance to add.
+          cost: An instance of Cost or None, as a key to the inventory.
+        """
+        self.changes.add_amount(units, cost)
+
+    def add_position(self, position):
+        """Add using a position.
+
+        Args:
+          position: The Posting or Position to add to this inventory.
+        """
+        self.changes.add_amount(position.units, position.cost)
+
+    def _get_position(self, key, base_position):
+        """Compute the position at a key of the inventory.
+
+        Args:
+          key: A (currency, cost) pair, a key of the inventory.
+          base_position: The Position of the base inventory at the key, or None.
+        Returns:
+          A Position instance, or None if there is none at this key.
+        """
+        change = self.changes.get(key)
+        if change is None:
+            return base_position
+        if base_position is None:
+            return change
+        number = base_position.units.number + change.units.number
+        if number == ZERO:
+            return None
+        return Position(Amount(number, change.units.currency), change.cost)
+
+    def is_reduced_by(self, ramount):
+        """Return true if the amount could reduce this inventory.
+
+        Args:
+          ramount: An instance of Amount.
+        Returns:
+          A boolean.
+        """
+        if self.changes.is_empty():
+            return self.base.is_reduced_by(ramount)
+        if ramount.number == ZERO:
+            return False
+        # Count the positions of the base of the opposite sign, and correct the
+        # count for those which were changed.
+        reducing = ramount.number < ZERO
+        currency_lots = self.base._get_lots().get(ramount.currency)
+        count = currency_lots.num_signs[reducing] if currency_lots else 0
+        for key in self.changes.keys():
+            if key[0] != ramount.currency:
+                continue
+            base_position = self.base.get(key)
+            if (base_position is not None and
+                (base_position.units.number >= ZERO) == reducing):
+                count -= 1
+            position = self._get_position(key, base_position)
+            if position is not None and (position.units.number >= ZERO) == reducing:
+                count += 1
+        return count > 0
+
+    def get_lots(self, currency, cost_currency=None, date=None):
+        """Return the positions held at cost in a currency.
+
+        Args:
+          currency: A string, the currency of the units.
+          cost_currency: A string, the currency of the cost, or None for all.
+          date: A datetime.date, the date of the cost, or None for all.
+        Returns:
+          A list of Position instances, in the order of the inventory, where
+          the positions created in the overlay follow those of the base.
+        """
+        base_lots = self.base.get_lots(currency, cost_currency, date)
+        if self.changes.is_empty():
+            return base_lots
+        lots = []
+        for base_position in base_lots:
+            position = self._get_position((currency, base_position.cost), base_position)
+            if position is not None:
+                lots.append(position)
+        # Include the lots created in the overlay.
+        for key, change in self.changes.items():
+            cost = key[1]
+            if (key[0] == currency and
+                cost is not None and
+                key not in self.base and
+                (cost_currency is None or cost.currency == cost_currency) and
+                (date is None or cost.date == date)):
+                lots.append(change)
+        return lots
+
+    def to_inventory(self):
+        """Compute the contents of the inventory.
+
+        Returns:
+          A new instance of Inventory.
+        """
+        inventory = Inventory(self.base)
+        inventory.add_inventory(self.changes)
+        return inventory
+
+    def __iter__(self):
+        """Iterate over the positions. Note that there is no guaranteed order."""
+        changes = self.changes
+        if changes.is_empty():
+            yield from self.base.values()
+            return
+        for key, base_position in self.base.items():
+            position = (self._get_position(key, base_position)
+                        if key in changes
+                        else base_position)
+            if position is not None:
+                yield position
+        for key, change in changes.items():
+            if key not in self.base:
+                yield change
+
+    def is_empty(self):
+        """Return true if the inventory is empty, that is, has no positions.
+
+        Returns:
+          A boolean.
+        """
+        # The positions of the base can only all be cancelled if they have all
+        # been changed.
+        if len(self.base) > len(self.changes):
+            return False
+        return next(iter(self), None) is None
+
+    def to_string(self, dformat=DEFAULT_FORMATTER, parens=True):
+        """Convert to a printable string; see Inventory.to_string()."""
+        fmt = '({})' if parens else '{}'
+        return fmt.format(
+            ', '.join(pos.to_string(dformat) for pos in sorted(self)))
+
+    def __str__(self):
+        """Render as a human-readable string.
+
+        Returns:
+          A string, for human consumption.
+        """
+        return self.to_string()
+
+    __repr__ = __str__
+
+
 def check_invariants(inv):
     """Check the invariants of the Inventory.
 
@@ -6,7 +6,9 @@ __license__ = "GNU GPLv2"
 
 import datetime
 import unittest
+from unittest import mock
 import copy
+import pickle
 from datetime import date
 
 from beancount.core.number import D
@@ -235,6 +237,79 @@ class TestInventory(unittest.TestCase):
         self.assertFalse(inv.is_reduced_by(A('0 HOOL')))
         self.assertTrue(inv.is_reduced_by(A('-2 HOOL')))
 
+    def test_is_reduced_by_updated(self):
+        inv = I('100 HOOL {250 USD}')
+        self.assertFalse(inv.is_reduced_by(A('2 HOOL')))
+        inv.add_amount(A('-150 HOOL'), Cost(D('250'), 'USD', None, None))
+        self.assertTrue(inv.is_reduced_by(A('2 HOOL')))
+        self.assertFalse(inv.is_reduced_by(A('-2 HOOL')))
+        inv.add_amount(A('50 HOOL'), Cost(D('250'), 'USD', None, None))
+        self.assertFalse(inv.is_reduced_by(A('2 HOOL')))
+        self.assertFalse(inv.is_reduced_by(A('-2 HOOL')))
+        inv.add_amount(A('-3 HOOL'))
+        self.assertTrue(inv.is_reduced_by(A('2 HOOL')))
+
+    def test_get_lots(self):
+        inv = Inventory()
+        lots = [
+            P('3 HOOL {12 USD, 2015-01-03}'),
+            P('1 HOOL {10 USD, 2015-01-01}'),
+            P('2 HOOL {11 CAD, 2015-01-02}'),
+            P('4 HOOL {13 USD, 2015-01-01, "lot"}'),
+            P('5 AAPL {14 USD, 2015-01-01}'),
+            P('6 HOOL'),
+        ]
+        for pos in lots:
+            inv.add_position(pos)
+        # The lots are returned in the order of the inventory, not of their dates.
+        self.assertEqual([lots[0], lots[1], lots[2], lots[3]], inv.get_lots('HOOL'))
+        self.assertEqual([lots[0], lots[1], lots[3]], inv.get_lots('HOOL', 'USD'))
+        self.assertEqual([lots[1], lots[3]],
+                         inv.get_lots('HOOL', 'USD', date(2015, 1, 1)))
+        self.assertEqual([], inv.get_lots('HOOL', 'USD', date(2015, 1, 2)))
+        self.assertEqual([], inv.get_lots('HOOL', 'EUR'))
+        self.assertEqual([], inv.get_lots('MSFT'))
+
+        # The index follows the updates and is copied along with the inventory.
+        inv2 = copy.copy(inv)
+        inv2.add_position(-lots[1])
+        inv2.add_position(P('1 HOOL {12 USD, 2015-01-03}'))
+        self.assertEqual([P('4 HOOL {12 USD, 2015-01-03}'), lots[3]],
+                         inv2.get_lots('HOOL', 'USD'))
+        inv2.add_position(lots[1])
+        self.assertEqual([P('4 HOOL {12 USD, 2015-01-03}'), lots[3], lots[1]],
+                         inv2.get_lots('HOOL', 'USD'))
+        self.assertEqual([lots[0], lots[1], lots[3]], inv.get_lots('HOOL', 'USD'))
+
+        # The index isn't serialized.
+        inv3 = pickle.loads(pickle.dumps(inv))
+        self.assertIsNone(inv3._lots)
+        self.assertEqual(inv, inv3)
+        self.assertEqual(inv.get_lots('HOOL'), inv3.get_lots('HOOL'))
+
+    def test_get_lots__dict_methods(self):
+        lot1 = P('1 HOOL {10 USD, 2015-01-01}')
+        lot2 = P('2 HOOL {11 USD, 2015-01-02}')
+        key1 = (lot1.units.currency, lot1.cost)
+        key2 = (lot2.units.currency, lot2.cost)
+        mutations = [
+            lambda inv: inv.__setitem__(key2, lot2),
+            lambda inv: inv.__delitem__(key1),
+            lambda inv: inv.__ior__({key2: lot2}),
+            lambda inv: inv.pop(key1),
+            lambda inv: inv.popitem(),
+            lambda inv: inv.clear(),
+            lambda inv: inv.setdefault(key2, lot2),
+            lambda inv: inv.update({key2: lot2}),
+        ]
+        for mutation in mutations:
+            inv = Inventory([lot1])
+            self.assertFalse(inv.is_reduced_by(A('1 HOOL')))
+            inv.get_lots('HOOL')
+            mutation(inv)
+            self.assertEqual(list(inv), inv.get_lots('HOOL'))
+            self.assertEqual(not inv.is_empty(), inv.is_reduced_by(A('-1 HOOL')))
+
     def test_op_neg(self):
         inv = Inventory()
         inv.add_amount(A('10 USD'))
@@ -524,6 +599,62 @@ class TestInventory(unittest.TestCase):
         self.assertEqual(I('100.00 USD, 101.00 CAD, 100 HOOL'), inv_units)
 
 
+class TestOverlayInventory(unittest.TestCase):
+
+    def assertSameInventory(self, expected, overlay):
+        self.assertEqual(expected, overlay.to_inventory())
+        self.assertEqual(str(expected), str(overlay))
+        self.assertEqual(sorted(expected), sorted(overlay))
+        self.assertEqual(expected.is_empty(), overlay.is_empty())
+        for number in '-1', '1':
+            for currency in 'HOOL', 'AAPL', 'USD':
+                ramount = A('{} {}'.format(number, currency))
+                self.assertEqual(expected.is_reduced_by(ramount),
+                                 overlay.is_reduced_by(ramount))
+        for args in [('HOOL',), ('HOOL', 'USD'), ('HOOL', 'CAD'),
+                     ('HOOL', 'USD', date(2015, 1, 1)), ('AAPL',)]:
+            self.assertEqual(expected.get_lots(*args), overlay.get_lots(*args))
+
+    def test_overlay(self):
+        base = I('1 HOOL {10 USD, 2015-01-01}, 2 HOOL {11 USD, 2015-01-02}, '
+                 '3 HOOL {12 CAD, 2015-01-01}, 4 AAPL {13 USD, 2015-01-03}, '
+                 '100 USD')
+        original = copy.copy(base)
+        overlay = inventory.OverlayInventory(base)
+        expected = copy.copy(base)
+        self.assertSameInventory(expected, overlay)
+
+        for pos in [P('-1 HOOL {10 USD, 2015-01-01}'),
+                    P('-1 HOOL {11 USD, 2015-01-02}'),
+                    P('-100 USD'),
+                    P('-5 AAPL {13 USD, 2015-01-03}'),
+                    P('5 HOOL {9 USD, 2014-12-31}'),
+                    P('-5 HOOL {9 USD, 2014-12-31}')]:
+            overlay.add_position(pos)
+            expected.add_position(pos)
+            self.assertSameInventory(expected, overlay)
+
+        # The base inventory is left untouched.
+        self.assertEqual(original, base)
+
+    def test_overlay_empty(self):
+        base = I('1 HOOL {10 USD, 2015-01-01}, 100 USD')
+        overlay = inventory.OverlayInventory(base)
+        expected = copy.copy(base)
+        for pos in [P('-100 USD'), P('-1 HOOL {10 USD, 2015-01-01}'),
+                    P('2 HOOL {10 USD, 2015-01-01}')]:
+            overlay.add_position(pos)
+            expected.add_position(pos)
+            self.assertSameInventory(expected, overlay)
+        self.assertTrue(inventory.OverlayInventory(Inventory()).is_empty())
+
+        # The base is not copied.
+        with mock.patch.object(inventory, 'Inventory', side_effect=AssertionError):
+            self.assertFalse(overlay.is_empty())
+            self.assertEqual(1, len(list(overlay)))
+            self.assertEqual('(2 HOOL {10 USD, 2015-01-01})', str(overlay))
+
+
 if __name__ == '__main__':
     if not hasattr(inventory, "__copyright__"):
         del TestInventory
@@ -4,32 +4,49 @@ __copyright__ = "Copyright (C) 2013-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
 from os import path
+import bisect
 import collections
+import concurrent.futures
+import contextlib
+import copy
+import datetime
 import functools
 import glob
 import hashlib
+import heapq
 import importlib
 import io
 import itertools
 import logging
+import operator
 import os
 import pickle
+import re
+import shutil
 import struct
+import sys
 import traceback
 import textwrap
 import time
 import warnings
 from typing import Optional
 
+import beancount
 from beancount.utils import misc_utils
 from beancount.core import data
+from beancount.parser import _parser
 from beancount.parser import parser
 from beancount.parser import booking
+from beancount.parser import booking_full
 from beancount.parser import options
 from beancount.parser import printer
 from beancount.ops import validation
+from beancount.utils import bisect_key
+from beancount.utils import cache_format
 from beancount.utils import encryption
 from beancount.utils import file_utils
+from beancount.utils import profiler
+from beancount.utils import shared_ledger
 
 
 LoadError = collections.namedtuple('LoadError', 'source message entry')
@@ -45,6 +62,20 @@ DEFAULT_PLUGINS_POST = [
     ("beancount.ops.balance", None),
     ]
 
+# Values of the optional '__plugins_ordering__' attribute of plugin modules,
+# which declares the order of the entries output by their functions, in order to
+# avoid sorting them fully again. ORDERING_SORTED declares that the output is
+# sorted. ORDERING_APPENDED declares that the output starts with the input
+# entries, in the same order, followed by new entries in any order.
+ORDERING_SORTED = 'sorted'
+ORDERING_APPENDED = 'appended'
+
+# Plugin modules may declare a true '__plugins_validator__' attribute, if their
+# functions only validate the entries: they return their input entries
+# unmodified, along with errors. When requested, those plugins are deferred and
+# run concurrently with the validations over the final entries; see
+# run_validations().
+
 # A mapping of modules to warn about, to their renamed names.
 RENAMED_MODULES = {}
 
@@ -52,25 +83,78 @@ RENAMED_MODULES = {}
 # Filename pattern for the pickle-cache.
 PICKLE_CACHE_FILENAME = '.{filename}.picklecache'
 
+# Filename pattern for the ledger shared across processes; see load_file_shared().
+SHARED_LEDGER_FILENAME = '.{filename}.shared'
+
 # The runtime threshold below which we don't bother creating a cache file, in
 # seconds.
 PICKLE_CACHE_THRESHOLD = 1.0
 
+# Methods of validation of the pickle-cache. CACHE_VALIDATION_MTIME invalidates
+# the cache if the modification time or size of any of the input files changes.
+# CACHE_VALIDATION_CONTENT stores a hash of the contents of each of the input
+# files in the cache and only invalidates it if those change. The files are only
+# hashed if their modification time changed, so this is just as fast when they
+# haven't, and survives operations which touch the files, e.g. a git checkout.
+CACHE_VALIDATION_MTIME = 'mtime'
+CACHE_VALIDATION_CONTENT = 'content'
+
+# Formats of the pickle-cache file. CACHE_FORMAT_PICKLE is a raw pickle of the
+# result. CACHE_FORMAT_COMPACT is the versioned format of
+# beancount.utils.cache_format, which is several times smaller and faster to
+# load, and slower to write.
+CACHE_FORMAT_PICKLE = 'pickle'
+CACHE_FORMAT_COMPACT = 'compact'
+
+# A mapping of cache file format to its pair of dump and load functions.
+_CACHE_SERIALIZERS = {
+    CACHE_FORMAT_PICKLE: (pickle.dump, pickle.load),
+    CACHE_FORMAT_COMPACT: (cache_format.dump, cache_format.load),
+}
+
+# Suffix appended to the pickle-cache filename to produce the name of the
+# directory holding the per-file parse cache.
+PARSE_CACHE_SUFFIX = '.d'
+
+# The total parsing time threshold below which we don't bother creating parse
+# cache files, in seconds.
+PARSE_CACHE_THRESHOLD = 0.5
+
+# Suffix appended to the pickle-cache filename to produce the name of the
+# directory holding the stage checkpoints.
+CHECKPOINT_SUFFIX = '.checkpoints'
+
+# The time threshold below which we don't bother writing a checkpoint after a
+# stage, in seconds. This is the time elapsed since the previous checkpoint.
+CHECKPOINT_THRESHOLD = 0.5
+
+# Stage indexes of the checkpoints. The checkpoint after the i'th plugin is
+# stored at index STAGE_PLUGINS + i.
+STAGE_PARSE = 0
+STAGE_BOOKING = 1
+STAGE_PLUGINS = 2
+
 
 def load_file(filename, log_timings=None, log_errors=None, extra_validations=None,
-              encoding=None):
+              encoding=None, parse_jobs=None, validation_jobs=None):
     """Open a Beancount input file, parse it, run transformations and validate.
 
     Args:
       filename: The name of the file to be parsed.
       log_timings: A file object or function to write timings to,
         or None, if it should remain quiet. (Note that this is intended to use
-        the logging methods and does not insert a newline.)
+        the logging methods and does not insert a newline.) This may also be a
+        profiler.Profiler instance, to record a structured profile of the stages.
       log_errors: A file object or function to write errors to,
         or None, if it should remain quiet.
       extra_validations: A list of extra validation functions to run after loading
         this list of entries.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_jobs: An integer or None, the number of processes to use for parsing
+        the included files in parallel. If None, files are parsed serially.
+      validation_jobs: An integer or None, the number of processes to use for
+        running the validator plugins and the validations concurrently. If None,
+        they are run serially, and the validator plugins in place.
     Returns:
       A triple of (entries, errors, option_map) where "entries" is a date-sorted
       list of entries from the file, "errors" a list of error objects generated
@@ -90,11 +174,92 @@ def load_file(filename, log_timings=None, log_errors=None, extra_validations=Non
     else:
         entries, errors, options_map = _load_file(
             filename, log_timings,
-            extra_validations, encoding)
+            extra_validations, encoding,
+            parse_jobs=parse_jobs, validation_jobs=validation_jobs)
         _log_errors(errors, log_errors)
     return entries, errors, options_map
 
 
+def load_file_shared(filename, shared_filename=None, log_timings=None,
+                     log_errors=None, extra_validations=None, encoding=None):
+    """Load a Beancount input file through a file shared across processes.
+
+    The first process to call this publishes the loaded ledger to the shared
+    file, and the processes calling this subsequently, e.g. the workers of a web
+    server, attach to it instead of loading the input. Processes which start
+    together wait on a lock for the first one to publish. The directives are
+    decoded lazily from the file, whose memory is shared by all the processes.
+    The shared file is published again if any of the input files changes.
+
+    Args:
+      filename: The name of the file to be parsed.
+      shared_filename: The name of the shared file, or None, to use a hidden file
+        next to the input file, as per SHARED_LEDGER_FILENAME.
+      log_timings: See load_file().
+      log_errors: See load_file().
+      extra_validations: See load_file().
+      encoding: See load_file().
+    Returns:
+      A triple of (entries, errors, option_map) as per load_file(), with
+      "entries" a read-only shared_ledger.SharedEntries sequence.
+    """
+    filename = path.expandvars(path.expanduser(filename))
+    if not path.isabs(filename):
+        filename = path.normpath(path.join(os.getcwd(), filename))
+    if encryption.is_encrypted_file(filename):
+        # Note: Sharing is not supported for encrypted files, as it would write
+        # their contents in the clear.
+        return load_file(filename, log_timings, log_errors, extra_validations,
+                         encoding)
+    if shared_filename is None:
+        shared_filename = get_cache_filename(SHARED_LEDGER_FILENAME, filename)
+
+    result = _attach_shared(shared_filename, True)
+    if result is None:
+        # Serialize the processes which failed to attach, so that only the first
+        # one loads and publishes the ledger, and the others attach to it.
+        with shared_ledger.lock(shared_filename):
+            result = _attach_shared(shared_filename, False)
+            if result is None:
+                with misc_utils.log_time('publish_shared', log_timings, indent=1):
+                    loaded_entries, errors, options_map = load_file(
+                        filename, log_timings,
+                        extra_validations=extra_validations, encoding=encoding)
+                    shared_ledger.publish(shared_filename, loaded_entries, errors,
+                                          options_map)
+                # Release the loaded copy of the entries before attaching.
+                del loaded_entries
+                result = shared_ledger.attach(shared_filename)
+
+    entries, errors, options_map = result
+    _log_errors(errors, log_errors)
+    return entries, errors, options_map
+
+
+def _attach_shared(shared_filename, log_failure):
+    """Attach to a shared ledger file, if it exists, is valid and up-to-date.
+
+    Args:
+      shared_filename: A string, the name of the shared ledger file.
+      log_failure: A boolean, true if a failure to read an existing file should
+        be logged.
+    Returns:
+      A triple of (entries, errors, options_map) as per shared_ledger.attach(),
+      or None, if the file should be published.
+    """
+    try:
+        entries, errors, options_map = shared_ledger.attach(shared_filename)
+    except (OSError, ValueError, pickle.UnpicklingError) as exc:
+        if log_failure and path.exists(shared_filename):
+            logging.warning("Could not attach to shared ledger %s: %s",
+                            shared_filename, exc)
+        return None
+    if needs_refresh(options_map):
+        entries.close()
+        return None
+    return entries, errors, options_map
+
+
 def load_encrypted_file(filename, log_timings=None, log_errors=None, extra_validations=None,
                         dedent=False, encoding=None):
     """Load an encrypted Beancount input file.
@@ -154,7 +319,9 @@ def get_cache_filename(pattern: str, filename: str) -> str:
     return abs_pattern.format(filename=path.basename(filename))
 
 
-def pickle_cache_function(cache_getter, time_threshold, function):
+def pickle_cache_function(cache_getter, time_threshold, function,
+                          validation=CACHE_VALIDATION_MTIME,
+                          file_format=CACHE_FORMAT_PICKLE):
     """Decorate a loader function to make it loads its result from a pickle cache.
 
     This considers the first argument as a top-level filename and assumes the
@@ -170,10 +337,16 @@ def pickle_cache_function(cache_getter, time_threshold, function):
       time_threshold: A float, the number of seconds below which we don't bother
         caching.
       function: A function object to decorate for caching.
+      validation: One of the CACHE_VALIDATION_* constants, the method used to
+        determine whether the input files have changed.
+      file_format: One of the CACHE_FORMAT_* constants, the format of the
+        result in the cache file.
     Returns:
       A decorated function which will pull its result from a cache file if
       it is available.
     """
+    dump, load = _CACHE_SERIALIZERS[file_format]
+
     @functools.wraps(function)
     def wrapped(toplevel_filename, *args, **kw):
         cache_filename = cache_getter(toplevel_filename)
@@ -184,7 +357,19 @@ def pickle_cache_function(cache_getter, time_threshold, function):
         if exists:
             with open(cache_filename, 'rb') as file:
                 try:
-                    result = pickle.load(file)
+                    if validation == CACHE_VALIDATION_CONTENT:
+                        # The contents of the files are checked from a header
+                        # preceding the result.
+                        header = pickle.load(file)
+                        if (not isinstance(header, dict) or
+                            files_changed(header['files'])):
+                            result = None
+                        else:
+                            result = load(file)
+                    else:
+                        result = load(file)
+                    if not isinstance(result, tuple):
+                        result = None
                 except Exception as exc:
                     # Note: Not a big fan of doing this, but here we handle all
                     # possible exceptions because unpickling of an old or
@@ -196,12 +381,22 @@ def pickle_cache_function(cache_getter, time_threshold, function):
                     result = None
 
                 else:
-                    # Check that the latest timestamp has not been written after the
-                    # cache file.
-                    entries, errors, options_map = result
-                    if not needs_refresh(options_map):
-                        # All timestamps are legit; cache hit.
-                        return result
+                    if result is not None:
+                        if validation == CACHE_VALIDATION_CONTENT:
+                            # The contents of the files are unchanged; cache
+                            # hit. Update the hash of the input, which covers
+                            # the timestamps of the files, for needs_refresh().
+                            _, _, options_map = result
+                            options_map['input_hash'] = compute_input_hash(
+                                options_map['include'])
+                            return result
+
+                        # Check that the latest timestamp has not been written
+                        # after the cache file.
+                        entries, errors, options_map = result
+                        if not needs_refresh(options_map):
+                            # All timestamps are legit; cache hit.
+                            return result
 
         # We failed; recompute the value.
         if exists:
@@ -221,7 +416,12 @@ def pickle_cache_function(cache_getter, time_threshold, function):
         if time_after - time_before > time_threshold:
             try:
                 with open(cache_filename, 'wb') as file:
-                    pickle.dump(result, file)
+                    if validation == CACHE_VALIDATION_CONTENT:
+                        _, _, options_map = result
+                        header = {'files': compute_file_signatures(
+                            options_map['include'])}
+                        pickle.dump(header, file)
+                    dump(result, file)
             except Exception as exc:
                 logging.warning("Could not write to picklecache file %s: %s",
                                 cache_filename, exc)
@@ -246,6 +446,9 @@ def delete_cache_function(cache_getter, function):
         cache_filename = cache_getter(toplevel_filename)
         if path.exists(cache_filename):
             os.remove(cache_filename)
+        for suffix in PARSE_CACHE_SUFFIX, CHECKPOINT_SUFFIX:
+            if path.isdir(cache_filename + suffix):
+                shutil.rmtree(cache_filename + suffix, ignore_errors=True)
 
         # Invoke the original function.
         return function(toplevel_filename, *args, **kw)
@@ -254,6 +457,10 @@ def delete_cache_function(cache_getter, function):
 
 def _uncached_load_file(filename, *args, **kw):
     """Delegate to _load. Note: This gets conditionally advised by caching below."""
+    if _parse_cache_getter is not None:
+        kw.setdefault('parse_cache_dirname', _parse_cache_getter(filename))
+    if _checkpoint_getter is not None:
+        kw.setdefault('checkpoint_dirname', _checkpoint_getter(filename))
     return _load([(filename, True)], *args, **kw)
 
 
@@ -272,6 +479,55 @@ def needs_refresh(options_map):
     return 'input_hash' not in options_map or input_hash != options_map['input_hash']
 
 
+def compute_file_signatures(filenames):
+    """Compute a signature of the contents of each of the given files.
+
+    Args:
+      filenames: A list of filenames.
+    Returns:
+      A dict of filename to a triple of its modification time in nanoseconds,
+      its size, and the hash of its contents. Files which don't exist are left
+      out.
+    """
+    signatures = {}
+    for filename in filenames:
+        try:
+            stat = os.stat(filename)
+            with open(filename, 'rb') as file:
+                content_hash = hashlib.md5(file.read()).hexdigest()
+        except OSError:
+            continue
+        signatures[filename] = (stat.st_mtime_ns, stat.st_size, content_hash)
+    return signatures
+
+
+def files_changed(signatures):
+    """Predicate that returns true if any of the given files has changed.
+
+    The files are only read and hashed if their modification time changed while
+    their size remained the same.
+
+    Args:
+      signatures: A dict of filename to signature, as per
+        compute_file_signatures().
+    Returns:
+      A boolean, true if the contents of any of the files may have changed.
+    """
+    for filename, (mtime_ns, size, content_hash) in signatures.items():
+        try:
+            stat = os.stat(filename)
+            if stat.st_size != size:
+                return True
+            if stat.st_mtime_ns == mtime_ns:
+                continue
+            with open(filename, 'rb') as file:
+                if hashlib.md5(file.read()).hexdigest() != content_hash:
+                    return True
+        except OSError:
+            return True
+    return False
+
+
 def compute_input_hash(filenames):
     """Compute a hash of the input data.
 
@@ -288,6 +544,331 @@ def compute_input_hash(filenames):
     return md5.hexdigest()
 
 
+@functools.lru_cache(maxsize=None)
+def get_parser_fingerprint():
+    """Compute a fingerprint of the parser's implementation.
+
+    This is mixed into the keys of the per-file parse cache so that cached
+    parser outputs get invalidated when the parser itself changes.
+
+    Returns:
+      A string, the hexadecimal hash of the parser's implementation.
+    """
+    md5 = hashlib.md5()
+    md5.update(str(_parser.SOURCE_HASH).encode('utf8'))
+    md5.update(beancount.__version__.encode('utf8'))
+    for module in (parser.grammar, options):
+        with open(module.__file__, 'rb') as file:
+            md5.update(file.read())
+    return md5.hexdigest()
+
+
+class ParseCache:
+    """An on-disk cache of the parser's output for individual source files.
+
+    The output of the parser is stored in a directory with one pickle file per
+    source filename, keyed on a hash of the contents of that file. Unchanged
+    files need not be parsed again when only some of the included files of a
+    ledger have been modified. Newly parsed files are only written out on
+    flush(), so that we don't bother creating the cache for small inputs.
+    """
+
+    def __init__(self, dirname):
+        """Create a cache stored in the given directory.
+
+        Args:
+          dirname: A string, the name of the directory holding the cache files.
+            It is created when the cache is first written to.
+        """
+        self.dirname = dirname
+        self.parse_time = 0.0
+        self.pending = []
+
+    def parse_file(self, filename, encoding=None, parse_function=None):
+        """Parse a single source file, reusing a prior parse of identical contents.
+
+        Args:
+          filename: An absolute filename, the file to be parsed.
+          encoding: A string or None, the encoding to decode the input filename with.
+          parse_function: A function used to parse the file on a cache miss, with
+            the same signature as parser.parse_file(), or None, to use the latter.
+        Returns:
+          A triple of (entries, errors, options_map), as per parser.parse_file().
+        """
+        with open(filename, 'rb') as file:
+            contents = file.read()
+
+        md5 = hashlib.md5()
+        md5.update(get_parser_fingerprint().encode('utf8'))
+        md5.update(filename.encode('utf8'))
+        md5.update(str(encoding).encode('utf8'))
+        md5.update(contents)
+        content_hash = md5.hexdigest()
+
+        cache_filename = path.join(
+            self.dirname, '{}.pickle'.format(
+                hashlib.md5(filename.encode('utf8')).hexdigest()))
+        if path.exists(cache_filename):
+            try:
+                with open(cache_filename, 'rb') as file:
+                    cached_hash, result = pickle.load(file)
+            except Exception as exc:
+                # The cache file is corrupted; ignore it and reparse.
+                logging.error("Parse cache file is corrupted: %s; reparsing.", exc)
+            else:
+                if cached_hash == content_hash:
+                    # Reproduce the side-effect the builder has when it
+                    # encounters this option.
+                    if result[2]['insert_pythonpath']:
+                        sys.path.insert(0, path.dirname(filename))
+                    return result
+
+        time_before = time.time()
+        if parse_function is None:
+            parse_function = parser.parse_file
+        result = parse_function(io.BytesIO(contents),
+                                report_filename=filename, encoding=encoding)
+        self.parse_time += time.time() - time_before
+
+        # Serialize right away, before the parsed entries get processed (and
+        # possibly mutated) by booking and the plugins.
+        self.pending.append((cache_filename,
+                             pickle.dumps((content_hash, result),
+                                          pickle.HIGHEST_PROTOCOL)))
+        return result
+
+    def merge(self, other):
+        """Take over the newly parsed files of another cache, e.g. from a worker.
+
+        Args:
+          other: A ParseCache instance for the same directory.
+        """
+        self.parse_time += other.parse_time
+        self.pending.extend(other.pending)
+
+    def flush(self, time_threshold):
+        """Write the newly parsed files to the cache.
+
+        Args:
+          time_threshold: A float, the total parsing time in seconds below
+            which we don't bother writing anything.
+        """
+        pending, self.pending = self.pending, []
+        if self.parse_time <= time_threshold:
+            return
+        for cache_filename, contents in pending:
+            # Write to a temporary file first so that a concurrent reader never
+            # sees a partial file.
+            try:
+                os.makedirs(self.dirname, exist_ok=True)
+                tmp_filename = '{}.{}.tmp'.format(cache_filename, os.getpid())
+                with open(tmp_filename, 'wb') as file:
+                    file.write(contents)
+                os.replace(tmp_filename, cache_filename)
+            except OSError as exc:
+                logging.warning("Could not write to parse cache file %s: %s",
+                                cache_filename, exc)
+
+
+def get_plugin_fingerprint(plugin_name):
+    """Compute a fingerprint of the source code of a plugin module.
+
+    Args:
+      plugin_name: A string, the name of the plugin module.
+    Returns:
+      A string, the hexadecimal hash of the module's source, or None if the
+      module cannot be imported or has no source file.
+    """
+    try:
+        module = importlib.import_module(plugin_name)
+        filename = module.__file__
+        with open(filename, 'rb') as file:
+            return hashlib.md5(file.read()).hexdigest()
+    except (ImportError, AttributeError, TypeError, OSError):
+        return None
+
+
+class StageCheckpoints:
+    """An on-disk cache of the state of the loader after each of its stages.
+
+    A checkpoint stores the (entries, errors, options_map) state after parsing,
+    after booking and after each plugin. It is keyed on a chain of hashes:
+
+    - The key of the parsing stage fingerprints the contents of the input files.
+
+    - The key of the booking stage fingerprints the same contents, but with the
+      plugin directives blanked out (their lines are preserved so that line
+      numbers in the parsed entries are accounted for). Modifying the list of
+      plugins or their configuration thus does not invalidate the booked
+      entries.
+
+    - The key of each subsequent stage combines the key of its previous stage
+      with the name and configuration of the plugin, and the source of its
+      module.
+
+    A load resumes from the last valid checkpoint and only runs the stages
+    after it. Each checkpoint file holds two consecutive pickles: a small header
+    with the key and the information necessary to recompute the keys, and the
+    state itself.
+    """
+
+    # A regular expression for the lines of plugin directives.
+    plugin_regexp = re.compile(rb'^plugin\b[^\n]*', re.MULTILINE)
+
+    def __init__(self, dirname, sources, encoding, time_threshold):
+        """Create a set of checkpoints stored in the given directory.
+
+        Args:
+          dirname: A string, the name of the directory holding the checkpoints.
+            It is created when the first checkpoint is written.
+          sources: The list of sources being loaded; see _load(). The first one
+            must be a filename.
+          encoding: A string or None, the encoding of the input files.
+          time_threshold: A float, the number of seconds since the previous
+            checkpoint below which we don't bother writing a new one.
+        """
+        assert sources and sources[0][1], "Checkpoints require a top-level filename."
+        self.dirname = dirname
+        self.toplevel_filename = path.normpath(sources[0][0])
+        self.time_threshold = time_threshold
+        md5 = hashlib.md5()
+        md5.update(get_parser_fingerprint().encode('utf8'))
+        md5.update(repr((sources, encoding)).encode('utf8'))
+        self.sources_hash = md5.hexdigest()
+        self.header = None
+        self.keys = None
+        self.last_time = time.time()
+
+    def get_filename(self, stage):
+        """Return the filename of the checkpoint for a given stage."""
+        return path.join(self.dirname, 'stage-{:03d}.pickle'.format(stage))
+
+    def compute_keys(self, include, plugin_processing_mode):
+        """Compute the keys of all the stages for the current input.
+
+        Args:
+          include: A list of the filenames of the input files.
+          plugin_processing_mode: The value of the option of the same name.
+        Returns:
+          A pair of a list of strings, the key of each stage by stage index, and
+          the list of (plugin-name, plugin-config) pairs of the plugin
+          directives in the top-level file.
+        """
+        parse_md5 = hashlib.md5(self.sources_hash.encode('utf8'))
+        booking_md5 = hashlib.md5(self.sources_hash.encode('utf8'))
+        plugin_lines = []
+        for filename in include:
+            parse_md5.update(filename.encode('utf8'))
+            booking_md5.update(filename.encode('utf8'))
+            try:
+                with open(filename, 'rb') as file:
+                    contents = file.read()
+            except OSError:
+                continue
+            parse_md5.update(contents)
+            booking_md5.update(self.plugin_regexp.sub(b'', contents))
+            if filename == self.toplevel_filename:
+                plugin_lines = self.plugin_regexp.findall(contents)
+        booking_md5.update(b'booking')
+
+        # Parse the plugin directives on their own.
+        raw_plugins = (parser.parse_string(b'\n'.join(plugin_lines))[2]['plugin']
+                       if plugin_lines else [])
+        plugins = get_plugins({'plugin': raw_plugins,
+                               'plugin_processing_mode': plugin_processing_mode})
+
+        keys = [parse_md5.hexdigest(), booking_md5.hexdigest()]
+        for plugin_name, plugin_config in plugins:
+            md5 = hashlib.md5(keys[-1].encode('utf8'))
+            md5.update(repr((plugin_name, plugin_config,
+                             get_plugin_fingerprint(plugin_name))).encode('utf8'))
+            keys.append(md5.hexdigest())
+        return keys, raw_plugins
+
+    def resume(self):
+        """Find and read the last valid checkpoint.
+
+        Returns:
+          A pair of the stage index and (entries, errors, options_map) triple of
+          the last valid checkpoint, or None, if there is none.
+        """
+        if not path.isdir(self.dirname):
+            return None
+        keys = raw_plugins = None
+        for filename in sorted(os.listdir(self.dirname), reverse=True):
+            match = re.match(r'stage-(\d+)\.pickle$', filename)
+            if not match:
+                continue
+            stage = int(match.group(1))
+            try:
+                with open(path.join(self.dirname, filename), 'rb') as file:
+                    header = pickle.load(file)
+                    if keys is None:
+                        # Reproduce the side-effect the builder has when it
+                        # encounters this option, which may be needed to
+                        # import the plugins.
+                        if header.get('insert_pythonpath'):
+                            sys.path.insert(0, path.dirname(self.toplevel_filename))
+                        keys, raw_plugins = self.compute_keys(
+                            header['include'], header['plugin_processing_mode'])
+                    if stage >= len(keys) or keys[stage] != header['key']:
+                        continue
+                    entries, errors, options_map = pickle.load(file)
+            except Exception as exc:
+                # The checkpoint is corrupted; ignore it.
+                logging.error("Checkpoint file is corrupted: %s; ignoring.", exc)
+                continue
+
+            # The plugin directives may have changed since the checkpoint.
+            options_map['plugin'] = raw_plugins
+            self.header = {'include': header['include'],
+                           'plugin_processing_mode': header['plugin_processing_mode'],
+                           'insert_pythonpath': header.get('insert_pythonpath')}
+            self.keys = keys
+            self.last_time = time.time()
+            return stage, (entries, errors, options_map)
+        return None
+
+    def save(self, stage, entries, errors, options_map):
+        """Write a checkpoint for a stage, if enough time elapsed since the last.
+
+        Args:
+          stage: An integer, the index of the stage that just completed.
+          entries: A list of directives, the state after the stage.
+          errors: A list of errors, the accumulated errors after the stage.
+          options_map: An options dict, the state after the stage.
+        """
+        # Compute the keys from the state after parsing.
+        if self.keys is None:
+            self.header = {'include': options_map['include'],
+                           'plugin_processing_mode': options_map['plugin_processing_mode'],
+                           'insert_pythonpath': options_map['insert_pythonpath']}
+            self.keys, raw_plugins = self.compute_keys(
+                self.header['include'], self.header['plugin_processing_mode'])
+            if raw_plugins != options_map['plugin']:
+                # The plugin directives could not be extracted reliably; don't
+                # write any checkpoints for this input.
+                self.keys = []
+        if stage >= len(self.keys):
+            return
+        if time.time() - self.last_time <= self.time_threshold:
+            return
+
+        filename = self.get_filename(stage)
+        try:
+            os.makedirs(self.dirname, exist_ok=True)
+            tmp_filename = '{}.{}.tmp'.format(filename, os.getpid())
+            with open(tmp_filename, 'wb') as file:
+                pickle.dump(dict(self.header, key=self.keys[stage]), file,
+                            pickle.HIGHEST_PROTOCOL)
+                pickle.dump((entries, errors, options_map), file,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_filename, filename)
+        except Exception as exc:
+            logging.warning("Could not write checkpoint file %s: %s", filename, exc)
+        self.last_time = time.time()
+
+
 def load_string(string, log_timings=None, log_errors=None, extra_validations=None,
                 dedent=False, encoding=None):
 
@@ -317,7 +898,98 @@ def load_string(string, log_timings=None, log_errors=None, extra_validations=Non
     return entries, errors, options_map
 
 
-def _parse_recursive(sources, log_timings, encoding=None):
+def load_file_iter(filename, extra_validations=None, encoding=None):
+    """Open a Beancount input file and stream its processed directives.
+
+    This is a bounded-memory alternative to load_file(), for batch jobs which
+    process the directives in a single pass. The input files are parsed and
+    sorted individually, and their directives are merged, booked, transformed
+    by the plugins and validated one at a time as the returned iterator is
+    consumed, without accumulating them in a list. Only the parsed directives
+    remaining to be merged in are held in memory.
+
+    Plugins and validations are streamed if they are streaming-capable, that
+    is, if the plugin module declares generator functions in a
+    '__streaming_plugins__' attribute, or if the validation function has a
+    validator in validation.VALIDATORS. The others are run on the list of all
+    the directives that reach them, which defeats the purpose.
+
+    The directives output are the same as those of load_file(), with the
+    following caveats: Errors are appended as the directives are processed,
+    and thus ordered differently. Checks which rely on Open directives only
+    consider those which occur before the directive being checked, which only
+    matters for invalid inputs. Errors raised by streaming plugins propagate to
+    the caller. There is no caching.
+
+    Args:
+      filename: The name of the file to be parsed.
+      extra_validations: A list of extra validation functions to run after
+        loading this list of entries.
+      encoding: A string or None, the encoding to decode the input filename with.
+    Returns:
+      A triple of (entries, errors, options_map) where "entries" is an iterator
+      of the processed directives, in sorted order, "errors" a list of the
+      errors, which is only complete once the iterator has been exhausted, and
+      "options_map", a dict of the options parsed from the file.
+    """
+    filename = path.expandvars(path.expanduser(filename))
+    if not path.isabs(filename):
+        filename = path.normpath(path.join(os.getcwd(), filename))
+
+    entries, errors, options_map = _parse_recursive([(filename, True)], None, encoding)
+    options_map['input_hash'] = compute_input_hash(options_map['include'])
+
+    # Sort the entries of each input file separately and merge them. The
+    # entries of each file are contiguous in the parser's output.
+    runs = [list(file_entries)
+            for _, file_entries in itertools.groupby(
+                entries, key=lambda entry: entry.meta.get('filename'))]
+    del entries
+    for run in runs:
+        run.sort(key=data.entry_sortkey)
+    entries_iter = heapq.merge(*map(_consume_list, runs), key=data.entry_sortkey)
+    del runs
+
+    entries_iter = booking.book_iter(entries_iter, options_map, errors)
+    entries_iter = run_transformations_iter(entries_iter, options_map, errors)
+    entries_iter = validation.validate_iter(entries_iter, options_map, errors,
+                                            extra_validations)
+    return entries_iter, errors, options_map
+
+
+def _consume_list(elements):
+    """Iterate over a list, removing the elements from it as they go.
+
+    Args:
+      elements: A list.
+    Yields:
+      The elements of the list, in order.
+    """
+    elements.reverse()
+    while elements:
+        yield elements.pop()
+
+
+def _parse_file(filename, encoding, parse_cache_dirname):
+    """Parse a single file from disk. This may run in a worker process.
+
+    Args:
+      filename: An absolute filename, the file to be parsed.
+      encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache_dirname: A string or None, the name of the directory of the
+        per-file parse cache.
+    Returns:
+      A pair of the (entries, errors, options_map) triple from the parser and
+      the ParseCache object used to parse it, or None, if caching is disabled.
+    """
+    if parse_cache_dirname is None:
+        return parser.parse_file(filename, encoding=encoding), None
+    parse_cache = ParseCache(parse_cache_dirname)
+    return parse_cache.parse_file(filename, encoding), parse_cache
+
+
+def _parse_recursive(sources, log_timings, encoding=None, parse_cache=None,
+                     parse_jobs=None):
     """Parse Beancount input, run its transformations and validate it.
 
     Recursively parse a list of files or strings and their include files and
@@ -325,6 +997,12 @@ def _parse_recursive(sources, log_timings, encoding=None):
     options-map. If the same file is being parsed twice, ignore it and issue an
     error.
 
+    Sources are processed one generation at a time: the include files
+    discovered while processing a generation make up the next one. This is
+    equivalent to processing all the sources through a FIFO queue, but allows
+    the files of a generation to be parsed in parallel. The results are always
+    merged in queue order, so the output does not depend on parallelism.
+
     Args:
       sources: A list of (filename-or-string, is-filename) where the first
         element is a string, with either a filename or a string to be parsed directly,
@@ -333,6 +1011,14 @@ def _parse_recursive(sources, log_timings, encoding=None):
         paths.
       log_timings: A function to write timings to, or None, if it should remain quiet.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache: An object with a parse_file(filename, encoding) method used to
+        parse individual files, e.g. a ParseCache, or None, if files should
+        always be parsed directly.
+      parse_jobs: An integer or None, the number of processes to use for parsing
+        the files of a generation concurrently. If None or 1, all the files are
+        parsed in this process. Only a ParseCache is used in worker processes.
+        A file parsed alone, e.g. a single large top-level file, is split into
+        chunks parsed concurrently instead; see parser.parse_file_chunked().
     Returns:
       A tuple of (entries, parse_errors, options_map).
     """
@@ -342,106 +1028,179 @@ def _parse_recursive(sources, log_timings, encoding=None):
     entries, parse_errors = [], []
     options_map = None
 
-    # A stack of sources to be parsed.
+    # The current generation of sources to be parsed.
     source_stack = list(sources)
 
     # A list of absolute filenames that have been parsed in the past, used to
     # detect and avoid duplicates (cycles).
     filenames_seen = set()
 
-    with misc_utils.log_time('beancount.parser.parser', log_timings, indent=1):
-        while source_stack:
-            source, is_file = source_stack.pop(0)
-            is_top_level = options_map is None
-
-            # If the file is encrypted, read it in and process it as a string.
-            if is_file:
-                cwd = path.dirname(source)
-                source_filename = source
-                if encryption.is_encrypted_file(source):
-                    source = encryption.read_encrypted_file(source)
-                    is_file = False
-            else:
-                # If we're parsing a string, the CWD is the current process
-                # working directory.
-                cwd = os.getcwd()
-                source_filename = None
-
-            if is_file:
-                # All filenames here must be absolute.
-                assert path.isabs(source)
-                filename = path.normpath(source)
-
-                # Check for file previously parsed... detect duplicates.
-                if filename in filenames_seen:
-                    parse_errors.append(
-                        LoadError(data.new_metadata("<load>", 0),
-                                  'Duplicate filename parsed: "{}"'.format(filename),
-                                  None))
-                    continue
+    parse_cache_dirname = (parse_cache.dirname
+                           if isinstance(parse_cache, ParseCache)
+                           else None)
 
-                # Check for a file that does not exist.
-                if not path.exists(filename):
-                    parse_errors.append(
-                        LoadError(data.new_metadata("<load>", 0),
-                                  'File "{}" does not exist'.format(filename), None))
-                    continue
+    parallel = (parse_jobs is not None and parse_jobs > 1 and
+                (parse_cache is None or parse_cache_dirname is not None))
 
-                # Parse a file from disk directly.
-                filenames_seen.add(filename)
-                with misc_utils.log_time('beancount.parser.parser.parse_file',
-                                         log_timings, indent=2):
-                    (src_entries,
-                     src_errors,
-                     src_options_map) = parser.parse_file(filename, encoding=encoding)
+    with contextlib.ExitStack() as stack, misc_utils.log_time(
+            'beancount.parser.parser', log_timings, indent=1):
+        executor = None
+        def get_executor():
+            nonlocal executor
+            if executor is None:
+                executor = stack.enter_context(
+                    concurrent.futures.ProcessPoolExecutor(max_workers=parse_jobs))
+            return executor
 
-                cwd = path.dirname(filename)
-            else:
-                # Encode the contents if necessary.
-                if encoding:
-                    if isinstance(source, bytes):
-                        source = source.decode(encoding)
-                    source = source.encode('ascii', 'replace')
-
-                # Parse a string buffer from memory.
-                with misc_utils.log_time('beancount.parser.parser.parse_string',
-                                         log_timings, indent=2):
-                    (src_entries,
-                     src_errors,
-                     src_options_map) = parser.parse_string(source, source_filename)
-
-            # Merge the entries resulting from the parsed file.
-            entries.extend(src_entries)
-            parse_errors.extend(src_errors)
-
-            # We need the options from the very top file only (the very
-            # first file being processed). No merging of options should
-            # occur.
-            if is_top_level:
-                options_map = src_options_map
-            else:
-                aggregate_options_map(options_map, src_options_map)
-
-            # Add includes to the list of sources to process. chdir() for glob,
-            # which uses it indirectly.
-            include_expanded = []
-            with file_utils.chdir(cwd):
-                for include_filename in src_options_map['include']:
-                    matched_filenames = glob.glob(include_filename, recursive=True)
-                    if matched_filenames:
-                        include_expanded.extend(matched_filenames)
-                    else:
-                        parse_errors.append(
+        while source_stack:
+            # Resolve the sources of this generation in order, issuing errors
+            # for duplicate and missing files in place.
+            generation = []
+            for source, is_file in source_stack:
+                # If the file is encrypted, read it in and process it as a string.
+                if is_file:
+                    cwd = path.dirname(source)
+                    source_filename = source
+                    if encryption.is_encrypted_file(source):
+                        source = encryption.read_encrypted_file(source)
+                        is_file = False
+                else:
+                    # If we're parsing a string, the CWD is the current process
+                    # working directory.
+                    cwd = os.getcwd()
+                    source_filename = None
+
+                if is_file:
+                    # All filenames here must be absolute.
+                    assert path.isabs(source)
+                    filename = path.normpath(source)
+
+                    # Check for file previously parsed... detect duplicates.
+                    if filename in filenames_seen:
+                        generation.append(
                             LoadError(data.new_metadata("<load>", 0),
-                                      'File glob "{}" does not match any files'.format(
-                                          include_filename), None))
-            for include_filename in include_expanded:
-                if not path.isabs(include_filename):
-                    include_filename = path.join(cwd, include_filename)
-                include_filename = path.normpath(include_filename)
+                                      'Duplicate filename parsed: "{}"'.format(filename),
+                                      None))
+                        continue
 
-                # Add the include filenames to be processed later.
-                source_stack.append((include_filename, True))
+                    # Check for a file that does not exist.
+                    if not path.exists(filename):
+                        generation.append(
+                            LoadError(data.new_metadata("<load>", 0),
+                                      'File "{}" does not exist'.format(filename), None))
+                        continue
+
+                    filenames_seen.add(filename)
+                    source = filename
+                generation.append((source, is_file, source_filename, cwd))
+            source_stack = []
+
+            # Parse the files of the generation concurrently, if requested and
+            # if there is more than a single one.
+            parsed_files = {}
+            filenames = [item[0] for item in generation
+                         if not isinstance(item, LoadError) and item[1]]
+            if parallel and len(filenames) > 1:
+                with misc_utils.log_time('beancount.parser.parser.parse_file (parallel)',
+                                         log_timings, indent=2):
+                    parsed_files = dict(zip(filenames, get_executor().map(
+                        _parse_file, filenames,
+                        itertools.repeat(encoding),
+                        itertools.repeat(parse_cache_dirname))))
+
+            # Merge the results in order.
+            for item in generation:
+                if isinstance(item, LoadError):
+                    parse_errors.append(item)
+                    continue
+                source, is_file, source_filename, cwd = item
+                is_top_level = options_map is None
+
+                if is_file:
+                    filename = source
+                    if filename in parsed_files:
+                        ((src_entries,
+                          src_errors,
+                          src_options_map),
+                         worker_parse_cache) = parsed_files.pop(filename)
+                        if parse_cache is not None:
+                            parse_cache.merge(worker_parse_cache)
+                        # Reproduce the side-effect the builder has in the
+                        # worker process.
+                        if src_options_map['insert_pythonpath']:
+                            sys.path.insert(0, path.dirname(filename))
+                    else:
+                        # Parse a file from disk directly, in concurrent chunks
+                        # if requested.
+                        parse_function = parser.parse_file
+                        if parallel:
+                            parse_function = functools.partial(
+                                parser.parse_file_chunked,
+                                num_chunks=parse_jobs, executor=get_executor())
+                        with misc_utils.log_time('beancount.parser.parser.parse_file',
+                                                 log_timings, indent=2):
+                            if parse_cache is not None and parallel:
+                                (src_entries,
+                                 src_errors,
+                                 src_options_map) = parse_cache.parse_file(
+                                     filename, encoding, parse_function)
+                            elif parse_cache is not None:
+                                (src_entries,
+                                 src_errors,
+                                 src_options_map) = parse_cache.parse_file(filename,
+                                                                           encoding)
+                            else:
+                                (src_entries,
+                                 src_errors,
+                                 src_options_map) = parse_function(filename,
+                                                                   encoding=encoding)
+                    cwd = path.dirname(filename)
+                else:
+                    # Encode the contents if necessary.
+                    if encoding:
+                        if isinstance(source, bytes):
+                            source = source.decode(encoding)
+                        source = source.encode('ascii', 'replace')
+
+                    # Parse a string buffer from memory.
+                    with misc_utils.log_time('beancount.parser.parser.parse_string',
+                                             log_timings, indent=2):
+                        (src_entries,
+                         src_errors,
+                         src_options_map) = parser.parse_string(source, source_filename)
+
+                # Merge the entries resulting from the parsed file.
+                entries.extend(src_entries)
+                parse_errors.extend(src_errors)
+
+                # We need the options from the very top file only (the very
+                # first file being processed). No merging of options should
+                # occur.
+                if is_top_level:
+                    options_map = src_options_map
+                else:
+                    aggregate_options_map(options_map, src_options_map)
+
+                # Add includes to the list of sources to process. chdir() for glob,
+                # which uses it indirectly.
+                include_expanded = []
+                with file_utils.chdir(cwd):
+                    for include_filename in src_options_map['include']:
+                        matched_filenames = glob.glob(include_filename, recursive=True)
+                        if matched_filenames:
+                            include_expanded.extend(matched_filenames)
+                        else:
+                            parse_errors.append(
+                                LoadError(data.new_metadata("<load>", 0),
+                                          'File glob "{}" does not match any files'.format(
+                                              include_filename), None))
+                for include_filename in include_expanded:
+                    if not path.isabs(include_filename):
+                        include_filename = path.join(cwd, include_filename)
+                    include_filename = path.normpath(include_filename)
+
+                    # Add the include filenames to be processed later.
+                    source_stack.append((include_filename, True))
 
     # Make sure we have at least a dict of valid options.
     if options_map is None:
@@ -467,7 +1226,8 @@ def aggregate_options_map(options_map, src_options_map):
             op_currencies.append(currency)
 
 
-def _load(sources, log_timings, extra_validations, encoding):
+def _load(sources, log_timings, extra_validations, encoding, parse_cache_dirname=None,
+          parse_jobs=None, checkpoint_dirname=None, validation_jobs=None):
     """Parse Beancount input, run its transformations and validate it.
 
     (This is an internal method.)
@@ -487,6 +1247,16 @@ def _load(sources, log_timings, extra_validations, encoding):
       extra_validations: A list of extra validation functions to run after loading
         this list of entries.
       encoding: A string or None, the encoding to decode the input filename with.
+      parse_cache_dirname: A string or None, the name of a directory in which to
+        cache the parsed contents of individual files.
+      parse_jobs: An integer or None, the number of processes to use for parsing
+        the included files in parallel.
+      checkpoint_dirname: A string or None, the name of a directory in which to
+        store the state after each stage, in order to resume from it.
+      validation_jobs: An integer or None, the number of processes to use for
+        running the validator plugins and the validations concurrently. This is
+        ignored if checkpoints are stored, as the checkpoints of the plugins
+        must include the errors of the validator plugins.
     Returns:
       See load() or load_string().
     """
@@ -495,27 +1265,63 @@ def _load(sources, log_timings, extra_validations, encoding):
     if hasattr(log_timings, 'write'):
         log_timings = log_timings.write
 
+    # Resume from the last valid checkpoint, if there is one.
+    checkpoints = None
+    stage = None
+    if checkpoint_dirname is not None:
+        checkpoints = StageCheckpoints(checkpoint_dirname, sources, encoding,
+                                       CHECKPOINT_THRESHOLD)
+        with misc_utils.log_time('resume', log_timings, indent=1):
+            resumed = checkpoints.resume()
+        if resumed is not None:
+            stage, (entries, parse_errors, options_map) = resumed
+
     # Parse all the files recursively. Ensure that the entries are sorted before
     # running any processes on them.
-    with misc_utils.log_time('parse', log_timings, indent=1):
-        entries, parse_errors, options_map = _parse_recursive(
-            sources, log_timings, encoding)
-        entries.sort(key=data.entry_sortkey)
+    if stage is None:
+        with profiler.log_stage('parse', log_timings, indent=1) as prof_stage:
+            parse_cache = ParseCache(parse_cache_dirname) if parse_cache_dirname else None
+            entries, parse_errors, options_map = _parse_recursive(
+                sources, log_timings, encoding, parse_cache, parse_jobs)
+            if parse_cache is not None:
+                parse_cache.flush(PARSE_CACHE_THRESHOLD)
+            entries.sort(key=data.entry_sortkey)
+            prof_stage.set_output(entries)
+        if checkpoints is not None:
+            checkpoints.save(STAGE_PARSE, entries, parse_errors, options_map)
 
     # Run interpolation on incomplete entries.
-    with misc_utils.log_time('booking', log_timings, indent=1):
-        entries, balance_errors = booking.book(entries, options_map)
-        parse_errors.extend(balance_errors)
-
-    # Transform the entries.
-    with misc_utils.log_time('run_transformations', log_timings, indent=1):
+    if stage is None or stage < STAGE_BOOKING:
+        with profiler.log_stage('booking', log_timings, indent=1,
+                                entries=entries) as prof_stage:
+            entries, balance_errors = booking.book(entries, options_map)
+            parse_errors.extend(balance_errors)
+            prof_stage.set_output(entries)
+        if checkpoints is not None:
+            checkpoints.save(STAGE_BOOKING, entries, parse_errors, options_map)
+
+    # Transform the entries, deferring the validator plugins if the validations
+    # are to be run concurrently.
+    validator_plugins = (None
+                         if validation_jobs is None or checkpoints is not None
+                         else [])
+    with profiler.log_stage('run_transformations', log_timings, indent=1,
+                            entries=entries) as prof_stage:
+        num_applied = 0 if stage is None else max(0, stage + 1 - STAGE_PLUGINS)
         entries, errors = run_transformations(entries, parse_errors, options_map,
-                                              log_timings)
+                                              log_timings, checkpoints, num_applied,
+                                              validator_plugins)
+        prof_stage.set_output(entries)
 
     # Validate the list of entries.
-    with misc_utils.log_time('beancount.ops.validate', log_timings, indent=1):
-        valid_errors = validation.validate(entries, options_map, log_timings,
-                                           extra_validations)
+    with profiler.log_stage('beancount.ops.validate', log_timings, indent=1,
+                            entries=entries):
+        if validator_plugins is None:
+            valid_errors = validation.validate(entries, options_map, log_timings,
+                                               extra_validations)
+        else:
+            valid_errors = run_validations(entries, options_map, validator_plugins,
+                                           extra_validations, validation_jobs)
         errors.extend(valid_errors)
 
         # Note: We could go hardcore here and further verify that the entries
@@ -528,7 +1334,285 @@ def _load(sources, log_timings, extra_validations, encoding):
     return entries, errors, options_map
 
 
-def run_transformations(entries, parse_errors, options_map, log_timings):
+class IncrementalLoader:
+    """A loader that keeps its intermediate state to reload a file incrementally.
+
+    This is intended for long-running processes, e.g. an interactive shell or a
+    web application, which need to reload the same file after it has been
+    edited. On the first call, load() does the same work as load_file(). On
+    subsequent calls, it:
+
+    - Only reparses the input files which have changed; the parsed contents of
+      the other files are kept in memory.
+
+    - Finds the earliest date at which the sorted parsed entries differ from
+      those of the previous load and only books the entries from that date on,
+      reusing the previously booked entries and their balances before it.
+
+    - Runs the plugins and the validations over the entire list of entries
+      again. Plugins may operate on all the entries and offer no way to be
+      applied to a subset of them.
+
+    The output is the same as that of load_file() on the same input. Note that
+    this relies on plugins not modifying the input entries in-place.
+    """
+
+    # Options which do not affect parsing nor booking.
+    VOLATILE_OPTIONS = ('dcontext', 'filename', 'include', 'input_hash', 'plugin')
+
+    def __init__(self, filename, log_timings=None, log_errors=None,
+                 extra_validations=None, encoding=None, parse_jobs=None):
+        """Create a loader for a file. Nothing is loaded until load() is called.
+
+        Args:
+          filename: See load_file().
+          log_timings: See load_file().
+          log_errors: See load_file().
+          extra_validations: See load_file().
+          encoding: See load_file().
+          parse_jobs: An integer or None, the number of processes to parse each
+            modified file with, in concurrent chunks; see
+            parser.parse_file_chunked().
+        """
+        filename = path.expandvars(path.expanduser(filename))
+        if not path.isabs(filename):
+            filename = path.normpath(path.join(os.getcwd(), filename))
+        self.filename = filename
+        if hasattr(log_timings, 'write'):
+            log_timings = log_timings.write
+        self.log_timings = log_timings
+        self.log_errors = log_errors
+        self.extra_validations = extra_validations
+        self.encoding = encoding
+        self.parse_jobs = parse_jobs
+
+        # A mapping of filename to a triple of (stat-key, contents-hash,
+        # parser-output) for each of the parsed files.
+        self.parsed_files = {}
+
+        # An on-disk cache to parse files through, if enabled.
+        self.parse_cache = None
+
+        # The state of the previous load: the sorted parsed entries, the options
+        # relevant to booking, the booked entries and the booking errors, which
+        # are kept separate from those about incomplete elements.
+        self.parsed_entries = None
+        self.booking_options = None
+        self.booked_entries = None
+        self.booking_errors = None
+        self.missing_errors = None
+
+    def parse_file(self, filename, encoding):
+        """Parse a file, reusing its previous parse if it has not changed.
+
+        Args:
+          filename: An absolute filename, the file to be parsed.
+          encoding: A string or None, the encoding to decode the input filename with.
+        Returns:
+          A triple of (entries, errors, options_map), as per parser.parse_file().
+        """
+        stat = os.stat(filename)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        cached = self.parsed_files.get(filename)
+        if cached is not None and cached[0] == stat_key:
+            result = cached[2]
+        else:
+            with open(filename, 'rb') as file:
+                contents = file.read()
+            content_hash = hashlib.md5(contents).hexdigest()
+            parse_function = parser.parse_file
+            if self.parse_jobs is not None and self.parse_jobs > 1:
+                parse_function = functools.partial(parser.parse_file_chunked,
+                                                   num_chunks=self.parse_jobs)
+            if cached is not None and cached[1] == content_hash:
+                result = cached[2]
+            elif self.parse_cache is not None:
+                result = self.parse_cache.parse_file(filename, encoding, parse_function)
+            else:
+                result = parse_function(io.BytesIO(contents),
+                                        report_filename=filename, encoding=encoding)
+            self.parsed_files[filename] = (stat_key, content_hash, result)
+
+        # Return a copy of the options, which get modified during the load.
+        entries, errors, options_map = result
+        return entries, errors, copy.deepcopy(options_map)
+
+    def load(self):
+        """Load the file, incrementally if it had been loaded before.
+
+        Returns:
+          A triple of (entries, errors, options_map); see load_file().
+        """
+        log_timings = self.log_timings
+
+        with profiler.log_stage('parse', log_timings, indent=1) as prof_stage:
+            self.parse_cache = (ParseCache(_parse_cache_getter(self.filename))
+                                if _parse_cache_getter is not None
+                                else None)
+            entries, parse_errors, options_map = _parse_recursive(
+                [(self.filename, True)], log_timings, self.encoding, self)
+            if self.parse_cache is not None:
+                self.parse_cache.flush(PARSE_CACHE_THRESHOLD)
+                self.parse_cache = None
+            entries.sort(key=data.entry_sortkey)
+            prof_stage.set_output(entries)
+
+            # Forget about the files which aren't included anymore.
+            for filename in set(self.parsed_files) - set(options_map['include']):
+                del self.parsed_files[filename]
+
+        with profiler.log_stage('booking', log_timings, indent=1,
+                                entries=entries) as prof_stage:
+            booked_entries, booking_errors = self._book(entries, options_map)
+            parse_errors.extend(booking_errors)
+            prof_stage.set_output(booked_entries)
+
+        # Transform the entries. Copy the list, which the plugins may modify.
+        with profiler.log_stage('run_transformations', log_timings, indent=1,
+                                entries=booked_entries) as prof_stage:
+            entries, errors = run_transformations(list(booked_entries), parse_errors,
+                                                  options_map, log_timings)
+            prof_stage.set_output(entries)
+
+        # Validate the list of entries.
+        with profiler.log_stage('beancount.ops.validate', log_timings, indent=1,
+                                entries=entries):
+            valid_errors = validation.validate(entries, options_map, log_timings,
+                                               self.extra_validations)
+            errors.extend(valid_errors)
+
+        options_map['input_hash'] = compute_input_hash(options_map['include'])
+
+        _log_errors(errors, self.log_errors)
+        return entries, errors, options_map
+
+    def _book(self, entries, options_map):
+        """Book the parsed entries, reusing the previous booking where possible.
+
+        Args:
+          entries: A sorted list of the parsed directives.
+          options_map: The options dict from parsing.
+        Returns:
+          A pair of the list of booked entries and the list of booking errors.
+        """
+        booking_options = {key: value
+                           for key, value in options_map.items()
+                           if key not in self.VOLATILE_OPTIONS}
+        resume_date = self._get_resume_date(entries, booking_options)
+
+        if resume_date is None:
+            prefix_booked = []
+            prefix_booking_errors = []
+            prefix_missing_errors = []
+            suffix_entries = entries
+        else:
+            key = lambda entry: entry.date
+            prefix_booked = self.booked_entries[
+                :bisect_key.bisect_left_with_key(self.booked_entries, resume_date, key)]
+            prefix_booking_errors = [error for error, date in self.booking_errors
+                                     if date < resume_date]
+            prefix_missing_errors = [error for error in self.missing_errors
+                                     if error.entry.date < resume_date]
+            suffix_entries = entries[
+                bisect_key.bisect_left_with_key(entries, resume_date, key):]
+
+        # Book the entries from the resume date on, starting from the balances
+        # resulting from the prior ones.
+        methods = booking.get_booking_methods(entries, options_map)
+        balances = booking.compute_booked_balances(prefix_booked)
+        suffix_booked, suffix_booking_errors = booking_full.book(
+            suffix_entries, options_map, methods, balances)
+        suffix_missing_errors = booking.validate_missing_eliminated(suffix_booked,
+                                                                    options_map)
+
+        # Save the state for the next load. Attach the date of the erroneous
+        # parsed entries to the booking errors, to be able to resume after them.
+        error_dates = self._get_error_dates(suffix_entries, suffix_booking_errors)
+        self.parsed_entries = entries
+        self.booking_options = booking_options
+        self.booked_entries = prefix_booked + suffix_booked
+        self.booking_errors = (prefix_booking_errors +
+                               list(zip(suffix_booking_errors, error_dates)))
+        self.missing_errors = prefix_missing_errors + suffix_missing_errors
+
+        return (self.booked_entries,
+                (prefix_booking_errors + suffix_booking_errors +
+                 self.missing_errors))
+
+    def _get_resume_date(self, entries, booking_options):
+        """Find the date from which the entries need to be booked again.
+
+        Args:
+          entries: A sorted list of the parsed directives.
+          booking_options: A dict of the options relevant to booking.
+        Returns:
+          A date before which the parsed entries are unchanged from the previous
+          load, datetime.date.max if all are unchanged, or None, if everything
+          needs to be booked again.
+        """
+        if self.parsed_entries is None or booking_options != self.booking_options:
+            return None
+        if any(date is None for _, date in self.booking_errors):
+            return None
+        for previous, current in zip(self.parsed_entries, entries):
+            if previous is not current and previous != current:
+                return min(previous.date, current.date)
+        num_previous, num_current = len(self.parsed_entries), len(entries)
+        if num_previous < num_current:
+            return entries[num_previous].date
+        elif num_current < num_previous:
+            return self.parsed_entries[num_current].date
+        return datetime.date.max
+
+    @staticmethod
+    def _get_error_dates(entries, errors):
+        """Find the date of the parsed entry each booking error originates from.
+
+        Args:
+          entries: A list of parsed directives.
+          errors: A list of booking errors about some of these directives.
+        Returns:
+          A list of dates or None, if the source of an error is unknown, one for
+          each error.
+        """
+        if not errors:
+            return []
+        dates = {}
+        for entry in entries:
+            meta = entry.meta
+            dates[(meta.get('filename'), meta.get('lineno'))] = entry.date
+            if isinstance(entry, data.Transaction):
+                for posting in entry.postings:
+                    if posting.meta:
+                        dates[(posting.meta.get('filename'),
+                               posting.meta.get('lineno'))] = entry.date
+        return [dates.get((error.source.get('filename'), error.source.get('lineno')))
+                if isinstance(error.source, dict) else None
+                for error in errors]
+
+
+def get_plugins(options_map):
+    """Get the list of plugins to run, according to the plugin processing mode.
+
+    Args:
+      options_map: An options dict as read from the parser.
+    Returns:
+      A list of (plugin-name, plugin-config) pairs, in the order to run them.
+    """
+    if options_map['plugin_processing_mode'] == 'raw':
+        plugins_iter = options_map["plugin"]
+    elif options_map['plugin_processing_mode'] == 'default':
+        plugins_iter = itertools.chain(DEFAULT_PLUGINS_PRE,
+                                       options_map["plugin"],
+                                       DEFAULT_PLUGINS_POST)
+    else:
+        assert "Invalid value for plugin_processing_mode: {}".format(
+            options_map['plugin_processing_mode'])
+    return list(plugins_iter)
+
+
+def run_transformations(entries, parse_errors, options_map, log_timings,
+                        checkpoints=None, num_applied=0, validator_plugins=None):
     """Run the various transformations on the entries.
 
     This is where entries are being synthesized, checked, plugins are run, etc.
@@ -539,6 +1623,13 @@ def run_transformations(entries, parse_errors, options_map, log_timings):
       options_map: An options dict as read from the parser.
       log_timings: A function to write timing log entries to, or None, if it
         should be quiet.
+      checkpoints: A StageCheckpoints instance to save the state to after each
+        plugin, or None.
+      num_applied: An integer, the number of plugins which have already been
+        applied to the input entries, e.g. when resuming from a checkpoint.
+      validator_plugins: A list to append the (plugin-name, plugin-config) pairs
+        of the validator plugins to, instead of applying them, or None, if they
+        should be applied in place. See run_validations().
     Returns:
       A list of modified entries, and a list of errors, also possibly modified.
     """
@@ -546,78 +1637,315 @@ def run_transformations(entries, parse_errors, options_map, log_timings):
     errors = list(parse_errors)
 
     # Process the plugins.
-    if options_map['plugin_processing_mode'] == 'raw':
-        plugins_iter = options_map["plugin"]
-    elif options_map['plugin_processing_mode'] == 'default':
-        plugins_iter = itertools.chain(DEFAULT_PLUGINS_PRE,
-                                       options_map["plugin"],
-                                       DEFAULT_PLUGINS_POST)
+    plugins = get_plugins(options_map)
+    for index, (plugin_name, plugin_config) in enumerate(plugins):
+        if index < num_applied:
+            continue
+
+        plugin_name, module = _import_plugin(plugin_name, errors)
+        if (module is not None and validator_plugins is not None and
+            getattr(module, '__plugins_validator__', False)):
+            validator_plugins.append((plugin_name, plugin_config))
+        elif module is not None:
+            # Apply it.
+            with profiler.log_stage(plugin_name, log_timings, indent=2,
+                                    entries=entries) as prof_stage:
+                entries = _apply_plugin(module, plugin_name, plugin_config,
+                                        entries, options_map, errors)
+                prof_stage.set_output(entries)
+
+        if checkpoints is not None:
+            checkpoints.save(STAGE_PLUGINS + index, entries, errors, options_map)
+
+    return entries, errors
+
+
+# The entries and options map of the ledger validated in a worker process,
+# inherited from the parent process. See run_validations().
+_validation_state = None
+
+
+def run_validations(entries, options_map, validator_plugins, extra_validations=None,
+                    jobs=None):
+    """Run validator plugins and the validations concurrently over the entries.
+
+    Each of the validator plugins and the validations, all together, is a task
+    run in a process pool. The worker processes are forked, so that they
+    inherit the entries rather than have them serialized; the tasks are run
+    serially in this process where forking isn't supported. The errors are
+    independent of the order in which the tasks complete.
+
+    Args:
+      entries: A list of directives, as output by the plugins.
+      options_map: An options dict as read from the parser.
+      validator_plugins: A list of (plugin-name, plugin-config) pairs of the
+        validator plugins whose application was deferred by run_transformations().
+      extra_validations: A list of extra validation functions to run after loading
+        this list of entries.
+      jobs: An integer or None, the number of processes to use.
+    Returns:
+      A list of errors: those of each of the validator plugins, in order,
+      followed by those of the validations.
+    """
+    import multiprocessing  # Slow to import; only needed when validating concurrently.
+
+    tasks = ([(_apply_validator_plugin, plugin_name, plugin_config)
+              for plugin_name, plugin_config in validator_plugins] +
+             [(validation.validate, None, extra_validations)])
+
+    if (jobs is None or jobs <= 1 or
+        'fork' not in multiprocessing.get_all_start_methods()):
+        results = [function(entries, options_map, *args)
+                   for function, *args in tasks]
     else:
-        assert "Invalid value for plugin_processing_mode: {}".format(
-            options_map['plugin_processing_mode'])
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(jobs, len(tasks)),
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_validation_worker,
+                initargs=(entries, options_map)) as executor:
+            futures = [executor.submit(_run_validation_task, *task) for task in tasks]
+            results = [future.result() for future in futures]
+
+    return [error for task_errors in results for error in task_errors]
+
+
+def _init_validation_worker(entries, options_map):
+    """Initialize a worker process of run_validations().
+
+    Args:
+      entries: A list of directives.
+      options_map: An options dict as read from the parser.
+    """
+    global _validation_state
+    _validation_state = (entries, options_map)
+
 
-    for plugin_name, plugin_config in plugins_iter:
+def _run_validation_task(function, *args):
+    """Run a validation task in a worker process, over the inherited entries.
 
-        # Issue a warning on a renamed module.
-        renamed_name = RENAMED_MODULES.get(plugin_name, None)
-        if renamed_name:
-            warnings.warn("Deprecation notice: Module '{}' has been renamed to '{}'; "
-                          "please adjust your plugin directive.".format(
-                              plugin_name, renamed_name))
-            plugin_name = renamed_name
+    Args:
+      function: A function of (entries, options_map, *args) returning a list
+        of errors.
+      *args: The extra arguments of the function.
+    Returns:
+      The list of errors.
+    """
+    entries, options_map = _validation_state
+    return function(entries, options_map, *args)
+
+
+def _apply_validator_plugin(entries, options_map, plugin_name, plugin_config):
+    """Apply a validator plugin and return its errors.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options dict as read from the parser.
+      plugin_name: A string, the name of the plugin module.
+      plugin_config: The configuration of the plugin, or None.
+    Returns:
+      A list of the errors of the plugin.
+    """
+    errors = []
+    plugin_name, module = _import_plugin(plugin_name, errors)
+    _apply_plugin(module, plugin_name, plugin_config, entries, options_map, errors)
+    return errors
+
+
+def run_transformations_iter(entries, options_map, errors):
+    """Run the plugins on a stream of entries.
+
+    Plugin modules which declare generator functions of (entries, options_map,
+    errors[, config]) in a '__streaming_plugins__' attribute are run on the
+    stream itself. The others are run on the list of all the entries reaching
+    them, as in run_transformations().
+
+    Args:
+      entries: An iterable of sorted directives.
+      options_map: An options dict as read from the parser.
+      errors: A list of errors to extend with the errors of the plugins.
+    Returns:
+      An iterator of the transformed directives.
+    """
+    for plugin_name, plugin_config in get_plugins(options_map):
+        plugin_name, module = _import_plugin(plugin_name, errors)
+        if module is None:
+            continue
+
+        streaming_functions = getattr(module, '__streaming_plugins__', None)
+        if streaming_functions is None:
+            entries = _apply_plugin_iter(module, plugin_name, plugin_config,
+                                         entries, options_map, errors)
+            continue
 
-        # Try to import the module.
-        #
-        # Note: We intercept import errors and continue but let other plugin
-        # import time exceptions fail a run, by choice.
+        args = () if plugin_config is None else (plugin_config,)
+        for function_name in streaming_functions:
+            callback = (getattr(module, function_name)
+                        if isinstance(function_name, str)
+                        else function_name)
+            entries = callback(entries, options_map, errors, *args)
+
+    return iter(entries)
+
+
+def _apply_plugin_iter(module, plugin_name, plugin_config, entries, options_map,
+                       errors):
+    """Run a plugin which isn't streaming-capable on a stream of entries.
+
+    Args:
+      module: The plugin module object.
+      plugin_name: A string, the name of the plugin module.
+      plugin_config: The configuration of the plugin, or None.
+      entries: An iterable of sorted directives.
+      options_map: An options dict as read from the parser.
+      errors: A list of errors to extend with the plugin's errors.
+    Yields:
+      The directives output by the plugin.
+    """
+    entries = _apply_plugin(module, plugin_name, plugin_config,
+                            list(entries), options_map, errors)
+    yield from _consume_list(entries)
+
+
+def _import_plugin(plugin_name, errors):
+    """Import the module of a plugin.
+
+    Args:
+      plugin_name: A string, the name of the plugin module.
+      errors: A list to append an error to if the module can't be imported.
+    Returns:
+      A pair of the plugin name, possibly renamed, and the module object, or
+      None, if it could not be imported or doesn't declare any plugins.
+    """
+    # Issue a warning on a renamed module.
+    renamed_name = RENAMED_MODULES.get(plugin_name, None)
+    if renamed_name:
+        warnings.warn("Deprecation notice: Module '{}' has been renamed to '{}'; "
+                      "please adjust your plugin directive.".format(
+                          plugin_name, renamed_name))
+        plugin_name = renamed_name
+
+    # Try to import the module.
+    #
+    # Note: We intercept import errors and continue but let other plugin
+    # import time exceptions fail a run, by choice.
+    try:
+        module = importlib.import_module(plugin_name)
+        if not hasattr(module, '__plugins__'):
+            return plugin_name, None
+    except ImportError:
+        # Upon failure, just issue an error.
+        formatted_traceback = traceback.format_exc().replace("\n", "\n  ")
+        errors.append(LoadError(data.new_metadata("<load>", 0),
+                                'Error importing "{}": {}'.format(
+                                    plugin_name, formatted_traceback), None))
+        return plugin_name, None
+    return plugin_name, module
+
+
+def _apply_plugin(module, plugin_name, plugin_config, entries, options_map, errors):
+    """Run the transformer functions of a plugin module over a list of entries.
+
+    Args:
+      module: The plugin module object.
+      plugin_name: A string, the name of the plugin module.
+      plugin_config: The configuration of the plugin, or None.
+      entries: A list of directives.
+      options_map: An options dict as read from the parser.
+      errors: A list of errors to extend with the plugin's errors.
+    Returns:
+      The sorted list of directives output by the plugin.
+    """
+    num_input = len(entries)
+
+    # Run each transformer function in the plugin.
+    for function_name in module.__plugins__:
+        if isinstance(function_name, str):
+            # Support plugin functions provided by name.
+            callback = getattr(module, function_name)
+        else:
+            # Support function types directly, not just names.
+            callback = function_name
+
+        # Provide arguments if config is provided.
+        # TODO(blais): Make this consistent in v3, not conditional.
+        args = () if plugin_config is None else (plugin_config,)
+
+        # Catch all exceptions raised in running the plugin, except exits.
         try:
-            module = importlib.import_module(plugin_name)
-            if not hasattr(module, '__plugins__'):
-                continue
-        except ImportError:
+            entries, plugin_errors = callback(entries, options_map, *args)
+            errors.extend(plugin_errors)
+        except Exception as exc:
+            # Allow the user to exit in a plugin.
+            if isinstance(exc, SystemExit):
+                raise
+
             # Upon failure, just issue an error.
             formatted_traceback = traceback.format_exc().replace("\n", "\n  ")
             errors.append(LoadError(data.new_metadata("<load>", 0),
-                                    'Error importing "{}": {}'.format(
+                                    'Error applying plugin "{}": {}'.format(
                                         plugin_name, formatted_traceback), None))
-            continue
 
-        # Apply it.
-        with misc_utils.log_time(plugin_name, log_timings, indent=2):
-            # Run each transformer function in the plugin.
-            for function_name in module.__plugins__:
-                if isinstance(function_name, str):
-                    # Support plugin functions provided by name.
-                    callback = getattr(module, function_name)
-                else:
-                    # Support function types directly, not just names.
-                    callback = function_name
+    # Ensure that the entries are sorted. Don't trust the plugins themselves,
+    # unless they declare the order of their output.
+    ordering = getattr(module, '__plugins_ordering__', None)
+    if ordering == ORDERING_APPENDED:
+        _sort_entries(entries, num_input)
+    elif ordering != ORDERING_SORTED:
+        _sort_entries(entries)
+    return entries
 
-                # Provide arguments if config is provided.
-                # TODO(blais): Make this consistent in v3, not conditional.
-                args = () if plugin_config is None else (plugin_config,)
 
-                # Catch all exceptions raised in running the plugin, except exits.
-                try:
-                    entries, plugin_errors = callback(entries, options_map, *args)
-                    errors.extend(plugin_errors)
-                except Exception as exc:
-                    # Allow the user to exit in a plugin.
-                    if isinstance(exc, SystemExit):
-                        raise
-
-                    # Upon failure, just issue an error.
-                    formatted_traceback = traceback.format_exc().replace("\n", "\n  ")
-                    errors.append(LoadError(data.new_metadata("<load>", 0),
-                                            'Error applying plugin "{}": {}'.format(
-                                                plugin_name, formatted_traceback), None))
-                    continue
+def _sort_entries(entries, num_sorted=None):
+    """Sort a list of entries in-place, in linear time if it is mostly sorted.
 
-            # Ensure that the entries are sorted. Don't trust the plugins
-            # themselves.
-            entries.sort(key=data.entry_sortkey)
+    The result is the same as that of entries.sort(key=data.entry_sortkey). The
+    entries which break the order are taken out, sorted separately and merged
+    back into the others.
 
-    return entries, errors
+    Args:
+      entries: A list of directives.
+      num_sorted: An integer, the number of entries at the front of the list
+        which are known to be in sorted order, or None, if unknown. The sort
+        keys of those are only computed as needed for merging.
+    """
+    key = data.entry_sortkey
+    if num_sorted is None:
+        keys = list(map(key, entries))
+        if all(map(operator.le, keys, itertools.islice(keys, 1, None))):
+            return
+
+        # Take the entries which break the order of the others out.
+        sorted_entries = []
+        sorted_keys = []
+        other_entries = []
+        for entry, entry_key in zip(entries, keys):
+            if sorted_keys and entry_key < sorted_keys[-1]:
+                other_entries.append((entry_key, entry))
+            else:
+                sorted_entries.append(entry)
+                sorted_keys.append(entry_key)
+        bisect_right = lambda entry_key, lo: bisect.bisect_right(sorted_keys,
+                                                                 entry_key, lo)
+    else:
+        if num_sorted >= len(entries):
+            return
+        sorted_entries = entries[:num_sorted]
+        other_entries = [(key(entry), entry) for entry in entries[num_sorted:]]
+        bisect_right = lambda entry_key, lo: bisect_key.bisect_right_with_key(
+            sorted_entries, entry_key, key, lo)
+
+    # Merge them back in. Equal entries which were taken out always come after
+    # the sorted ones in the input, so they get inserted after them.
+    other_entries.sort(key=operator.itemgetter(0))
+    merged_entries = []
+    start = 0
+    for entry_key, entry in other_entries:
+        index = bisect_right(entry_key, start)
+        merged_entries.extend(sorted_entries[start:index])
+        merged_entries.append(entry)
+        start = index
+    merged_entries.extend(sorted_entries[start:])
+    entries[:] = merged_entries
 
 
 def combine_plugins(*plugin_modules):
@@ -685,14 +2013,36 @@ def load_doc(expect_errors=False):
     return decorator
 
 
-def initialize(use_cache: bool, cache_filename: Optional[str] = None):
-    """Initialize the loader."""
+def initialize(use_cache: bool, cache_filename: Optional[str] = None,
+               use_checkpoints: Optional[bool] = None,
+               cache_validation: Optional[str] = None,
+               cache_format: Optional[str] = None):
+    """Initialize the loader.
+
+    Args:
+      use_cache: A boolean, true if the load cache should be used.
+      cache_filename: A string or None, a pattern overriding the name of the
+        cache file; see get_cache_filename().
+      use_checkpoints: A boolean or None, true if the state after each stage of
+        the loader should be saved, in order to resume from the last valid stage
+        on a cache miss. If None, this is enabled by the environment variable
+        BEANCOUNT_LOAD_CHECKPOINTS.
+      cache_validation: One of the CACHE_VALIDATION_* constants, or None, the
+        method used to determine whether the load cache is stale. If None, this
+        is taken from the environment variable BEANCOUNT_LOAD_CACHE_VALIDATION,
+        or defaults to CACHE_VALIDATION_MTIME, also used if the variable is
+        invalid.
+      cache_format: One of the CACHE_FORMAT_* constants, or None, the format of
+        the load cache file. If None, this is taken from the environment
+        variable BEANCOUNT_LOAD_CACHE_FORMAT, or defaults to CACHE_FORMAT_PICKLE,
+        also used if the variable is invalid.
+    """
 
     # Unless an environment variable disables it, use the pickle load cache
     # automatically. Note that this works across all Python programs running the
     # loader which is why it's located here.
     # pylint: disable=invalid-name
-    global _load_file
+    global _load_file, _parse_cache_getter, _checkpoint_getter
 
     # Make a function to compute the cache filename.
     cache_pattern = (cache_filename or
@@ -701,9 +2051,41 @@ def initialize(use_cache: bool, cache_filename: Optional[str] = None):
     cache_getter = functools.partial(get_cache_filename, cache_pattern)
 
     if use_cache:
+        if cache_validation is None:
+            cache_validation = os.getenv('BEANCOUNT_LOAD_CACHE_VALIDATION',
+                                         CACHE_VALIDATION_MTIME)
+            if cache_validation not in (CACHE_VALIDATION_MTIME,
+                                        CACHE_VALIDATION_CONTENT):
+                # This is called on import; don't fail on an invalid variable.
+                logging.warning("Invalid cache validation method in "
+                                "BEANCOUNT_LOAD_CACHE_VALIDATION: %s; using %s.",
+                                cache_validation, CACHE_VALIDATION_MTIME)
+                cache_validation = CACHE_VALIDATION_MTIME
+        if cache_validation not in (CACHE_VALIDATION_MTIME, CACHE_VALIDATION_CONTENT):
+            raise ValueError("Invalid cache validation method: {}".format(
+                cache_validation))
+        if cache_format is None:
+            cache_format = os.getenv('BEANCOUNT_LOAD_CACHE_FORMAT', CACHE_FORMAT_PICKLE)
+            if cache_format not in _CACHE_SERIALIZERS:
+                logging.warning("Invalid cache format in "
+                                "BEANCOUNT_LOAD_CACHE_FORMAT: %s; using %s.",
+                                cache_format, CACHE_FORMAT_PICKLE)
+                cache_format = CACHE_FORMAT_PICKLE
+        if cache_format not in _CACHE_SERIALIZERS:
+            raise ValueError("Invalid cache format: {}".format(cache_format))
         _load_file = pickle_cache_function(cache_getter, PICKLE_CACHE_THRESHOLD,
-                                           _uncached_load_file)
+                                           _uncached_load_file, cache_validation,
+                                           cache_format)
+        _parse_cache_getter = functools.partial(get_cache_filename,
+                                                cache_pattern + PARSE_CACHE_SUFFIX)
+        if use_checkpoints is None:
+            use_checkpoints = os.getenv('BEANCOUNT_LOAD_CHECKPOINTS') is not None
+        _checkpoint_getter = (functools.partial(get_cache_filename,
+                                                cache_pattern + CHECKPOINT_SUFFIX)
+                              if use_checkpoints else None)
     else:
+        _parse_cache_getter = None
+        _checkpoint_getter = None
         if cache_filename is not None:
             logging.warning("Cache disabled; "
                             "Explicitly overridden cache filename %s will be ignored.",
@@ -712,5 +2094,13 @@ def initialize(use_cache: bool, cache_filename: Optional[str] = None):
                                            _uncached_load_file)
 
 
+# A function of the top-level filename returning the name of the directory for
+# the per-file parse cache, or None, if it is disabled. Set by initialize().
+_parse_cache_getter = None
+
+# A function of the top-level filename returning the name of the directory for
+# the stage checkpoints, or None, if they are disabled. Set by initialize().
+_checkpoint_getter = None
+
 # Default is to use the cache every time.
 initialize(os.getenv('BEANCOUNT_DISABLE_LOAD_CACHE') is None)
@@ -1,18 +1,27 @@
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import contextlib
+import datetime
 import functools
 import logging
+import random
 import importlib
 import unittest
 import tempfile
 import textwrap
 import os
+import pickle
+import subprocess
+import sys
 from unittest import mock
 from os import path
 
 from beancount import loader
+from beancount.core import data
 from beancount.parser import parser
+from beancount.utils import cache_format
+from beancount.utils import shared_ledger
 from beancount.utils import test_utils
 from beancount.utils import encryption_test
 
@@ -146,6 +155,66 @@ class TestLoader(unittest.TestCase):
         self.assertFalse(errors)
 
 
+class TestSortEntries(unittest.TestCase):
+
+    def _make_entries(self, num, seed):
+        rng = random.Random(seed)
+        return [data.Note(data.new_metadata('<test>', rng.randint(0, 5)),
+                          datetime.date(2014, 1, rng.randint(1, 5)),
+                          'Assets:Checking', str(index), None, None)
+                for index in range(num)]
+
+    def test_sort_entries(self):
+        for seed in range(50):
+            entries = self._make_entries(50, seed)
+            expected = sorted(entries, key=data.entry_sortkey)
+
+            # Out of order entries in unknown places.
+            mostly_sorted = expected[5:] + entries[:5]
+            random.Random(seed).shuffle(mostly_sorted)
+            for unsorted in entries, mostly_sorted, expected[::-1]:
+                expected_unsorted = sorted(unsorted, key=data.entry_sortkey)
+                loader._sort_entries(unsorted)
+                self.assertEqual([entry.comment for entry in expected_unsorted],
+                                 [entry.comment for entry in unsorted])
+
+            # Out of order entries appended.
+            for num_sorted in 0, 10, 50:
+                appended = expected[:num_sorted] + entries[num_sorted:]
+                expected_appended = sorted(appended, key=data.entry_sortkey)
+                loader._sort_entries(appended, num_sorted)
+                self.assertEqual([entry.comment for entry in expected_appended],
+                                 [entry.comment for entry in appended])
+
+    def test_sort_entries_sorted(self):
+        entries = sorted(self._make_entries(20, 0), key=data.entry_sortkey)
+        sorted_entries = list(entries)
+        loader._sort_entries(sorted_entries)
+        self.assertEqual(entries, sorted_entries)
+
+    def test_plugins_ordering(self):
+        entries, errors, options_map = parser.parse_string(
+            'plugin "reversing"\n\n' + TEST_INPUT)
+
+        class PluginModule:
+            __plugins__ = (lambda entries, _: (entries[::-1], []),)
+        def import_module(plugin_name):
+            return (PluginModule
+                    if plugin_name == 'reversing'
+                    else real_import_module(plugin_name))
+
+        with mock.patch('importlib.import_module', import_module):
+            sorted_entries, _ = loader.run_transformations(
+                entries, errors, options_map, None)
+            self.assertEqual(entries, sorted_entries)
+
+            # Trust the plugin's declaration of the order of its output.
+            PluginModule.__plugins_ordering__ = loader.ORDERING_SORTED
+            reversed_entries, _ = loader.run_transformations(
+                entries, errors, options_map, None)
+            self.assertEqual(entries[::-1], reversed_entries)
+
+
 class TestLoadDoc(unittest.TestCase):
 
     def test_load_doc(self):
@@ -362,6 +431,179 @@ class TestLoadIncludes(unittest.TestCase):
                          list(map(path.basename, options_map['include'])))
 
 
+class TestLoadIncludesParallel(unittest.TestCase):
+
+    def test_load_file_parallel_same_as_serial(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "fruits/*.beancount"
+                  include "oranges.beancount"
+                  include "missing.beancount"
+                  include "nomatch/*.beancount"
+                  option "operating_currency" "USD"
+                  2014-01-01 open Assets:Apples
+                """,
+                'oranges.beancount': """
+                  include "apples.beancount"
+                  include "fruits/bananas.beancount"
+                  option "operating_currency" "CAD"
+                  2014-01-02 open Assets:Oranges
+                """,
+                'fruits/bananas.beancount': """
+                  include "../peaches.beancount"
+                  2014-01-03 open Assets:Bananas
+                """,
+                'fruits/lemons.beancount': """
+                  option "operating_currency" "EUR"
+                  2014-01-03 open Assets:Lemons
+                  2014-01-04 invalid
+                """,
+                'peaches.beancount': """
+                  2014-01-04 open Assets:Peaches
+                """})
+            sources = [(path.join(tmp, 'apples.beancount'), True)]
+            expected = loader._parse_recursive(sources, None)
+            with mock.patch('beancount.loader.concurrent.futures.ProcessPoolExecutor',
+                            side_effect=loader.concurrent.futures.ProcessPoolExecutor
+                            ) as executor:
+                actual = loader._parse_recursive(sources, None, parse_jobs=2)
+                executor.assert_called_once_with(max_workers=2)
+
+        # Note: The DisplayContext instance does not compare by value.
+        for options_map in expected[2], actual[2]:
+            options_map.pop('dcontext')
+        self.assertEqual(expected, actual)
+
+        entries, errors, options_map = actual
+        self.assertEqual(5, len(entries))
+        self.assertEqual(5, len(errors))
+        self.assertRegex(errors[0].message, '"missing.beancount" does not match')
+        self.assertRegex(errors[1].message, '"nomatch/.*" does not match')
+        self.assertRegex(errors[2].message, 'Invalid token')
+        self.assertRegex(errors[3].message, 'Duplicate filename.*apples')
+        self.assertRegex(errors[4].message, 'Duplicate filename.*bananas')
+        self.assertEqual(['USD', 'EUR', 'CAD'], options_map['operating_currency'])
+
+    def test_load_file_parallel(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "oranges.beancount"
+                  include "bananas.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """,
+                'bananas.beancount': """
+                  2014-01-02 open Assets:Bananas
+                """})
+            entries, errors, options_map = loader.load_file(
+                path.join(tmp, 'apples.beancount'), parse_jobs=2)
+        self.assertFalse(errors)
+        self.assertEqual(3, len(entries))
+        self.assertEqual(3, len(options_map['include']))
+
+
+    @mock.patch.object(parser, 'MIN_CHUNK_SIZE', 1)
+    @mock.patch.object(parser.os, 'cpu_count', mock.MagicMock(return_value=4))
+    def test_load_file_parallel_chunks(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  option "operating_currency" "USD"
+                  2014-01-01 open Assets:Apples
+                  2014-01-01 open Assets:Oranges
+                  pushtag #fruits
+                  2014-01-02 * "Exchange"
+                    Assets:Apples    1.00 USD
+                    Assets:Oranges
+                  poptag #fruits
+                  2014-01-03 * "Exchange"
+                    Assets:Apples    2.0 USD
+                    Assets:Oranges
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            expected = loader._load([(filename, True)], None, None, None)
+            for parse_cache_dirname in None, path.join(tmp, 'cache'):
+                with mock.patch.object(parser, 'parse_file_chunked',
+                                       wraps=parser.parse_file_chunked) as chunked:
+                    actual = loader._load([(filename, True)], None, None, None,
+                                          parse_cache_dirname, parse_jobs=3)
+                    self.assertEqual(1, chunked.call_count)
+                self.assertEqual(expected[0], actual[0])
+                self.assertEqual(expected[1], actual[1])
+                self.assertEqual({'fruits'}, actual[0][2].tags)
+
+
+class TestRunValidations(unittest.TestCase):
+
+    LEDGER = """
+      plugin "beancount.plugins.auto_accounts"
+      plugin "beancount.plugins.leafonly"
+      plugin "beancount.plugins.noduplicates"
+
+      2014-01-01 open Assets:Account1     USD
+      2014-01-01 open Assets:Account1:Sub
+
+      2014-01-02 * "Non-leaf"
+        Assets:Account1     1 CAD
+        Assets:Other
+
+      2014-01-03 * "Duplicate"
+        Assets:Account1:Sub  1 USD
+        Assets:Other
+
+      2014-01-03 * "Duplicate"
+        Assets:Account1:Sub  1 USD
+        Assets:Other
+    """
+
+    def test_run_transformations_deferred(self):
+        entries, errors, options_map = parser.parse_string(textwrap.dedent(self.LEDGER))
+        validator_plugins = []
+        new_entries, new_errors = loader.run_transformations(
+            entries, errors, options_map, None, validator_plugins=validator_plugins)
+        self.assertEqual([('beancount.plugins.leafonly', None),
+                          ('beancount.plugins.noduplicates', None)],
+                         validator_plugins)
+        self.assertFalse(new_errors)
+        self.assertTrue(any(isinstance(entry, data.Open) and
+                            entry.account == 'Assets:Other'
+                            for entry in new_entries))
+
+    def test_load_validation_jobs(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'input.beancount')
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent(self.LEDGER))
+            serial_entries, serial_errors, _ = loader._load(
+                [(filename, True)], None, None, None)
+            for validation_jobs in 1, 3:
+                entries, errors, _ = loader._load(
+                    [(filename, True)], None, None, None,
+                    validation_jobs=validation_jobs)
+                self.assertEqual(serial_entries, entries)
+                self.assertCountEqual(serial_errors, errors)
+
+                # The errors of the validator plugins come in order, before
+                # those of the validations.
+                self.assertEqual(['LeafOnlyError', 'CompareError', 'ValidationError'],
+                                 [type(error).__name__ for error in errors])
+
+    def test_run_validations(self):
+        entries, _, options_map = loader.load_string(self.LEDGER, dedent=True)
+        validator_plugins = [('beancount.plugins.noduplicates', None),
+                             ('beancount.plugins.leafonly', None)]
+        expected_errors = loader.run_validations(entries, options_map, validator_plugins)
+        self.assertEqual(['CompareError', 'LeafOnlyError', 'ValidationError'],
+                         [type(error).__name__ for error in expected_errors])
+        self.assertEqual(
+            expected_errors,
+            loader.run_validations(entries, options_map, validator_plugins, jobs=2))
+
+
 class TestLoadIncludesEncrypted(encryption_test.TestEncryptedBase):
 
     def test_include_encrypted(self):
@@ -487,6 +729,120 @@ class TestLoadCache(unittest.TestCase):
             entries, errors, options_map = loader.load_file(top_filename)
             self.assertEqual(2, self.num_calls)
 
+    def _patch_validation(self, validation, file_format=loader.CACHE_FORMAT_PICKLE):
+        cache_getter = functools.partial(loader.get_cache_filename,
+                                         loader.PICKLE_CACHE_FILENAME)
+        mock.patch('beancount.loader._load_file',
+                   loader.pickle_cache_function(cache_getter, 0, self._load_file,
+                                                validation, file_format)).start()
+
+    def _touch(self, filename):
+        stat = os.stat(filename)
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_load_cache_content_validation(self):
+        self._patch_validation(loader.CACHE_VALIDATION_CONTENT)
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "oranges.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            other_filename = path.join(tmp, 'oranges.beancount')
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(2, len(entries))
+            self.assertEqual(1, self.num_calls)
+
+            # Touch the files without changing them; the cache is being hit.
+            self._touch(top_filename)
+            self._touch(other_filename)
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertEqual(2, len(entries))
+            self.assertEqual(1, self.num_calls)
+            self.assertFalse(loader.needs_refresh(options_map))
+
+            # A cache file with a valid header but an invalid result is a miss.
+            cache_filename = path.join(tmp, '.apples.beancount.picklecache')
+            with open(cache_filename, 'wb') as file:
+                pickle.dump({'files': loader.compute_file_signatures(
+                    options_map['include'])}, file)
+                pickle.dump(['invalid'], file)
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertEqual(2, len(entries))
+            self.assertEqual(2, self.num_calls)
+
+            # Change the contents of an included file without changing its size
+            # and ensure it's a cache miss.
+            with open(other_filename, 'r+') as file:
+                contents = file.read()
+                file.seek(0)
+                file.write(contents.replace('Oranges', 'Lemonss'))
+            self._touch(other_filename)
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertEqual(3, self.num_calls)
+            self.assertEqual({'Assets:Apples', 'Assets:Lemonss'},
+                             {entry.account for entry in entries})
+
+            # Remove the included file and ensure it's a cache miss.
+            os.remove(other_filename)
+            entries, errors, options_map = loader.load_file(top_filename)
+            self.assertEqual(4, self.num_calls)
+            self.assertTrue(errors)
+
+    def test_load_cache_mtime_validation_touch(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            loader.load_file(top_filename)
+            self.assertEqual(1, self.num_calls)
+
+            # Touching the file invalidates the cache.
+            self._touch(top_filename)
+            loader.load_file(top_filename)
+            self.assertEqual(2, self.num_calls)
+
+            # A cache in the other format is ignored.
+            self._patch_validation(loader.CACHE_VALIDATION_CONTENT)
+            loader.load_file(top_filename)
+            self.assertEqual(3, self.num_calls)
+            loader.load_file(top_filename)
+            self.assertEqual(3, self.num_calls)
+
+    def test_load_cache_compact_format(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            cache_filename = path.join(tmp, '.apples.beancount.picklecache')
+            for validation in (loader.CACHE_VALIDATION_MTIME,
+                               loader.CACHE_VALIDATION_CONTENT):
+                self.num_calls = 0
+                self._patch_validation(validation, loader.CACHE_FORMAT_COMPACT)
+                with mock.patch('logging.error'):
+                    loader.load_file(top_filename)
+                self.assertEqual(1, self.num_calls)
+                with open(cache_filename, 'rb') as file:
+                    self.assertIn(cache_format.MAGIC, file.read())
+                entries, errors, options_map = loader.load_file(top_filename)
+                self.assertEqual(1, self.num_calls)
+                self.assertEqual(1, len(entries))
+
+                # A cache in another format is recomputed.
+                self._patch_validation(validation, loader.CACHE_FORMAT_PICKLE)
+                with mock.patch('logging.error'):
+                    loader.load_file(top_filename)
+                self.assertEqual(2, self.num_calls)
+
     @mock.patch('os.remove', side_effect=OSError)
     @mock.patch('logging.warning')
     def test_load_cache_read_only_fs(self, remove_mock, warn_mock):
@@ -548,6 +904,638 @@ class TestLoadCache(unittest.TestCase):
                 entries, errors, options_map = loader.load_file(filename)
                 self.assertEqual({'apples.beancount'}, set(os.listdir(tmp)))
 
+    @mock.patch.object(loader, 'load_file', loader.load_file)
+    def test_load_cache_invalid_validation(self):
+        with self.assertRaises(ValueError):
+            loader.initialize(use_cache=True, cache_validation='sha1')
+        with test_utils.environ('BEANCOUNT_LOAD_CACHE_VALIDATION', 'sha1'):
+            with mock.patch('logging.warning') as warn_mock:
+                loader.initialize(use_cache=True)
+            self.assertEqual(1, len(warn_mock.mock_calls))
+
+            # The variable is read when the module is imported.
+            subprocess.check_call([sys.executable, '-c', 'import beancount.loader'],
+                                  stderr=subprocess.DEVNULL)
+        loader.initialize(use_cache=True)
+
+    @mock.patch('beancount.loader.PICKLE_CACHE_THRESHOLD', 0.0)
+    @mock.patch.object(loader, 'load_file', loader.load_file)
+    def test_load_cache_format_by_env_var(self):
+        with self.assertRaises(ValueError):
+            loader.initialize(use_cache=True, cache_format='json')
+        with test_utils.environ('BEANCOUNT_LOAD_CACHE_FORMAT', 'json'):
+            with mock.patch('logging.warning') as warn_mock:
+                loader.initialize(use_cache=True)
+            self.assertEqual(1, len(warn_mock.mock_calls))
+            subprocess.check_call([sys.executable, '-c', 'import beancount.loader'],
+                                  stderr=subprocess.DEVNULL)
+        with test_utils.environ('BEANCOUNT_LOAD_CACHE_FORMAT', 'compact'):
+            loader.initialize(use_cache=True)
+        try:
+            with test_utils.tempdir() as tmp:
+                test_utils.create_temporary_files(tmp, {
+                    'apples.beancount': """
+                      2014-01-01 open Assets:Apples
+                    """})
+                filename = path.join(tmp, 'apples.beancount')
+                loader.load_file(filename)
+                with open(path.join(tmp, '.apples.beancount.picklecache'),
+                          'rb') as file:
+                    self.assertEqual(cache_format.MAGIC,
+                                     file.read(len(cache_format.MAGIC)))
+        finally:
+            loader.initialize(use_cache=True)
+
+
+
+class TestParseCache(unittest.TestCase):
+
+    @mock.patch('beancount.loader.PARSE_CACHE_THRESHOLD', -1.0)
+    def test_parse_cache(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "oranges.beancount"
+                  include "bananas.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """,
+                'bananas.beancount': """
+                  2014-01-02 open Assets:Bananas
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            cache_dirname = path.join(tmp, 'cache')
+
+            with mock.patch('beancount.parser.parser.parse_file',
+                            side_effect=parser.parse_file) as parse_file:
+                entries, errors, options_map = loader._load(
+                    [(top_filename, True)], None, None, None, cache_dirname)
+                self.assertFalse(errors)
+                self.assertEqual(3, len(entries))
+                self.assertEqual(3, parse_file.call_count)
+                self.assertEqual(3, len(os.listdir(cache_dirname)))
+
+                # Load again, all the files should be read from the cache.
+                parse_file.reset_mock()
+                cached_entries, errors, options_map = loader._load(
+                    [(top_filename, True)], None, None, None, cache_dirname)
+                self.assertEqual(0, parse_file.call_count)
+                self.assertEqual(entries, cached_entries)
+
+                # Modify a single file and ensure only that file gets reparsed.
+                with open(path.join(tmp, 'oranges.beancount'), 'a') as file:
+                    file.write('2014-01-03 open Assets:Peaches\n')
+                parse_file.reset_mock()
+                entries, errors, options_map = loader._load(
+                    [(top_filename, True)], None, None, None, cache_dirname)
+                self.assertFalse(errors)
+                self.assertEqual(4, len(entries))
+                self.assertEqual(1, parse_file.call_count)
+
+    def test_parse_cache_threshold(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            cache_dirname = path.join(tmp, 'cache')
+            loader._load([(top_filename, True)], None, None, None, cache_dirname)
+            self.assertFalse(path.exists(cache_dirname))
+
+    def test_parse_cache_corrupted(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            top_filename = path.join(tmp, 'apples.beancount')
+            cache_dirname = path.join(tmp, 'cache')
+            parse_cache = loader.ParseCache(cache_dirname)
+            parse_cache.parse_file(top_filename)
+            parse_cache.flush(-1.0)
+            for filename in os.listdir(cache_dirname):
+                with open(path.join(cache_dirname, filename), 'w') as file:
+                    file.write('corrupted')
+            with test_utils.capture('stderr'):
+                entries, errors, _ = loader.ParseCache(cache_dirname).parse_file(
+                    top_filename)
+            self.assertFalse(errors)
+            self.assertEqual(1, len(entries))
+
+    @mock.patch('beancount.loader.PICKLE_CACHE_THRESHOLD', 0.0)
+    @mock.patch('beancount.loader.PARSE_CACHE_THRESHOLD', -1.0)
+    @mock.patch.object(loader, 'load_file', loader.load_file)
+    def test_parse_cache_disable(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            loader.initialize(use_cache=True)
+            loader.load_file(filename)
+            self.assertEqual({'apples.beancount',
+                              '.apples.beancount.picklecache',
+                              '.apples.beancount.picklecache.d'},
+                             set(os.listdir(tmp)))
+            loader.initialize(use_cache=False)
+            loader.load_file(filename)
+            self.assertEqual({'apples.beancount'}, set(os.listdir(tmp)))
+
+
+class TestStageCheckpoints(unittest.TestCase):
+
+    INPUT = """
+      plugin "beancount.plugins.auto_accounts"
+      plugin "beancount.plugins.implicit_prices"
+
+      2014-01-01 * "Buy"
+        Assets:Account1     10 HOOL {100 USD} @ 100 USD
+        Assets:Account2
+    """
+
+    def _load(self, filename, checkpoint_dirname):
+        return loader._load([(filename, True)], None, None, None,
+                            checkpoint_dirname=checkpoint_dirname)
+
+    @mock.patch('beancount.loader.CHECKPOINT_THRESHOLD', -1.0)
+    def test_resume_all_stages(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'input.beancount')
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent(self.INPUT))
+            checkpoint_dirname = path.join(tmp, 'checkpoints')
+
+            # Load once, with all stages checkpointed.
+            entries, errors, _ = self._load(filename, checkpoint_dirname)
+            self.assertFalse(errors)
+            self.assertEqual(
+                ['stage-{:03d}.pickle'.format(index) for index in range(7)],
+                sorted(os.listdir(checkpoint_dirname)))
+
+            # Load again; everything should be resumed from the last stage.
+            with mock.patch('beancount.parser.booking.book') as book, \
+                 mock.patch('beancount.plugins.auto_accounts.auto_insert_open',
+                            side_effect=AssertionError):
+                resumed_entries, errors, _ = self._load(filename, checkpoint_dirname)
+                book.assert_not_called()
+            self.assertFalse(errors)
+            self.assertEqual(entries, resumed_entries)
+
+            # Modify the input and check that no checkpoint is valid anymore.
+            with open(filename, 'a') as file:
+                file.write('\n')
+            checkpoints = loader.StageCheckpoints(checkpoint_dirname,
+                                                  [(filename, True)], None, 0)
+            self.assertIsNone(checkpoints.resume())
+
+    @mock.patch('beancount.loader.CHECKPOINT_THRESHOLD', -1.0)
+    def test_resume_from_plugin(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'input.beancount')
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent(self.INPUT))
+            checkpoint_dirname = path.join(tmp, 'checkpoints')
+            entries, errors, _ = self._load(filename, checkpoint_dirname)
+
+            # Invalidate the checkpoints from the 'implicit_prices' plugin on,
+            # as if its configuration had changed.
+            for stage in range(5, 7):
+                os.remove(path.join(checkpoint_dirname,
+                                    'stage-{:03d}.pickle'.format(stage)))
+            with mock.patch('beancount.parser.booking.book') as book, \
+                 mock.patch('beancount.plugins.auto_accounts.auto_insert_open',
+                            side_effect=AssertionError):
+                resumed_entries, errors, _ = self._load(filename, checkpoint_dirname)
+                book.assert_not_called()
+            self.assertFalse(errors)
+            self.assertEqual(entries, resumed_entries)
+
+    @mock.patch('beancount.loader.CHECKPOINT_THRESHOLD', -1.0)
+    def test_resume_after_plugin_change(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'input.beancount')
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent(self.INPUT))
+            checkpoint_dirname = path.join(tmp, 'checkpoints')
+            self._load(filename, checkpoint_dirname)
+
+            # Replace the last plugin; the entries before it should be reused.
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent(self.INPUT).replace(
+                    'beancount.plugins.implicit_prices',
+                    'beancount.plugins.noduplicates'))
+            with mock.patch('beancount.loader._parse_recursive') as parse, \
+                 mock.patch('beancount.parser.booking.book') as book, \
+                 mock.patch('beancount.plugins.auto_accounts.auto_insert_open',
+                            side_effect=AssertionError):
+                entries, errors, options_map = self._load(filename,
+                                                          checkpoint_dirname)
+                parse.assert_not_called()
+                book.assert_not_called()
+            self.assertFalse(errors)
+            self.assertEqual([('beancount.plugins.auto_accounts', None),
+                              ('beancount.plugins.noduplicates', None)],
+                             options_map['plugin'])
+
+            expected_entries, _, __ = loader._load([(filename, True)],
+                                                   None, None, None)
+            self.assertEqual(expected_entries, entries)
+
+    @mock.patch('beancount.loader.CHECKPOINT_THRESHOLD', -1.0)
+    def test_resume_insert_pythonpath(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'input.beancount')
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent("""
+                  option "insert_pythonpath" "TRUE"
+                  plugin "checkpointplugin"
+                """) + textwrap.dedent(self.INPUT))
+            with open(path.join(tmp, 'checkpointplugin.py'), 'w') as file:
+                file.write(textwrap.dedent("""\
+                  __plugins__ = ('noop',)
+                  def noop(entries, options_map):
+                      return entries, []
+                """))
+            checkpoint_dirname = path.join(tmp, 'checkpoints')
+            with mock.patch.object(sys, 'path', list(sys.path)):
+                entries, errors, _ = self._load(filename, checkpoint_dirname)
+                self.assertFalse(errors)
+            sys.modules.pop('checkpointplugin', None)
+
+            # Resume in a fresh process state, where the plugin's directory
+            # isn't in the path.
+            with mock.patch.object(sys, 'path', list(sys.path)), \
+                 mock.patch('beancount.loader._parse_recursive') as parse, \
+                 mock.patch('beancount.parser.booking.book') as book:
+                resumed_entries, errors, _ = self._load(filename, checkpoint_dirname)
+                parse.assert_not_called()
+                book.assert_not_called()
+                self.assertIn(tmp, sys.path)
+            sys.modules.pop('checkpointplugin', None)
+            self.assertFalse(errors)
+            self.assertEqual(entries, resumed_entries)
+
+    @mock.patch('beancount.loader.CHECKPOINT_THRESHOLD', -1.0)
+    def test_corrupted_checkpoint(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'input.beancount')
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent(self.INPUT))
+            checkpoint_dirname = path.join(tmp, 'checkpoints')
+            entries, errors, _ = self._load(filename, checkpoint_dirname)
+            for stage in range(1, 7):
+                with open(path.join(checkpoint_dirname,
+                                    'stage-{:03d}.pickle'.format(stage)), 'w') as file:
+                    file.write('corrupted')
+            with test_utils.capture('stderr'):
+                resumed_entries, errors, _ = self._load(filename, checkpoint_dirname)
+            self.assertFalse(errors)
+            self.assertEqual(entries, resumed_entries)
+
+
+class TestIncrementalLoader(unittest.TestCase):
+
+    FILES = {
+        'top.beancount': """
+          option "operating_currency" "USD"
+          include "accounts.beancount"
+          include "2015.beancount"
+          include "2016.beancount"
+        """,
+        'accounts.beancount': """
+          2014-01-01 open Assets:Checking
+          2014-01-01 open Assets:Investing
+          2014-01-01 open Income:Salary
+          2014-01-01 open Expenses:Food
+        """,
+        '2015.beancount': """
+          2015-01-10 * "Salary"
+            Income:Salary     -1000 USD
+            Assets:Checking
+
+          2015-02-10 * "Buy"
+            Assets:Investing     10 HOOL {50 USD}
+            Assets:Checking
+
+          2015-06-01 balance Assets:Checking  500 USD
+        """,
+        '2016.beancount': """
+          2016-03-01 * "Sell"
+            Assets:Investing     -4 HOOL {}
+            Assets:Checking     240 USD
+
+          2016-04-01 * "Sell too much"
+            Assets:Investing    -20 HOOL {60 USD}
+            Assets:Checking
+
+          2016-06-01 balance Assets:Checking  740 USD
+        """,
+    }
+
+    def _load_reference(self, filename):
+        entries, errors, options_map = loader._load([(filename, True)],
+                                                    None, None, None)
+        options_map.pop('dcontext')
+        return entries, errors, options_map
+
+    def _reload(self, incremental_loader):
+        with mock.patch('beancount.parser.booking_full.book',
+                        wraps=loader.booking_full.book) as mock_book:
+            entries, errors, options_map = incremental_loader.load()
+        options_map.pop('dcontext')
+        booked = [entry for call in mock_book.call_args_list for entry in call[0][0]]
+        return (entries, errors, options_map), booked
+
+    def _append(self, filename, string):
+        with open(filename, 'a') as file:
+            file.write(textwrap.dedent(string))
+
+    def test_load_unchanged(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, self.FILES)
+            filename = path.join(tmp, 'top.beancount')
+            incremental_loader = loader.IncrementalLoader(filename)
+            result, booked = self._reload(incremental_loader)
+            self.assertEqual(self._load_reference(filename), result)
+            self.assertEqual(2, len(result[1]))
+            self.assertEqual(10, len(booked))
+
+            with mock.patch('beancount.parser.parser.parse_file') as mock_parse:
+                new_result, booked = self._reload(incremental_loader)
+            self.assertFalse(mock_parse.called)
+            self.assertEqual(result, new_result)
+            self.assertEqual([], booked)
+
+    def test_load_append(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, self.FILES)
+            filename = path.join(tmp, 'top.beancount')
+            incremental_loader = loader.IncrementalLoader(filename)
+            self._reload(incremental_loader)
+
+            self._append(path.join(tmp, '2016.beancount'), """
+              2016-07-01 * "Sell more"
+                Assets:Investing     -2 HOOL {}
+                Assets:Checking     130 USD
+            """)
+            with mock.patch('beancount.parser.parser.parse_file',
+                            wraps=parser.parse_file) as mock_parse:
+                result, booked = self._reload(incremental_loader)
+            self.assertEqual(1, mock_parse.call_count)
+            self.assertEqual(self._load_reference(filename), result)
+            self.assertEqual(1, len(booked))
+
+    def test_load_modify_earlier(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, self.FILES)
+            filename = path.join(tmp, 'top.beancount')
+            incremental_loader = loader.IncrementalLoader(filename)
+            self._reload(incremental_loader)
+
+            # Fix the balance error and change a 2015 amount.
+            with open(path.join(tmp, '2015.beancount'), 'w') as file:
+                file.write(textwrap.dedent(self.FILES['2015.beancount'].replace(
+                    '500 USD', '1000 USD').replace('-1000 USD', '-1500 USD')))
+            result, booked = self._reload(incremental_loader)
+            self.assertEqual(self._load_reference(filename), result)
+            self.assertEqual(['2015-01-10', '2015-02-10', '2015-06-01', '2016-03-01',
+                              '2016-04-01', '2016-06-01'],
+                             [str(entry.date) for entry in booked])
+            self.assertEqual(3, len(result[1]))
+
+    def test_load_options_changed(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, self.FILES)
+            filename = path.join(tmp, 'top.beancount')
+            incremental_loader = loader.IncrementalLoader(filename)
+            self._reload(incremental_loader)
+
+            self._append(path.join(tmp, 'top.beancount'), """
+              option "booking_method" "FIFO"
+            """)
+            result, booked = self._reload(incremental_loader)
+            self.assertEqual(self._load_reference(filename), result)
+            self.assertEqual(10, len(booked))
+
+    def test_load_include_removed(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, self.FILES)
+            filename = path.join(tmp, 'top.beancount')
+            incremental_loader = loader.IncrementalLoader(filename)
+            self._reload(incremental_loader)
+
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent(self.FILES['top.beancount'].replace(
+                    'include "2016.beancount"', '')))
+            result, booked = self._reload(incremental_loader)
+            self.assertEqual(self._load_reference(filename), result)
+            self.assertEqual([], booked)
+            self.assertEqual(3, len(incremental_loader.parsed_files))
+
+    @mock.patch.object(parser, 'MIN_CHUNK_SIZE', 1)
+    @mock.patch.object(parser.os, 'cpu_count', mock.MagicMock(return_value=4))
+    def test_load_parse_jobs(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, self.FILES)
+            filename = path.join(tmp, 'top.beancount')
+            incremental_loader = loader.IncrementalLoader(filename, parse_jobs=2)
+            with mock.patch.object(parser, 'parse_file_chunked',
+                                   wraps=parser.parse_file_chunked) as chunked:
+                result, _ = self._reload(incremental_loader)
+                self.assertEqual(4, chunked.call_count)
+            self.assertEqual(self._load_reference(filename), result)
+
+
+class TestLoadFileIter(unittest.TestCase):
+
+    FILES = {
+        'top.beancount': """
+          plugin "beancount.plugins.auto_accounts"
+          include "2015.beancount"
+          include "2014.beancount"
+
+          2014-01-01 open Assets:Investing  "FIFO"
+          2014-01-01 open Equity:Opening
+        """,
+        '2014.beancount': """
+          2014-06-01 pad Assets:Checking Equity:Opening
+          2014-06-02 balance Assets:Checking  100 USD
+
+          2014-07-01 * "Buy"
+            Assets:Investing     10 HOOL {5 USD}
+            Assets:Checking     -50 USD
+        """,
+        '2015.beancount': """
+          2015-03-01 * "Sell"
+            Assets:Investing     -4 HOOL {}
+            Assets:Checking      21 USD
+            Income:Gains
+
+          2015-04-01 balance Assets:Checking  70 USD
+          2015-04-01 balance Assets:Checking  75 USD
+          2015-05-01 * "Unbalanced"
+            Assets:Checking      1 USD
+            Income:Gains         1 USD
+        """,
+    }
+
+    def _check_same_as_load(self, filename, **kwargs):
+        entries, errors, options_map = loader._load([(filename, True)], None, None, None)
+        iter_entries, iter_errors, iter_options_map = loader.load_file_iter(filename,
+                                                                            **kwargs)
+        self.assertFalse(isinstance(iter_entries, list))
+        self.assertEqual(entries, list(iter_entries))
+        self.assertEqual(sorted(error.message for error in errors),
+                         sorted(error.message for error in iter_errors))
+        for options in options_map, iter_options_map:
+            options.pop('dcontext')
+        self.assertEqual(options_map, iter_options_map)
+        return errors
+
+    def test_load_file_iter(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, self.FILES)
+            errors = self._check_same_as_load(path.join(tmp, 'top.beancount'))
+            self.assertEqual(4, len(errors))
+
+    def test_load_file_iter_streaming(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'top.beancount': """
+                  include "other.beancount"
+                  2014-01-01 open Assets:Checking
+                  2014-01-01 open Income:Salary
+                  2014-01-02 * "Salary"
+                    Assets:Checking     100 USD
+                    Income:Salary
+                """,
+                'other.beancount': """
+                  2014-01-03 balance Assets:Checking  100 USD
+                """})
+            filename = path.join(tmp, 'top.beancount')
+            self._check_same_as_load(filename)
+
+            # With streaming stages only, no list of the directives gets built.
+            with mock.patch.object(loader, '_apply_plugin') as mock_apply:
+                entries, errors, _ = loader.load_file_iter(filename)
+                self.assertEqual(datetime.date(2014, 1, 1), next(entries).date)
+                list(entries)
+            self.assertFalse(mock_apply.called)
+            self.assertFalse(errors)
+
+    def test_consume_list(self):
+        elements = [1, 2, 3]
+        iterator = loader._consume_list(elements)
+        self.assertEqual(1, next(iterator))
+        self.assertEqual([3, 2], elements)
+        self.assertEqual([2, 3], list(iterator))
+        self.assertEqual([], elements)
+
+
+class TestLoadFileShared(unittest.TestCase):
+
+    def test_load_file_shared(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  include "oranges.beancount"
+                  2014-01-01 open Assets:Apples
+                """,
+                'oranges.beancount': """
+                  2014-01-02 open Assets:Oranges
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            shared_filename = path.join(tmp, '.apples.beancount.shared')
+            expected_entries, _, _ = loader.load_file(filename)
+
+            with mock.patch.object(loader, 'load_file',
+                                   wraps=loader.load_file) as load_mock:
+                entries, errors, options_map = loader.load_file_shared(filename)
+                self.assertTrue(path.exists(shared_filename))
+                self.assertFalse(errors)
+                self.assertIsInstance(entries, shared_ledger.SharedEntries)
+                self.assertEqual(expected_entries, list(entries))
+                self.assertEqual(1, load_mock.call_count)
+                entries.close()
+
+                # Another process attaches to the shared file.
+                entries, errors, options_map = loader.load_file_shared(filename)
+                self.assertEqual(expected_entries, list(entries))
+                self.assertEqual(1, load_mock.call_count)
+                entries.close()
+
+                # The shared file is published again on changes.
+                with open(path.join(tmp, 'oranges.beancount'), 'a') as file:
+                    file.write('2014-01-03 open Assets:Bananas\n')
+                entries, errors, options_map = loader.load_file_shared(filename)
+                self.assertEqual(3, len(entries))
+                self.assertEqual(2, load_mock.call_count)
+                entries.close()
+
+    def test_load_file_shared_invalid(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            shared_filename = path.join(tmp, 'apples.shared')
+            with open(shared_filename, 'w') as file:
+                file.write('Invalid')
+            with mock.patch('logging.warning') as warn_mock:
+                entries, errors, options_map = loader.load_file_shared(
+                    filename, shared_filename)
+            self.assertEqual(1, len(warn_mock.mock_calls))
+            self.assertEqual(1, len(entries))
+            entries.close()
+
+    def test_load_file_shared_concurrent(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            shared_filename = path.join(tmp, 'apples.shared')
+            loaded = loader.load_file(filename)
+
+            # Another process publishes the file while this one waits for the lock.
+            lock = shared_ledger.lock
+            @contextlib.contextmanager
+            def publishing_lock(lock_filename):
+                with lock(lock_filename):
+                    shared_ledger.publish(shared_filename, *loaded)
+                    yield
+            with mock.patch.object(shared_ledger, 'lock', publishing_lock), \
+                 mock.patch.object(loader, 'load_file') as load_mock:
+                entries, errors, options_map = loader.load_file_shared(
+                    filename, shared_filename)
+                load_mock.assert_not_called()
+            self.assertEqual(loaded[0], list(entries))
+            entries.close()
+
+    def test_load_file_shared_truncated(self):
+        with test_utils.tempdir() as tmp:
+            test_utils.create_temporary_files(tmp, {
+                'apples.beancount': """
+                  2014-01-01 open Assets:Apples
+                """})
+            filename = path.join(tmp, 'apples.beancount')
+            shared_filename = path.join(tmp, 'apples.shared')
+            loader.load_file_shared(filename, shared_filename)[0].close()
+            with open(shared_filename, 'r+b') as file:
+                file.truncate(64)
+            with mock.patch('logging.warning') as warn_mock:
+                entries, errors, options_map = loader.load_file_shared(
+                    filename, shared_filename)
+            self.assertEqual(1, len(warn_mock.mock_calls))
+            self.assertEqual(1, len(entries))
+            entries.close()
+
 
 class TestEncoding(unittest.TestCase):
 
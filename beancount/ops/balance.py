@@ -9,13 +9,18 @@ from beancount.core.number import ONE
 from beancount.core.number import ZERO
 from beancount.core.data import Transaction
 from beancount.core.data import Balance
+from beancount.core.data import Close
+from beancount.core.data import Open
 from beancount.core import amount
 from beancount.core import account
-from beancount.core import realization
 from beancount.core import getters
 
 __plugins__ = ('check',)
 
+__plugins_ordering__ = 'sorted'
+
+__streaming_plugins__ = ('check_iter',)
+
 
 BalanceError = collections.namedtuple('BalanceError', 'source message entry')
 
@@ -61,55 +66,106 @@ def check(entries, options_map):
     Returns:
       A pair of a list of directives and a list of balance check errors.
     """
-    new_entries = []
     check_errors = []
 
-    # This is similar to realization, but performed in a different order, and
-    # where we only accumulate inventories for accounts that have balance
-    # assertions in them (this saves on time). Here we process the entries one
-    # by one along with the balance checks. We use a temporary realization in
-    # order to hold the incremental tree of balances, so that we can easily get
-    # the amounts of an account's subaccounts for making checks on parent
-    # accounts.
-    real_root = realization.RealAccount('')
-
     # Figure out the set of accounts for which we need to compute a running
-    # inventory balance.
+    # balance. Only those with assertions on them are tracked (this saves on
+    # time); the balances of their sub-accounts are accumulated into them.
     asserted_accounts = {entry.account
                          for entry in entries
                          if isinstance(entry, Balance)}
 
-    # Add all children accounts of an asserted account to be calculated as well,
-    # and pre-create these accounts, and only those (we're just being tight to
-    # make sure).
-    asserted_match_list = [account.parent_matcher(account_)
-                           for account_ in asserted_accounts]
-    for account_ in getters.get_accounts(entries):
-        if (account_ in asserted_accounts or
-            any(match(account_) for match in asserted_match_list)):
-            realization.get_or_create(real_root, account_)
-
     # Get the Open directives for each account.
-    open_close_map = getters.get_account_open_close(entries)
+    open_map = {account_: open
+                for account_, (open, _) in getters.get_account_open_close(entries).items()}
+
+    new_entries = list(_check_entries(entries, options_map, asserted_accounts, open_map,
+                                      check_errors, False))
+    return new_entries, check_errors
+
+
+def check_iter(entries, options_map, errors):
+    """Process the balance assertion directives of a stream of entries.
+
+    This is the streaming form of check(). Since the asserted accounts aren't
+    known in advance, the balances of all the accounts are accumulated, and the
+    Open directives are only known from the point at which they occur.
+
+    Args:
+      entries: An iterable of sorted directives.
+      options_map: A dict of options, parsed from the input file.
+      errors: A list to append the balance check errors to.
+    Yields:
+      The directives, with failing Balance directives replaced.
+    """
+    return _check_entries(entries, options_map, None, {}, errors, True)
+
+
+def _check_entries(entries, options_map, asserted_accounts, open_map, check_errors,
+                   streaming):
+    """Process the balance assertion directives in sequence.
+
+    This is similar to realization, but performed in a different order, and
+    where we only accumulate the units of the accounts, by currency. Here we
+    process the entries one by one along with the balance checks. Each posting
+    updates the running balance of its account and of each of its tracked parent
+    accounts, so that checking the balance of a parent account for the total sum
+    of its sub-accounts doesn't require summing up its subtree.
+
+    Args:
+      entries: An iterable of sorted directives.
+      options_map: A dict of options, parsed from the input file.
+      asserted_accounts: A set of the names of the accounts to track the
+        balances of, or None if streaming.
+      open_map: A dict of account name to its Open directive or None.
+      check_errors: A list to append the balance check errors to.
+      streaming: A boolean, true if the tracked accounts and the Open
+        directives are to be accumulated from the entries as they go by, rather
+        than having been computed beforehand.
+    Yields:
+      The directives, with failing Balance directives replaced.
+    """
+    # A mapping of account name to a dict of currency to the total number of
+    # units in the account and its sub-accounts.
+    subtree_balances = collections.defaultdict(dict)
+
+    # A mapping of account name to the list of the running balances of the
+    # tracked accounts a posting to it contributes to.
+    posting_balances = {}
 
     for entry in entries:
         if isinstance(entry, Transaction):
-            # For each of the postings' accounts, update the balance inventory.
+            # For each of the postings' accounts, update the balances.
             for posting in entry.postings:
-                real_account = realization.get(real_root, posting.account)
-
-                # The account will have been created only if we're meant to track it.
-                if real_account is not None:
-                    # Note: Always allow negative lots for the purpose of balancing.
-                    # This error should show up somewhere else than here.
-                    real_account.balance.add_position(posting)
+                try:
+                    balances = posting_balances[posting.account]
+                except KeyError:
+                    balances = posting_balances[posting.account] = [
+                        subtree_balances[account_]
+                        for account_ in account.parents(posting.account)
+                        if streaming or account_ in asserted_accounts]
+
+                # Note: Always allow negative lots for the purpose of balancing.
+                # This error should show up somewhere else than here.
+                units = posting.units
+                for currency_balances in balances:
+                    currency_balances[units.currency] = (
+                        currency_balances.get(units.currency, ZERO) + units.number)
+
+        elif streaming and isinstance(entry, Open):
+            open_map.setdefault(entry.account, entry)
+            if open_map[entry.account] is None:
+                open_map[entry.account] = entry
+
+        elif streaming and isinstance(entry, Close):
+            open_map.setdefault(entry.account, None)
 
         elif isinstance(entry, Balance):
             # Check that the currency of the balance check is one of the allowed
             # currencies for that account.
             expected_amount = entry.amount
             try:
-                open, _ = open_close_map[entry.account]
+                open = open_map[entry.account]
             except KeyError:
                 check_errors.append(
                     BalanceError(entry.meta,
@@ -126,22 +182,13 @@ def check(entries, options_map):
                                      expected_amount.currency),
                                  entry))
 
-            # Sum up the current balances for this account and its
-            # sub-accounts. We want to support checks for parent accounts
-            # for the total sum of their subaccounts.
-            #
-            # FIXME: Improve the performance further by computing the balance
-            # for the desired currency only. This won't allow us to cache in
-            # this way but may be faster, if we're not asserting all the
-            # currencies. Furthermore, we could probably avoid recomputing the
-            # balance if a subtree of positions hasn't been invalidated by a new
-            # position added to the realization. Do this.
-            real_account = realization.get(real_root, entry.account)
-            assert real_account is not None, "Missing {}".format(entry.account)
-            subtree_balance = realization.compute_balance(real_account, leaf_only=False)
-
-            # Get only the amount in the desired currency.
-            balance_amount = subtree_balance.get_currency_units(expected_amount.currency)
+            # Get the current balance for this account and its sub-accounts, in
+            # the desired currency only. We want to support checks for parent
+            # accounts for the total sum of their subaccounts.
+            currency_balances = subtree_balances.get(entry.account, {})
+            balance_amount = amount.Amount(
+                currency_balances.get(expected_amount.currency, ZERO),
+                expected_amount.currency)
 
             # Check if the amount is within bounds of the expected amount.
             diff_amount = amount.sub(balance_amount, expected_amount)
@@ -170,6 +217,4 @@ def check(entries, options_map):
                     meta=entry.meta.copy(),
                     diff_amount=diff_amount)
 
-        new_entries.append(entry)
-
-    return new_entries, check_errors
+        yield entry
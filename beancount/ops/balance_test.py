@@ -194,6 +194,44 @@ class TestBalance(unittest.TestCase):
                         if isinstance(entry, balance.Balance)]
         self.assertEqual([None], diff_amounts)
 
+    @loader.load_doc(expect_errors=True)
+    def test_parents_running(self, entries, errors, __):
+        """
+          2013-05-01 open Assets:Bank
+          2013-05-01 open Assets:Bank:Checking
+          2013-05-01 open Assets:Bank:Checking:Joint
+          2013-05-01 open Assets:Bank:Savings
+          2013-05-01 open Equity:Opening-Balances
+
+          2013-05-02 *
+            Assets:Bank:Checking:Joint           100 USD
+            Equity:Opening-Balances
+
+          2013-05-03 balance Assets:Bank             100 USD
+          2013-05-03 balance Assets:Bank               0 CAD
+
+          2013-05-03 *
+            Assets:Bank:Savings                   20 CAD
+            Assets:Bank:Checking:Joint           -30 USD
+            Equity:Opening-Balances
+
+          2013-05-04 balance Assets:Bank              70 USD
+          2013-05-04 balance Assets:Bank              20 CAD
+          2013-05-04 balance Assets:Bank:Checking     70 USD
+
+          2013-05-04 *
+            Assets:Bank:Savings                    5 USD
+            Equity:Opening-Balances
+
+          2013-05-05 balance Assets:Bank              70 USD
+        """
+        self.assertEqual([balance.BalanceError], list(map(type, errors)))
+        self.assertRegex(errors[0].message, "expected 70 USD != accumulated 75 USD")
+        diff_amounts = [entry.diff_amount
+                        for entry in entries
+                        if isinstance(entry, balance.Balance)]
+        self.assertEqual([None, None, None, None, None, A('5 USD')], diff_amounts)
+
     @loader.load_doc()
     def test_with_lots(self, entries, errors, __):
         """
@@ -314,6 +352,35 @@ class TestBalance(unittest.TestCase):
         self.assertEqual([balance.BalanceError], list(map(type, errors)))
 
 
+    @loader.load_doc(expect_errors=True)
+    def test_check_iter(self, entries, _, options_map):
+        """
+          option "plugin_processing_mode" "raw"
+
+          2013-05-01 open Assets:Bank
+          2013-05-01 open Assets:Bank:Checking1  USD
+          2013-05-01 open Equity:Opening-Balances
+
+          2013-05-02 *
+            Assets:Bank:Checking1                100 USD
+            Equity:Opening-Balances
+
+          2013-05-03 *
+            Assets:Bank:Checking2                10 USD
+            Equity:Opening-Balances
+
+          2013-05-05 balance Assets:Bank             110 USD
+          2013-05-05 balance Assets:Bank:Checking1   100 CAD
+          2013-05-05 balance Assets:Bank:Checking2    20 USD
+        """
+        checked_entries, errors = balance.check(entries, options_map)
+        self.assertEqual(3, len(errors))
+
+        iter_errors = []
+        self.assertEqual(checked_entries,
+                         list(balance.check_iter(iter(entries), options_map, iter_errors)))
+        self.assertEqual(errors, iter_errors)
+
 class TestBalancePrecision(unittest.TestCase):
 
     @loader.load_doc(expect_errors=True)
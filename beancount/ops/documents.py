@@ -14,6 +14,10 @@ from beancount.core import getters
 
 __plugins__ = ('process_documents', 'verify_document_files_exist')
 
+__plugins_ordering__ = 'sorted'
+
+__streaming_plugins__ = ('process_documents_iter', 'verify_document_files_exist_iter')
+
 
 # An error from trying to find the documents.
 DocumentError = namedtuple('DocumentError', 'source message entry')
@@ -54,6 +58,44 @@ def process_documents(entries, options_map):
     return (entries, autodoc_errors)
 
 
+def process_documents_iter(entries, options_map, errors):
+    """Create document directives automatically in a stream of entries.
+
+    This is the streaming form of process_documents(). If there are document
+    directories to scan, the entries are gathered and processed as a list, as
+    the accounts to find documents for are needed before merging them in.
+
+    Args:
+      entries: An iterable of sorted directives.
+      options_map: An options dict, as is output by the parser.
+      errors: A list to append the errors produced to.
+    Yields:
+      All the directives, including the new ones.
+    """
+    if not options_map['documents']:
+        yield from entries
+        return
+    entries, autodoc_errors = process_documents(list(entries), options_map)
+    errors.extend(autodoc_errors)
+    yield from entries
+
+
+def verify_document_files_exist_iter(entries, options_map, errors):
+    """Verify that the document entries of a stream point to existing files.
+
+    Args:
+      entries: An iterable of directives.
+      options_map: A parser options dict.
+      errors: A list to append the errors produced to.
+    Yields:
+      The same directives.
+    """
+    for entry in entries:
+        if isinstance(entry, data.Document):
+            errors.extend(verify_document_files_exist([entry], options_map)[1])
+        yield entry
+
+
 def verify_document_files_exist(entries, unused_options_map):
     """Verify that the document entries point to existing files.
 
@@ -17,6 +17,10 @@ from beancount.ops import balance
 
 __plugins__ = ('pad',)
 
+__plugins_ordering__ = 'sorted'
+
+__streaming_plugins__ = ('pad_iter',)
+
 
 PadError = collections.namedtuple('PadError', 'source message entry')
 
@@ -41,6 +45,55 @@ def pad(entries, options_map):
       A new list of directives, with Pad entries inserted, and a list of new
       errors produced.
     """
+    return _pad(entries, options_map, None)
+
+
+def pad_iter(entries, options_map, errors):
+    """Insert transaction entries to fulfill balance checks in a stream of entries.
+
+    This is the streaming form of pad(). Since any subsequent Balance directive
+    may cause a padding entry to be inserted after a Pad directive, the entries
+    are only streamed through until the first Pad directive. From there on, the
+    remaining entries are gathered and processed as a list.
+
+    Args:
+      entries: An iterable of sorted directives.
+      options_map: A parser options dict.
+      errors: A list to append the errors produced to.
+    Yields:
+      The directives, with Pad entries inserted.
+    """
+    # The balances of all the accounts, before the first Pad directive.
+    balances = collections.defaultdict(inventory.Inventory)
+
+    entries = iter(entries)
+    for entry in entries:
+        if isinstance(entry, data.Pad):
+            remaining_entries = [entry]
+            remaining_entries.extend(entries)
+            padded_entries, pad_errors = _pad(remaining_entries, options_map, balances)
+            errors.extend(pad_errors)
+            yield from padded_entries
+            return
+
+        if isinstance(entry, data.Transaction):
+            for posting in entry.postings:
+                balances[posting.account].add_position(posting)
+        yield entry
+
+
+def _pad(entries, options_map, balances):
+    """Insert transaction entries to fulfill subsequent balance checks.
+
+    Args:
+      entries: A list of directives.
+      options_map: A parser options dict.
+      balances: A dict of account name to its Inventory balance before the
+        entries, or None, if the entries start from empty balances.
+    Returns:
+      A new list of directives, with Pad entries inserted, and a list of new
+      errors produced.
+    """
     pad_errors = []
 
     # Find all the pad entries and group them by account.
@@ -71,6 +124,10 @@ def pad(entries, options_map):
         padded_lots = set()
 
         pad_balance = inventory.Inventory()
+        if balances:
+            for item_account, item_balance in balances.items():
+                if is_child(item_account):
+                    pad_balance.add_inventory(item_balance)
         for entry in postings:
 
             assert not isinstance(entry, data.Posting)
@@ -570,6 +570,35 @@ class TestPadding(cmptest.TestCase):
         # self.assertRegex(errors[0].message, "Balance failed")
         # self.assertEqual(datetime.date(2015, 9, 15), errors[0].entry.date)
 
+    @loader.load_doc()
+    def test_pad_iter(self, entries, _, options_map):
+        """
+          option "plugin_processing_mode" "raw"
+
+          2013-01-01 open Assets:Checking
+          2013-01-01 open Assets:Checking:Sub
+          2013-01-01 open Equity:Opening-Balances
+
+          2013-02-01 *
+            Assets:Checking:Sub       200.00 USD
+            Equity:Opening-Balances
+
+          2013-05-01 pad Assets:Checking Equity:Opening-Balances
+          2013-05-03 balance Assets:Checking                      250.00 USD
+          2013-06-01 pad Assets:Checking Equity:Opening-Balances
+          2013-07-01 pad Assets:Checking:Sub Equity:Opening-Balances
+        """
+        padded_entries, errors = pad.pad(list(entries), options_map)
+        self.assertEqual(2, len(errors))
+
+        iter_errors = []
+        self.assertEqual(padded_entries,
+                         list(pad.pad_iter(iter(entries), options_map, iter_errors)))
+        self.assertEqual(errors, iter_errors)
+        self.assertEqual(1, len([entry for entry in padded_entries
+                                 if isinstance(entry, data.Transaction) and
+                                 entry.flag == 'P']))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -12,6 +12,7 @@ __license__ = "GNU GPLv2"
 
 from os import path
 import collections
+import time
 
 from beancount.core.data import Open
 from beancount.core.data import Balance
@@ -22,13 +23,165 @@ from beancount.core.data import Note
 from beancount.core import data
 from beancount.core import getters
 from beancount.core import interpolate
-from beancount.utils import misc_utils
+from beancount.utils import profiler
 
 
 # An error from one of the checks.
 ValidationError = collections.namedtuple('ValidationError', 'source message entry')
 
 
+class Validator:
+    """A check of invariants on directives, run within a single pass over them.
+
+    A validator registers handlers for the types of directives it inspects, and
+    accumulates its errors as the directives are dispatched to them, in order.
+    Many validators are run together by dispatching each directive to the
+    handlers of all of them, so the list of directives is traversed only once.
+    """
+
+    def __init__(self, options_map, errors=None):
+        """Create a validator.
+
+        Args:
+          options_map: An options map.
+          errors: A list to append the new errors to, or None for a new list.
+        """
+        self.options_map = options_map
+        self.errors = [] if errors is None else errors
+
+    def handlers(self):
+        """Return the handlers of the directives this validator inspects.
+
+        Returns:
+          A list of (type, function) pairs, where function is to be called with
+          each directive which is an instance of type. The type object matches
+          all the directives.
+        """
+        raise NotImplementedError
+
+    def finish(self, entries):
+        """Complete the checks, once all the directives have been dispatched.
+
+        Args:
+          entries: The list of all the directives, or None if they were streamed.
+        """
+
+
+def dispatch(entries, validators):
+    """Dispatch each directive of a stream to the handlers of the validators.
+
+    Args:
+      entries: An iterable of directives.
+      validators: A list of Validator instances.
+    Yields:
+      The same directives.
+    """
+    registrations = [handler
+                     for validator in validators
+                     for handler in validator.handlers()]
+
+    # A cache of the functions to call for each type of directive.
+    type_functions = {}
+    for entry in entries:
+        entry_type = type(entry)
+        try:
+            functions = type_functions[entry_type]
+        except KeyError:
+            functions = type_functions[entry_type] = [
+                function
+                for handler_type, function in registrations
+                if issubclass(entry_type, handler_type)]
+        for function in functions:
+            function(entry)
+        yield entry
+
+
+def run_validators(validators, entries):
+    """Run validators in a single pass over a list of directives.
+
+    Args:
+      validators: A list of Validator instances.
+      entries: A list of directives.
+    """
+    collections.deque(dispatch(entries, validators), maxlen=0)
+    for validator in validators:
+        validator.finish(entries)
+
+
+def run_validators_iter(validators, entries):
+    """Run validators in a single pass over a stream of directives.
+
+    Args:
+      validators: A list of Validator instances.
+      entries: An iterable of sorted directives.
+    Yields:
+      The same directives.
+    """
+    yield from dispatch(entries, validators)
+    for validator in validators:
+        validator.finish(None)
+
+
+class _TimedValidator(Validator):
+    """A proxy to a validator which accumulates the running time of its handlers.
+
+    Attributes:
+      validator: The Validator instance being timed.
+      time: A float, the total running time of its handlers, in seconds.
+    """
+
+    def __init__(self, validator):
+        super().__init__(validator.options_map, validator.errors)
+        self.validator = validator
+        self.time = 0.0
+
+    def handlers(self):
+        return [(handler_type, self._timed(function))
+                for handler_type, function in self.validator.handlers()]
+
+    def _timed(self, function):
+        """Wrap a handler to accumulate its running time."""
+        def timed_function(entry):
+            time_before = time.perf_counter()
+            function(entry)
+            self.time += time.perf_counter() - time_before
+        return timed_function
+
+    def finish(self, entries):
+        time_before = time.perf_counter()
+        self.validator.finish(entries)
+        self.time += time.perf_counter() - time_before
+
+
+def _run(validator_class, entries, options_map):
+    """Run a single validator over a list of directives.
+
+    Args:
+      validator_class: A subclass of Validator.
+      entries: A list of directives.
+      options_map: An options map.
+    Returns:
+      A list of new errors, if any were found.
+    """
+    validator = validator_class(options_map)
+    run_validators([validator], entries)
+    return validator.errors
+
+
+def _run_iter(validator_class, entries, options_map, errors):
+    """Run a single validator over a stream of directives.
+
+    Args:
+      validator_class: A subclass of Validator.
+      entries: An iterable of sorted directives.
+      options_map: An options map.
+      errors: A list to append the new errors to.
+    Returns:
+      A generator of the same directives.
+    """
+    return run_validators_iter([validator_class(options_map, errors)], entries)
+
+
 # Directive types that should be allowed after the account is closed.
 #
 # - Balance directives may be useful to ensure the closed account is empty. A balance
@@ -62,48 +215,71 @@ def validate_open_close(entries, unused_options_map):
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
-    open_map = {}
-    close_map = {}
-    for entry in entries:
+    return _run(OpenCloseValidator, entries, unused_options_map)
 
-        if isinstance(entry, Open):
-            if entry.account in open_map:
-                errors.append(
-                    ValidationError(
-                        entry.meta,
-                        "Duplicate open directive for {}".format(entry.account),
-                        entry))
-            else:
-                open_map[entry.account] = entry
 
-        elif isinstance(entry, Close):
-            if entry.account in close_map:
-                errors.append(
-                    ValidationError(
-                        entry.meta,
-                        "Duplicate close directive for {}".format(entry.account),
-                        entry))
-            else:
-                try:
-                    open_entry = open_map[entry.account]
-                    if entry.date <= open_entry.date:
-                        errors.append(
-                            ValidationError(
-                                entry.meta,
-                                "Internal error: closing date for {} "
-                                "appears before opening date".format(entry.account),
-                                entry))
-                except KeyError:
-                    errors.append(
+def validate_open_close_iter(entries, unused_options_map, errors):
+    """Check constraints on open and close directives of a stream of entries.
+
+    See validate_open_close().
+
+    Args:
+      entries: An iterable of sorted directives.
+      unused_options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(OpenCloseValidator, entries, unused_options_map, errors)
+
+
+class OpenCloseValidator(Validator):
+    """The validator of validate_open_close()."""
+
+    def __init__(self, options_map, errors=None):
+        super().__init__(options_map, errors)
+        self.open_map = {}
+        self.close_map = {}
+
+    def handlers(self):
+        return [(Open, self.check_open),
+                (Close, self.check_close)]
+
+    def check_open(self, entry):
+        if entry.account in self.open_map:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Duplicate open directive for {}".format(entry.account),
+                    entry))
+        else:
+            self.open_map[entry.account] = entry
+
+    def check_close(self, entry):
+        if entry.account in self.close_map:
+            self.errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Duplicate close directive for {}".format(entry.account),
+                    entry))
+        else:
+            try:
+                open_entry = self.open_map[entry.account]
+                if entry.date <= open_entry.date:
+                    self.errors.append(
                         ValidationError(
                             entry.meta,
-                            "Unopened account {} is being closed".format(entry.account),
+                            "Internal error: closing date for {} "
+                            "appears before opening date".format(entry.account),
                             entry))
+            except KeyError:
+                self.errors.append(
+                    ValidationError(
+                        entry.meta,
+                        "Unopened account {} is being closed".format(entry.account),
+                        entry))
 
-                close_map[entry.account] = entry
-
-    return errors
+            self.close_map[entry.account] = entry
 
 
 def validate_duplicate_balances(entries, unused_options_map):
@@ -120,27 +296,47 @@ def validate_duplicate_balances(entries, unused_options_map):
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
+    return _run(DuplicateBalancesValidator, entries, unused_options_map)
 
-    # Mapping of (account, currency, date) to Balance entry.
-    balance_entries = {}
-    for entry in entries:
-        if not isinstance(entry, data.Balance):
-            continue
 
+def validate_duplicate_balances_iter(entries, unused_options_map, errors):
+    """Check that balance entries occur only once per day in a stream of entries.
+
+    See validate_duplicate_balances().
+
+    Args:
+      entries: An iterable of sorted directives.
+      unused_options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(DuplicateBalancesValidator, entries, unused_options_map, errors)
+
+
+class DuplicateBalancesValidator(Validator):
+    """The validator of validate_duplicate_balances()."""
+
+    def __init__(self, options_map, errors=None):
+        super().__init__(options_map, errors)
+        # Mapping of (account, currency, date) to Balance entry.
+        self.balance_entries = {}
+
+    def handlers(self):
+        return [(Balance, self.check_balance)]
+
+    def check_balance(self, entry):
         key = (entry.account, entry.amount.currency, entry.date)
         try:
-            previous_entry = balance_entries[key]
+            previous_entry = self.balance_entries[key]
             if entry.amount != previous_entry.amount:
-                errors.append(
+                self.errors.append(
                     ValidationError(
                         entry.meta,
                         "Duplicate balance assertion with different amounts",
                         entry))
         except KeyError:
-            balance_entries[key] = entry
-
-    return errors
+            self.balance_entries[key] = entry
 
 
 def validate_duplicate_commodities(entries, unused_options_map):
@@ -152,27 +348,45 @@ def validate_duplicate_commodities(entries, unused_options_map):
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
+    return _run(DuplicateCommoditiesValidator, entries, unused_options_map)
 
-    # Mapping of (account, currency, date) to Balance entry.
-    commodity_entries = {}
-    for entry in entries:
-        if not isinstance(entry, data.Commodity):
-            continue
 
+def validate_duplicate_commodities_iter(entries, unused_options_map, errors):
+    """Check that commodity entries are unique in a stream of entries.
+
+    Args:
+      entries: An iterable of directives.
+      unused_options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(DuplicateCommoditiesValidator, entries, unused_options_map, errors)
+
+
+class DuplicateCommoditiesValidator(Validator):
+    """The validator of validate_duplicate_commodities()."""
+
+    def __init__(self, options_map, errors=None):
+        super().__init__(options_map, errors)
+        # Mapping of currency to Commodity entry.
+        self.commodity_entries = {}
+
+    def handlers(self):
+        return [(data.Commodity, self.check_commodity)]
+
+    def check_commodity(self, entry):
         key = entry.currency
         try:
-            previous_entry = commodity_entries[key]
+            previous_entry = self.commodity_entries[key]
             if previous_entry:
-                errors.append(
+                self.errors.append(
                     ValidationError(
                         entry.meta,
                         "Duplicate commodity directives for '{}'".format(key),
                         entry))
         except KeyError:
-            commodity_entries[key] = entry
-
-    return errors
+            self.commodity_entries[key] = entry
 
 
 def validate_active_accounts(entries, unused_options_map):
@@ -195,41 +409,70 @@ def validate_active_accounts(entries, unused_options_map):
     Returns:
       A list of new errors, if any were found.
     """
-    error_pairs = []
-    active_set = set()
-    opened_accounts = set()
-    for entry in entries:
-        if isinstance(entry, data.Open):
-            active_set.add(entry.account)
-            opened_accounts.add(entry.account)
+    return _run(ActiveAccountsValidator, entries, unused_options_map)
 
-        elif isinstance(entry, data.Close):
-            active_set.discard(entry.account)
 
-        else:
-            for account in getters.get_entry_accounts(entry):
-                if account not in active_set:
-                    # Allow document and note directives that occur after an
-                    # account is closed.
-                    if (isinstance(entry, ALLOW_AFTER_CLOSE) and
-                        account in opened_accounts):
-                        continue
-
-                    # Register an error to be logged later, with an appropriate
-                    # message.
-                    error_pairs.append((account, entry))
-
-    # Refine the error message to disambiguate between the case of an account
-    # that has never been seen and one that was simply not active at the time.
-    errors = []
-    for account, entry in error_pairs:
-        if account in opened_accounts:
-            message = "Invalid reference to inactive account '{}'".format(account)
-        else:
-            message = "Invalid reference to unknown account '{}'".format(account)
-        errors.append(ValidationError(entry.meta, message, entry))
+def validate_active_accounts_iter(entries, unused_options_map, errors):
+    """Check that all references to accounts in a stream occur on active accounts.
 
-    return errors
+    See validate_active_accounts(). The errors are only produced once the
+    stream has been exhausted.
+
+    Args:
+      entries: An iterable of sorted directives.
+      unused_options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(ActiveAccountsValidator, entries, unused_options_map, errors)
+
+
+class ActiveAccountsValidator(Validator):
+    """The validator of validate_active_accounts()."""
+
+    def __init__(self, options_map, errors=None):
+        super().__init__(options_map, errors)
+        self.error_pairs = []
+        self.active_set = set()
+        self.opened_accounts = set()
+
+    def handlers(self):
+        return ([(Open, self.check_open),
+                 (Close, self.check_close)] +
+                [(entry_type, self.check_references)
+                 for entry_type in data.ALL_DIRECTIVES
+                 if entry_type not in (Open, Close)])
+
+    def check_open(self, entry):
+        self.active_set.add(entry.account)
+        self.opened_accounts.add(entry.account)
+
+    def check_close(self, entry):
+        self.active_set.discard(entry.account)
+
+    def check_references(self, entry):
+        for account in getters.get_entry_accounts(entry):
+            if account not in self.active_set:
+                # Allow document and note directives that occur after an
+                # account is closed.
+                if (isinstance(entry, ALLOW_AFTER_CLOSE) and
+                    account in self.opened_accounts):
+                    continue
+
+                # Register an error to be logged later, with an appropriate
+                # message.
+                self.error_pairs.append((account, entry))
+
+    def finish(self, entries):
+        # Refine the error message to disambiguate between the case of an account
+        # that has never been seen and one that was simply not active at the time.
+        for account, entry in self.error_pairs:
+            if account in self.opened_accounts:
+                message = "Invalid reference to inactive account '{}'".format(account)
+            else:
+                message = "Invalid reference to unknown account '{}'".format(account)
+            self.errors.append(ValidationError(entry.meta, message, entry))
 
 
 def validate_currency_constraints(entries, options_map):
@@ -246,38 +489,105 @@ def validate_currency_constraints(entries, options_map):
     Returns:
       A list of new errors, if any were found.
     """
+    return _run(CurrencyConstraintsValidator, entries, options_map)
 
-    # Get all the open entries with currency constraints.
-    open_map = {entry.account: entry
-                for entry in entries
-                if isinstance(entry, Open) and entry.currencies}
 
-    errors = []
-    for entry in entries:
-        if not isinstance(entry, Transaction):
-            continue
+def validate_currency_constraints_iter(entries, unused_options_map, errors):
+    """Check the currency constraints of account declarations in a stream.
 
-        for posting in entry.postings:
-            # Look up the corresponding account's valid currencies; skip the
-            # check if there are none specified.
-            try:
-                open_entry = open_map[posting.account]
-                valid_currencies = open_entry.currencies
-                if not valid_currencies:
-                    continue
-            except KeyError:
-                continue
+    See validate_currency_constraints(). The constraints of an account only
+    apply from its Open directive on, which sorts before its valid uses.
 
-            # Perform the check.
-            if posting.units.currency not in valid_currencies:
-                errors.append(
-                    ValidationError(
-                        entry.meta,
-                        "Invalid currency {} for account '{}'".format(
-                            posting.units.currency, posting.account),
-                        entry))
+    Args:
+      entries: An iterable of sorted directives.
+      unused_options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(CurrencyConstraintsValidator, entries, unused_options_map, errors)
 
-    return errors
+
+class CurrencyConstraintsValidator(Validator):
+    """The validator of validate_currency_constraints().
+
+    The postings are checked against the constraints of the Open directives seen
+    before them. Over a list of directives, the constraints of an account apply
+    to all of its postings instead, and are those of its last Open directive; in
+    the rare event that a posting to an account precedes its Open directive with
+    constraints, or that the account is opened again, all the postings are
+    checked again once the last Open directive is known.
+    """
+
+    def __init__(self, options_map, errors=None):
+        super().__init__(options_map, errors)
+        # A dict of account name to its Open directive with currency constraints.
+        self.open_map = {}
+        # The accounts which were posted to without constraints.
+        self.unconstrained_accounts = set()
+        # The number of errors before the first posting, and whether the
+        # postings have to be checked again.
+        self.num_errors = len(self.errors)
+        self.recheck = False
+
+    def handlers(self):
+        return [(Open, self.check_open),
+                (Transaction, self.check_transaction)]
+
+    def check_open(self, entry):
+        if entry.currencies:
+            if (entry.account in self.open_map or
+                entry.account in self.unconstrained_accounts):
+                self.recheck = True
+            self.open_map[entry.account] = entry
+
+    def check_transaction(self, entry):
+        if not _check_currency_constraints(entry, self.open_map, self.errors):
+            for posting in entry.postings:
+                if posting.account not in self.open_map:
+                    self.unconstrained_accounts.add(posting.account)
+
+    def finish(self, entries):
+        if entries is not None and self.recheck:
+            del self.errors[self.num_errors:]
+            for entry in entries:
+                if isinstance(entry, Transaction):
+                    _check_currency_constraints(entry, self.open_map, self.errors)
+
+
+def _check_currency_constraints(entry, open_map, errors):
+    """Check the currencies of postings against their account's constraints.
+
+    Args:
+      entry: A Transaction directive.
+      open_map: A dict of account name to its Open directive with currency
+        constraints.
+      errors: A list to append the new errors to.
+    Returns:
+      A boolean, true if all the accounts of the postings have constraints.
+    """
+    all_constrained = True
+    for posting in entry.postings:
+        # Look up the corresponding account's valid currencies; skip the
+        # check if there are none specified.
+        try:
+            open_entry = open_map[posting.account]
+            valid_currencies = open_entry.currencies
+            if not valid_currencies:
+                continue
+        except KeyError:
+            all_constrained = False
+            continue
+
+        # Perform the check.
+        if posting.units.currency not in valid_currencies:
+            errors.append(
+                ValidationError(
+                    entry.meta,
+                    "Invalid currency {} for account '{}'".format(
+                        posting.units.currency, posting.account),
+                    entry))
+    return all_constrained
 
 
 def validate_documents_paths(entries, options_map):
@@ -293,10 +603,32 @@ def validate_documents_paths(entries, options_map):
     Returns:
       A list of new errors, if any were found.
     """
-    return [ValidationError(entry.meta, "Invalid relative path for entry", entry)
-            for entry in entries
-            if (isinstance(entry, Document) and
-                not path.isabs(entry.filename))]
+    return _run(DocumentsPathsValidator, entries, options_map)
+
+
+def validate_documents_paths_iter(entries, options_map, errors):
+    """Check that the filenames of Document entries in a stream are absolute.
+
+    Args:
+      entries: An iterable of directives.
+      options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(DocumentsPathsValidator, entries, options_map, errors)
+
+
+class DocumentsPathsValidator(Validator):
+    """The validator of validate_documents_paths()."""
+
+    def handlers(self):
+        return [(Document, self.check_document)]
+
+    def check_document(self, entry):
+        if not path.isabs(entry.filename):
+            self.errors.append(
+                ValidationError(entry.meta, "Invalid relative path for entry", entry))
 
 
 def validate_data_types(entries, options_map):
@@ -313,17 +645,37 @@ def validate_data_types(entries, options_map):
     Returns:
       A list of new errors, if any were found.
     """
-    errors = []
-    for entry in entries:
+    return _run(DataTypesValidator, entries, options_map)
+
+
+def validate_data_types_iter(entries, options_map, errors):
+    """Check the data types of the attributes of a stream of entries.
+
+    Args:
+      entries: An iterable of directives.
+      options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(DataTypesValidator, entries, options_map, errors)
+
+
+class DataTypesValidator(Validator):
+    """The validator of validate_data_types()."""
+
+    def handlers(self):
+        return [(object, self.check_types)]
+
+    def check_types(self, entry):
         try:
             data.sanity_check_types(
-                entry, options_map["allow_deprecated_none_for_tags_and_links"])
+                entry, self.options_map["allow_deprecated_none_for_tags_and_links"])
         except AssertionError as exc:
-            errors.append(
+            self.errors.append(
                 ValidationError(entry.meta,
                                 "Invalid data types: {}".format(exc),
                                 entry))
-    return errors
 
 
 def validate_check_transaction_balances(entries, options_map):
@@ -336,30 +688,49 @@ def validate_check_transaction_balances(entries, options_map):
     Returns:
       A list of new errors, if any were found.
     """
+    return _run(TransactionBalancesValidator, entries, options_map)
+
+
+def validate_check_transaction_balances_iter(entries, options_map, errors):
+    """Check again that all transaction postings of a stream of entries balance.
+
+    Args:
+      entries: An iterable of directives.
+      options_map: An options map.
+      errors: A list to append the new errors to.
+    Yields:
+      The same directives.
+    """
+    return _run_iter(TransactionBalancesValidator, entries, options_map, errors)
+
+
+class TransactionBalancesValidator(Validator):
+    """The validator of validate_check_transaction_balances()."""
+
     # Note: this is a bit slow; we could limit our checks to the original
     # transactions by using the hash function in the loader.
-    errors = []
-    for entry in entries:
-        if isinstance(entry, Transaction):
-            # IMPORTANT: This validation is _crucial_ and cannot be skipped.
-            # This is where we actually detect and warn on unbalancing
-            # transactions. This _must_ come after the user routines, because
-            # unbalancing input is legal, as those types of transactions may be
-            # "fixed up" by a user-plugin. In other words, we want to allow
-            # users to input unbalancing transactions as long as the final
-            # transactions objects that appear on the stream (after processing
-            # the plugins) are balanced. See {9e6c14b51a59}.
-            #
-            # Detect complete sets of postings that have residual balance;
-            residual = interpolate.compute_residual(entry.postings)
-            tolerances = interpolate.infer_tolerances(entry.postings, options_map)
-            if not residual.is_small(tolerances):
-                errors.append(
-                    ValidationError(entry.meta,
-                                    "Transaction does not balance: {}".format(residual),
-                                    entry))
 
-    return errors
+    def handlers(self):
+        return [(Transaction, self.check_transaction)]
+
+    def check_transaction(self, entry):
+        # IMPORTANT: This validation is _crucial_ and cannot be skipped.
+        # This is where we actually detect and warn on unbalancing
+        # transactions. This _must_ come after the user routines, because
+        # unbalancing input is legal, as those types of transactions may be
+        # "fixed up" by a user-plugin. In other words, we want to allow
+        # users to input unbalancing transactions as long as the final
+        # transactions objects that appear on the stream (after processing
+        # the plugins) are balanced. See {9e6c14b51a59}.
+        #
+        # Detect complete sets of postings that have residual balance;
+        residual = interpolate.compute_residual(entry.postings)
+        tolerances = interpolate.infer_tolerances(entry.postings, self.options_map)
+        if not residual.is_small(tolerances):
+            self.errors.append(
+                ValidationError(entry.meta,
+                                "Transaction does not balance: {}".format(residual),
+                                entry))
 
 
 # A list of reasonably fast validations to always run by default.
@@ -380,30 +751,105 @@ HARDCORE_VALIDATIONS = [validate_data_types]
 # The list of validations to run.
 VALIDATIONS = BASIC_VALIDATIONS
 
+# A mapping of validation functions to the class of their validator, which runs
+# within a single pass over the directives, along with the others, or on a
+# stream of directives. Validations absent from this mapping, e.g. extra
+# validations, are run separately, and can't be run on a stream.
+VALIDATORS = {
+    validate_open_close: OpenCloseValidator,
+    validate_active_accounts: ActiveAccountsValidator,
+    validate_currency_constraints: CurrencyConstraintsValidator,
+    validate_duplicate_balances: DuplicateBalancesValidator,
+    validate_duplicate_commodities: DuplicateCommoditiesValidator,
+    validate_documents_paths: DocumentsPathsValidator,
+    validate_check_transaction_balances: TransactionBalancesValidator,
+    validate_data_types: DataTypesValidator,
+}
+
 
 def validate(entries, options_map, log_timings=None, extra_validations=None):
     """Perform all the standard checks on parsed contents.
 
+    The validations which have a validator are run together in a single pass
+    over the entries, and the others separately. The errors are returned in the
+    order of the validations regardless. If timings are logged, the running time
+    of the handlers of each validator is accumulated over the pass and logged as
+    that of its validation.
+
     Args:
       entries: A list of directives.
       unused_options_map: An options map.
       log_timings: An optional function to use for logging the time of individual
-        operations.
+        operations, or a profiler.Profiler instance.
       extra_validations: A list of extra validation functions to run after loading
         this list of entries.
     Returns:
       A list of new errors, if any were found.
     """
-    validation_tests = VALIDATIONS
-    if extra_validations:
-        validation_tests += extra_validations
+    validation_tests = VALIDATIONS + (extra_validations or [])
 
-    # Run various validation routines define above.
+    validators = {}
+    for validation_function in validation_tests:
+        validator_class = VALIDATORS.get(validation_function)
+        if validator_class is not None and validation_function not in validators:
+            validators[validation_function] = validator_class(options_map)
+    if log_timings:
+        validators = {validation_function: _TimedValidator(validator)
+                      for validation_function, validator in validators.items()}
+    run_validators(list(validators.values()), entries)
+
+    # Run the other validation routines and collect the errors in order.
     errors = []
     for validation_function in validation_tests:
-        with misc_utils.log_time('function: {}'.format(validation_function.__name__),
-                                 log_timings, indent=2):
-            new_errors = validation_function(entries, options_map)
+        validator = validators.get(validation_function)
+        if validator is not None:
+            new_errors = validator.errors
+            if log_timings:
+                profiler.log_elapsed('function: {}'.format(validation_function.__name__),
+                                     validator.time, log_timings, indent=2,
+                                     entries=entries)
+        else:
+            with profiler.log_stage('function: {}'.format(validation_function.__name__),
+                                    log_timings, indent=2, entries=entries):
+                new_errors = validation_function(entries, options_map)
         errors.extend(new_errors)
 
     return errors
+
+
+def validate_iter(entries, options_map, errors, extra_validations=None):
+    """Perform all the standard checks on a stream of entries.
+
+    The validations which have a validator are run together in a single pass
+    over the stream. The others are run on the list of all the entries once the
+    stream has been exhausted.
+
+    Args:
+      entries: An iterable of sorted directives.
+      options_map: An options map.
+      errors: A list to append the new errors to.
+      extra_validations: A list of extra validation functions to run after loading
+        this list of entries.
+    Yields:
+      The same directives.
+    """
+    validators = []
+    batch_validations = []
+    for validation_function in VALIDATIONS + (extra_validations or []):
+        validator_class = VALIDATORS.get(validation_function)
+        if validator_class is None:
+            batch_validations.append(validation_function)
+        else:
+            validators.append(validator_class(options_map, errors))
+    entries = run_validators_iter(validators, entries)
+
+    if not batch_validations:
+        yield from entries
+        return
+
+    all_entries = []
+    for entry in entries:
+        all_entries.append(entry)
+        yield entry
+    for validation_function in batch_validations:
+        errors.extend(validation_function(all_entries, options_map))
@@ -9,6 +9,7 @@ from beancount.core import data
 from beancount.parser import cmptest
 from beancount.ops import validation
 from beancount import loader
+from beancount.utils import profiler
 
 
 class TestValidateOpenClose(cmptest.TestCase):
@@ -256,6 +257,39 @@ class TestValidateCurrencyConstraints(cmptest.TestCase):
                                      'expected' in entry.tags)],
                                 [error.entry for error in errors])
 
+    @loader.load_doc(expect_errors=True)
+    def test_validate_currency_constraints__before_open(self, entries, _, options_map):
+        """
+        option "plugin_processing_mode" "raw"
+
+        2014-01-01 open  Assets:Account1    USD
+
+        2014-01-02 * "Before the open directive" #expected
+          Assets:Account2             1 CAD
+          Assets:Account1            -1 CAD
+
+        2014-01-03 open  Assets:Account2    USD
+
+        2014-01-04 * "After the open directive" #expected
+          Assets:Account2             1 CAD
+          Assets:Account1            -1 USD
+        """
+        errors = validation.validate_currency_constraints(entries, options_map)
+        self.assertEqual([
+            "Invalid currency CAD for account 'Assets:Account2'",
+            "Invalid currency CAD for account 'Assets:Account1'",
+            "Invalid currency CAD for account 'Assets:Account2'",
+        ], [error.message for error in errors])
+
+        # The constraints only apply from the open directive on in a stream.
+        iter_errors = []
+        self.assertEqual(entries, list(validation.validate_currency_constraints_iter(
+            iter(entries), options_map, iter_errors)))
+        self.assertEqual([
+            "Invalid currency CAD for account 'Assets:Account1'",
+            "Invalid currency CAD for account 'Assets:Account2'",
+        ], [error.message for error in iter_errors])
+
 
 class TestValidateDocumentPaths(cmptest.TestCase):
 
@@ -341,6 +375,75 @@ class TestValidate(cmptest.TestCase):
         self.assertEqual(1, len(validation_errors))
         self.assertRegex(validation_errors[0].message, 'Invalid currency')
 
+    @loader.load_doc(expect_errors=True)
+    def test_validate_single_pass(self, entries, _, options_map):
+        """
+        option "plugin_processing_mode" "raw"
+
+        2014-01-01 open Assets:Investments:Cash
+        2014-01-01 open Assets:Investments:Cash
+
+        2014-06-23 * "Unbalanced"
+          Assets:Investments:Stock    1 AAPL
+          Assets:Investments:Cash    -1 USD
+
+        2014-07-01 balance Assets:Investments:Cash  1 USD
+        2014-07-01 balance Assets:Investments:Cash  2 USD
+        """
+        class CountingList(list):
+            num_iterations = 0
+            def __iter__(self):
+                CountingList.num_iterations += 1
+                return super().__iter__()
+
+        validation_errors = validation.validate(CountingList(entries), options_map)
+        self.assertEqual(1, CountingList.num_iterations)
+
+        # The errors are in the order of the validations.
+        expected_messages = ['Duplicate open directive',
+                             'Invalid reference to unknown account',
+                             'Duplicate balance assertion',
+                             'Transaction does not balance']
+        self.assertEqual(len(expected_messages), len(validation_errors))
+        for expected_message, error in zip(expected_messages, validation_errors):
+            self.assertRegex(error.message, expected_message)
+        self.assertEqual(
+            [error
+             for validation_function in validation.VALIDATIONS
+             for error in validation_function(entries, options_map)],
+            validation_errors)
+
+        # The time of each validation is reported, even within a single pass.
+        with profiler.Profiler() as prof:
+            timed_errors = validation.validate(CountingList(entries), options_map, prof)
+        self.assertEqual(2, CountingList.num_iterations)
+        self.assertEqual(validation_errors, timed_errors)
+        self.assertEqual(['function: {}'.format(validation_function.__name__)
+                          for validation_function in validation.VALIDATIONS],
+                         [stage.name for stage in prof.root.children])
+        for stage in prof.root.children:
+            self.assertGreater(stage.time, 0)
+            self.assertEqual(len(entries), stage.entries_in)
+
+
+class TestDispatch(unittest.TestCase):
+
+    def test_dispatch(self):
+        class RecordingValidator(validation.Validator):
+            def handlers(self):
+                return [(data.Open, lambda entry: self.errors.append(('open', entry))),
+                        (object, lambda entry: self.errors.append(('all', entry)))]
+
+        meta = data.new_metadata('<test>', 0)
+        date = datetime.date(2014, 1, 1)
+        open_entry = data.Open(meta, date, 'Assets:Cash', None, None)
+        note_entry = data.Note(meta, date, 'Assets:Cash', 'Comment', None, None)
+        validator = RecordingValidator({})
+        self.assertEqual([open_entry, note_entry], list(validation.run_validators_iter(
+            [validator], iter([open_entry, note_entry]))))
+        self.assertEqual([('open', open_entry), ('all', open_entry), ('all', note_entry)],
+                         validator.errors)
+
 
 class TestValidateTolerances(cmptest.TestCase):
 
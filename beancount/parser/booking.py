@@ -31,10 +31,7 @@ def book(incomplete_entries, options_map):
         errors: New errors produced during interpolation.
     """
     # Get the list of booking methods for each account.
-    booking_methods = collections.defaultdict(lambda: options_map["booking_method"])
-    for entry in incomplete_entries:
-        if isinstance(entry, data.Open) and entry.booking:
-            booking_methods[entry.account] = entry.booking
+    booking_methods = get_booking_methods(incomplete_entries, options_map)
 
     # Do the booking here!
     entries, booking_errors = booking_full.book(incomplete_entries, options_map,
@@ -46,6 +43,73 @@ def book(incomplete_entries, options_map):
     return entries, (booking_errors + missing_errors)
 
 
+def book_iter(incomplete_entries, options_map, errors):
+    """Book inventory lots and complete the positions of a stream of entries.
+
+    This is the incremental form of book(), for bounded-memory processing. The
+    booking method of each account is taken from its Open directive as it goes
+    by, which sorts before the uses of the account. Errors are produced in the
+    order of the entries and not grouped by kind as in book().
+
+    Args:
+      incomplete_entries: An iterable of sorted directives, with some postings
+        possibly left with incomplete amounts as produced by the parser.
+      options_map: An options dict as produced by the parser.
+      errors: A list to append the errors produced to.
+    Yields:
+      The completed entries, with all their postings completed.
+    """
+    booking_methods = collections.defaultdict(lambda: options_map["booking_method"])
+    def track_booking_methods(entries):
+        for entry in entries:
+            if isinstance(entry, data.Open) and entry.booking:
+                booking_methods[entry.account] = entry.booking
+            yield entry
+
+    balances = collections.defaultdict(inventory.Inventory)
+    for entry in booking_full.book_iter(track_booking_methods(incomplete_entries),
+                                        options_map, booking_methods, balances, errors):
+        if isinstance(entry, data.Transaction):
+            errors.extend(validate_missing_eliminated([entry], options_map))
+        yield entry
+
+
+def get_booking_methods(entries, options_map):
+    """Get the booking method of each account.
+
+    Args:
+      entries: A list of directives.
+      options_map: An options dict as produced by the parser.
+    Returns:
+      A defaultdict of account name to its booking method, defaulting to the
+      method from the options.
+    """
+    booking_methods = collections.defaultdict(lambda: options_map["booking_method"])
+    for entry in entries:
+        if isinstance(entry, data.Open) and entry.booking:
+            booking_methods[entry.account] = entry.booking
+    return booking_methods
+
+
+def compute_booked_balances(booked_entries):
+    """Compute the balances resulting from booking a list of entries.
+
+    This reproduces the running balances booking_full.book() holds after
+    processing the entries it returned, and allows resuming booking from there.
+
+    Args:
+      booked_entries: A list of directives, as output by book().
+    Returns:
+      A defaultdict of account name to Inventory balances.
+    """
+    balances = collections.defaultdict(inventory.Inventory)
+    for entry in booked_entries:
+        if isinstance(entry, data.Transaction):
+            for posting in entry.postings:
+                balances[posting.account].add_position(posting)
+    return balances
+
+
 def validate_missing_eliminated(entries, unused_options_map):
     """Validate that all the missing bits of postings have been eliminated.
 
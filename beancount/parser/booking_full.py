@@ -73,7 +73,6 @@ __copyright__ = "Copyright (C) 2015-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
 import collections
-import copy
 import enum
 from decimal import Decimal
 from typing import Text
@@ -102,18 +101,18 @@ def unique_label() -> Text:
 SelfReduxError = collections.namedtuple('SelfReduxError', 'source message entry')
 
 
-def book(entries, options_map, methods):
+def book(entries, options_map, methods, balances=None):
     """Interpolate missing data from the entries using the full historical algorithm.
     See the internal implementation _book() for details.
     This method only stripes some of the return values.
 
     See _book() for arguments and return values.
     """
-    entries, errors, _ = _book(entries, options_map, methods)
+    entries, errors, _ = _book(entries, options_map, methods, balances)
     return entries, errors
 
 
-def _book(entries, options_map, methods):
+def _book(entries, options_map, methods, balances=None):
     """Interpolate missing data from the entries using the full historical algorithm.
 
     Args:
@@ -122,80 +121,112 @@ def _book(entries, options_map, methods):
       options_map: An options dict as produced by the parser.
       methods: A mapping of account name to their corresponding booking
         method.
+      balances: An optional dict of account name to the Inventory balances
+        before the first entry, e.g. to continue booking after a list of
+        already booked entries. This is updated in-place. If None, start from
+        empty balances.
     Returns:
       A triple of
         entries: A list of interpolated entries with all their postings completed.
         errors: New errors produced during interpolation.
         balances: A dict of account name and resulting balances.
     """
-    new_entries = []
     errors = []
-    balances = collections.defaultdict(inventory.Inventory)
+    if balances is None:
+        balances = collections.defaultdict(inventory.Inventory)
+    new_entries = list(book_iter(entries, options_map, methods, balances, errors))
+    return new_entries, errors, balances
+
+
+def book_iter(entries, options_map, methods, balances, errors):
+    """Interpolate missing data from a stream of entries.
+
+    This is the incremental form of _book(), which processes the entries one at
+    a time and never holds on to them.
+
+    Args:
+      entries: An iterable of directives, in sorted order, with some postings
+        possibly left with incomplete amounts as produced by the parser.
+      options_map: An options dict as produced by the parser.
+      methods: A mapping of account name to their corresponding booking
+        method. This may be updated while iterating.
+      balances: A dict of account name to the Inventory balances before the
+        first entry, which gets updated in-place.
+      errors: A list to append the errors produced during interpolation to.
+    Yields:
+      The interpolated entries with all their postings completed.
+    """
     for entry in entries:
         if isinstance(entry, Transaction):
-            # Group postings by currency.
-            refer_groups, cat_errors = categorize_by_currency(entry, balances)
-            if cat_errors:
-                errors.extend(cat_errors)
-                continue
-            posting_groups = replace_currencies(entry.postings, refer_groups)
-
-            # Get the list of tolerances.
-            tolerances = interpolate.infer_tolerances(entry.postings, options_map)
-
-            # Resolve reductions to a particular lot in their inventory balance.
-            repl_postings = []
-            for currency, group_postings in posting_groups:
-                # Important note: the group of 'postings' here is a subset of
-                # that from entry.postings, and may include replicated
-                # auto-postings. Never use entry.postings going forward.
-
-                # (See http://furius.ca/beancount/doc/self-reductions for an
-                # explanation of how we will eventually treat each currency
-                # group in this block; Summary: We will need to run the
-                # reductions prior to the augmentations in order to support
-                # reductions between the postings of a single transaction.)
-                # Disabled.
-                if False:  # pylint: disable=using-constant-test
-                    if has_self_reduction(group_postings, methods):
-                        errors.append(SelfReduxError(
-                            entry.meta, "Self-reduction is not allowed", entry))
-
-                # Perform booking reductions, that is, match postings which
-                # reduce the ante-inventory of their accounts to an existing
-                # position in the inventory against a possibly incomplete
-                # CostSpec specification, and replace the postings' cost to the
-                # fully-specified (with a date & label) existing Cost instance.
-                # Note that 'balances' remains untouched.
-                #
-                # Also note that 'booked_postings' may include augmenting
-                # postings whose 'cost' attribute has been left to a CostSpec
-                # instance. Therefore, the postings held-at-cost may hold a
-                # mixture of Cost and CostSpec instances. This is necessary to
-                # let the interpolation do its magic on partially incomplete
-                # CostSpec instances below.
-                (booked_postings,
-                 booking_errors) = book_reductions(entry, group_postings, balances,
-                                                   methods)
-
-                # If there were any errors, skip this group of postings.
-                if booking_errors:
-                    errors.extend(booking_errors)
+            if is_simple_transaction(entry):
+                # Fast path for transactions without any cost, price or missing
+                # number, which only need to be grouped by currency, as below.
+                tolerances = interpolate.infer_tolerances(entry.postings, options_map)
+                repl_postings = group_postings_by_currency(entry.postings)
+            else:
+                # Group postings by currency.
+                refer_groups, cat_errors = categorize_by_currency(entry, balances)
+                if cat_errors:
+                    errors.extend(cat_errors)
                     continue
+                posting_groups = replace_currencies(entry.postings, refer_groups)
+
+                # Get the list of tolerances.
+                tolerances = interpolate.infer_tolerances(entry.postings, options_map)
+
+                # Resolve reductions to a particular lot in their inventory balance.
+                repl_postings = []
+                for currency, group_postings in posting_groups:
+                    # Important note: the group of 'postings' here is a subset of
+                    # that from entry.postings, and may include replicated
+                    # auto-postings. Never use entry.postings going forward.
+
+                    # (See http://furius.ca/beancount/doc/self-reductions for an
+                    # explanation of how we will eventually treat each currency
+                    # group in this block; Summary: We will need to run the
+                    # reductions prior to the augmentations in order to support
+                    # reductions between the postings of a single transaction.)
+                    # Disabled.
+                    if False:  # pylint: disable=using-constant-test
+                        if has_self_reduction(group_postings, methods):
+                            errors.append(SelfReduxError(
+                                entry.meta, "Self-reduction is not allowed", entry))
+
+                    # Perform booking reductions, that is, match postings which
+                    # reduce the ante-inventory of their accounts to an existing
+                    # position in the inventory against a possibly incomplete
+                    # CostSpec specification, and replace the postings' cost to the
+                    # fully-specified (with a date & label) existing Cost instance.
+                    # Note that 'balances' remains untouched.
+                    #
+                    # Also note that 'booked_postings' may include augmenting
+                    # postings whose 'cost' attribute has been left to a CostSpec
+                    # instance. Therefore, the postings held-at-cost may hold a
+                    # mixture of Cost and CostSpec instances. This is necessary to
+                    # let the interpolation do its magic on partially incomplete
+                    # CostSpec instances below.
+                    (booked_postings,
+                     booking_errors) = book_reductions(entry, group_postings, balances,
+                                                       methods)
+
+                    # If there were any errors, skip this group of postings.
+                    if booking_errors:
+                        errors.extend(booking_errors)
+                        continue
 
-                # Interpolate missing numbers from all postings. This
-                # includes partially incomplete CostSpec instances remaining
-                # on augmenting postings. After this interpolation, all
-                # 'inter_postings' consists entirely of postings holding
-                # instances of Cost.
-                (inter_postings,
-                 interpolation_errors,
-                 interpolated) = interpolate_group(booked_postings, balances, currency,
-                                                   tolerances)
+                    # Interpolate missing numbers from all postings. This
+                    # includes partially incomplete CostSpec instances remaining
+                    # on augmenting postings. After this interpolation, all
+                    # 'inter_postings' consists entirely of postings holding
+                    # instances of Cost.
+                    (inter_postings,
+                     interpolation_errors,
+                     interpolated) = interpolate_group(booked_postings, balances, currency,
+                                                       tolerances)
 
-                if interpolation_errors:
-                    errors.extend(interpolation_errors)
-                repl_postings.extend(inter_postings)
+                    if interpolation_errors:
+                        errors.extend(interpolation_errors)
+                    repl_postings.extend(inter_postings)
 
             # Replace postings by interpolated ones.
             meta = entry.meta.copy()
@@ -213,9 +244,49 @@ def _book(entries, options_map, methods):
                 balance = balances[posting.account]
                 balance.add_position(posting)
 
-        new_entries.append(entry)
+        yield entry
+
+
+def is_simple_transaction(entry):
+    """Return true if a transaction needs no booking nor interpolation.
+
+    That is the case of transactions whose postings all have complete units,
+    and no cost nor price. Booking those only groups their postings by currency.
+
+    Args:
+      entry: An instance of Transaction.
+    Returns:
+      A boolean.
+    """
+    for posting in entry.postings:
+        if posting.cost is not None or posting.price is not None:
+            return False
+        units = posting.units
+        if (type(units) is not Amount or
+            units.number is MISSING or
+            not isinstance(units.currency, str)):
+            return False
+    return True
 
-    return new_entries, errors, balances
+
+def group_postings_by_currency(postings):
+    """Order simple postings by currency group, as the booking does.
+
+    The groups are ordered by the first posting of their currency, and the
+    postings keep their relative order within each group.
+
+    Args:
+      postings: A list of Posting instances with complete units, and no cost
+        nor price.
+    Returns:
+      A new list of the same Posting instances.
+    """
+    first_index = {}
+    for index, posting in enumerate(postings):
+        first_index.setdefault(posting.units.currency, index)
+    if len(first_index) == 1:
+        return list(postings)
+    return sorted(postings, key=lambda posting: first_index[posting.units.currency])
 
 
 # An error raised if we failed to bucket a posting to a particular currency.
@@ -534,9 +605,9 @@ def book_reductions(entry, group_postings, balances,
     """
     errors = []
 
-    # A local copy of the balances dictionary which is updated just for the
-    # duration of this function's updates, in order to take into account the
-    # cumulative effect of all the postings inferred here
+    # Local overlays of the balances which are updated just for the duration
+    # of this function's updates, in order to take into account the cumulative
+    # effect of all the postings inferred here
     local_balances = {}
 
     empty = inventory.Inventory()
@@ -548,14 +619,18 @@ def book_reductions(entry, group_postings, balances,
         account = posting.account
 
         # Note: We ensure there is no mutation on 'balances' to keep this
-        # function without side-effects. Note that we may be able to optimize
-        # performance later on by giving up this property.
+        # function without side-effects. The local balance is an overlay which
+        # only records the reductions on top of the shared balance, so this
+        # costs in proportion to the size of the transaction rather than to the
+        # number of lots of the account.
         #
         # Also note that if there is no existing balance, then won't be any lot
         # reduction because none of the postings will be able to match against
         # any currencies of the balance.
-        previous_balance = balances.get(account, empty)
-        balance = local_balances.setdefault(account, copy.copy(previous_balance))
+        balance = local_balances.get(account)
+        if balance is None:
+            balance = local_balances[account] = inventory.OverlayInventory(
+                balances.get(account, empty))
 
         # Check if this is a lot held at cost.
         if costspec is None or units.number is MISSING:
@@ -570,30 +645,21 @@ def book_reductions(entry, group_postings, balances,
                 balance.is_reduced_by(units)):
                 # This posting is a reduction.
 
-                # Match the positions.
+                # Match the positions. Look up the lots of the currency in
+                # the index of the balance, which narrows them down by cost
+                # currency and date, rather than going through all of it.
                 cost_number = compute_cost_number(costspec, units)
-                matches = []
-                for position in balance:
-                    # Skip inventory contents of a different currency.
-                    if (units.currency and
-                        position.units.currency != units.currency):
-                        continue
-                    # Skip balance positions not held at cost.
-                    if position.cost is None:
-                        continue
-                    if (cost_number is not None and
-                        position.cost.number != cost_number):
-                        continue
-                    if (isinstance(costspec.currency, str) and
-                        position.cost.currency != costspec.currency):
-                        continue
-                    if (costspec.date and
-                        position.cost.date != costspec.date):
-                        continue
-                    if (costspec.label and
-                        position.cost.label != costspec.label):
-                        continue
-                    matches.append(position)
+                if units.currency:
+                    matches = balance.get_lots(
+                        units.currency,
+                        costspec.currency if isinstance(costspec.currency, str) else None,
+                        costspec.date)
+                    if cost_number is not None or costspec.label:
+                        matches = [position for position in matches
+                                   if matches_cost_spec(position, costspec, cost_number)]
+                else:
+                    matches = [position for position in balance
+                               if matches_cost_spec(position, costspec, cost_number)]
 
                 # Check for ambiguous matches.
                 if len(matches) == 0:
@@ -647,6 +713,32 @@ def book_reductions(entry, group_postings, balances,
     return booked_postings, errors
 
 
+def matches_cost_spec(position, costspec, cost_number):
+    """Return true if a position of an inventory matches a cost specification.
+
+    Args:
+      position: An instance of Position.
+      costspec: An instance of CostSpec.
+      cost_number: A Decimal, the per-unit cost number computed from the spec,
+        or None if it isn't specified.
+    Returns:
+      A boolean, true if the position is held at a matching cost.
+    """
+    cost = position.cost
+    # Skip balance positions not held at cost.
+    if cost is None:
+        return False
+    if cost_number is not None and cost.number != cost_number:
+        return False
+    if isinstance(costspec.currency, str) and cost.currency != costspec.currency:
+        return False
+    if costspec.date and cost.date != costspec.date:
+        return False
+    if costspec.label and cost.label != costspec.label:
+        return False
+    return True
+
+
 def compute_cost_number(costspec, units):
     """Given a CostSpec, return the cost number, if possible to compute.
 
@@ -1050,6 +1050,26 @@ class TestComputeCostNumber(unittest.TestCase):
                 amount.from_string('-12 HOOL')))
 
 
+class TestMatchesCostSpec(unittest.TestCase):
+
+    def test_matches_cost_spec(self):
+        date = datetime.date(2016, 1, 1)
+        pos = Position(A('10 HOOL'), Cost(D('100'), 'USD', date, 'lot'))
+        for costspec, cost_number, expected in [
+                (CostSpec(MISSING, None, MISSING, None, None, False), None, True),
+                (CostSpec(D('100'), None, 'USD', date, 'lot', False), D('100'), True),
+                (CostSpec(D('101'), None, MISSING, None, None, False), D('101'), False),
+                (CostSpec(MISSING, None, 'CAD', None, None, False), None, False),
+                (CostSpec(MISSING, None, MISSING, date.replace(day=2), None, False),
+                 None, False),
+                (CostSpec(MISSING, None, MISSING, None, 'other', False), None, False),
+        ]:
+            self.assertEqual(expected, bf.matches_cost_spec(pos, costspec, cost_number))
+        self.assertFalse(bf.matches_cost_spec(
+            Position(A('10 HOOL'), None),
+            CostSpec(MISSING, None, MISSING, None, None, False), None))
+
+
 class TestParseBookingOptions(cmptest.TestCase):
 
     @loader.load_doc()
@@ -1250,7 +1270,11 @@ class _BookingTestBase(unittest.TestCase):
                                          test_utils.record(bm.handle_ambiguous_matches))
         reduce_patch = mock.patch.object(bf, 'book_reductions',
                                          test_utils.record(bf.book_reductions))
-        with handle_patch as handle_mock, reduce_patch as reduce_mock:
+        # Disable the fast path for simple transactions, which doesn't call
+        # book_reductions().
+        simple_patch = mock.patch.object(bf, 'is_simple_transaction',
+                                         return_value=False)
+        with handle_patch as handle_mock, reduce_patch as reduce_mock, simple_patch:
             book_entries, book_errors, balances = bf._book(input_entries, options_map,
                                                            methods)
 
@@ -2066,6 +2090,25 @@ class TestBookAmbiguous(_BookingTestBase):
           Assets:Account         -5 HOOL {101.00 USD, 2015-10-01}
         """
 
+    @book_test(Booking.STRICT)
+    def test_ambiguous__STRICT__total_match_inventory_order(self, _, __):
+        """
+        2015-01-01 * #ante
+          Assets:Account         10 HOOL {100.00 USD, 2020-02-01}
+          Assets:Account          5 HOOL {90.00 USD, 2019-12-01}
+          Assets:Account          3 HOOL {95.00 USD, 2020-03-01, "lot"}
+
+        2020-06-01 * #apply
+          Assets:Account        -18 HOOL {}
+
+        2020-06-01 * #booked
+          Assets:Account        -10 HOOL {100.00 USD, 2020-02-01}
+          Assets:Account         -5 HOOL {90.00 USD, 2019-12-01}
+          Assets:Account         -3 HOOL {95.00 USD, 2020-03-01, "lot"}
+
+        2015-01-01 * #ex
+        """
+
 
 class TestBookAmbiguousFIFO(_BookingTestBase):
 
@@ -2760,6 +2803,82 @@ class TestBookingApi(unittest.TestCase):
             self.assertEqual(entry.postings[1].units, A('-100.00 USD'))
 
 
+class TestSimpleTransactions(unittest.TestCase):
+
+    @parser.parse_doc(allow_incomplete=True)
+    def test_is_simple_transaction(self, entries, _, __):
+        """
+        2015-10-01 * "Simple"
+          Assets:Account1       10.00 USD
+          Assets:Account2       -5.00 CAD
+          Assets:Account3      -10.00 USD
+          Assets:Account4        5.00 CAD
+
+        2015-10-01 * "Auto-posting"
+          Assets:Account1       10.00 USD
+          Assets:Account2
+
+        2015-10-01 * "Price"
+          Assets:Account1       10.00 USD @ 1.20 CAD
+          Assets:Account2      -12.00 CAD
+
+        2015-10-01 * "Cost"
+          Assets:Account1       10 HOOL {1.20 USD}
+          Assets:Account2      -12.00 USD
+
+        2015-10-01 * "Missing currency"
+          Assets:Account1       10.00
+          Assets:Account2      -10.00 USD
+        """
+        self.assertEqual([True, False, False, False, False],
+                         [bf.is_simple_transaction(entry) for entry in entries])
+
+        postings = entries[0].postings
+        self.assertEqual([postings[0], postings[2], postings[1], postings[3]],
+                         bf.group_postings_by_currency(postings))
+
+    @loader.load_doc()
+    def test_book_simple_transactions(self, entries, _, options_map):
+        """
+        2015-01-01 open Assets:Account1
+        2015-01-01 open Assets:Account2
+        2015-01-01 open Assets:Account3
+        2015-01-01 open Assets:Account4
+
+        2015-10-01 * "Simple, multiple currencies"
+          Assets:Account1       10.00 USD
+          Assets:Account2       -5.0 CAD
+          Assets:Account3      -10.00 USD
+          Assets:Account4        5.0 CAD
+
+        2015-10-02 * "Simple"
+          Assets:Account1       10 USD
+          Assets:Account2      -10 USD
+
+        2015-10-03 * "Auto-posting"
+          Assets:Account1       10.00 USD
+          Assets:Account2
+        """
+        # Booking through the fast path produces the same result as the full
+        # booking.
+        entries = [entry._replace(meta={key: value
+                                        for key, value in entry.meta.items()
+                                        if key != interpolate.AUTOMATIC_TOLERANCES})
+                   for entry in entries]
+        methods = collections.defaultdict(lambda: Booking.STRICT)
+        booked_entries, errors, balances = bf._book(entries, options_map, methods)
+        with mock.patch.object(bf, 'is_simple_transaction', return_value=False):
+            expected_entries, expected_errors, expected_balances = bf._book(
+                entries, options_map, methods)
+        self.assertEqual(expected_entries, booked_entries)
+        self.assertEqual([entry.meta for entry in expected_entries],
+                         [entry.meta for entry in booked_entries])
+        self.assertEqual(expected_errors, errors)
+        self.assertEqual(expected_balances, balances)
+        self.assertEqual({'USD': D('0.005'), 'CAD': D('0.05')},
+                         booked_entries[4].meta[interpolate.AUTOMATIC_TOLERANCES])
+
+
 # FIXME: TODO - Rewrite these tests. See average_test.py.
 class TestBook(unittest.TestCase):
 
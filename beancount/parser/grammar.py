@@ -128,7 +128,7 @@ class Builder(lexer.LexBuilder):
         # Accumulated and unprocessed options.
         self.options = copy.deepcopy(options.OPTIONS_DEFAULTS)
 
-        # A mapping of all the accounts created.
+        # A mapping of all the accounts created, to their interned string.
         self.accounts = {}
 
         # Make the account regexp more restrictive than the default: check
@@ -243,8 +243,12 @@ class Builder(lexer.LexBuilder):
             self.errors.append(
                 ParserError(meta, "Invalid account name: {}".format(account), None))
         # Intern account names. This should reduces memory usage a
-        # fair bit because these strings are repeated liberally.
-        return self.accounts.setdefault(account, account)
+        # fair bit because these strings are repeated liberally. They are
+        # interned process-wide, so that they are also shared across files.
+        interned = self.accounts.get(account)
+        if interned is None:
+            interned = self.accounts[account] = sys.intern(account)
+        return interned
 
     def pipe_deprecated_error(self, filename, lineno):
         """Issue a 'Pipe deprecated' error.
@@ -422,6 +426,10 @@ class Builder(lexer.LexBuilder):
         Returns:
           An instance of Amount.
         """
+        # Intern currencies, like accounts.
+        if type(currency) is str:
+            currency = sys.intern(currency)
+
         # Update the mapping that stores the parsed precisions.
         # Note: This is relatively slow, adds about 70ms because of number.as_tuple().
         self._dcupdate(number, currency)
@@ -438,6 +446,10 @@ class Builder(lexer.LexBuilder):
           A triple of (Decimal, Decimal, currency string) to be processed further when
           creating the final per-unit cost number.
         """
+        # Intern currencies, like accounts.
+        if type(currency) is str:
+            currency = sys.intern(currency)
+
         # Update the mapping that stores the parsed precisions.
         # Note: This is relatively slow, adds about 70ms because of number.as_tuple().
         self._dcupdate(number_per, currency)
@@ -581,6 +593,9 @@ class Builder(lexer.LexBuilder):
         else:
             booking = None
 
+        if currencies:
+            currencies = [sys.intern(currency) for currency in currencies]
+
         entry = Open(meta, date, account, currencies, booking)
         if error:
             self.errors.append(ParserError(meta,
@@ -616,7 +631,7 @@ class Builder(lexer.LexBuilder):
           A new Close object.
         """
         meta = new_metadata(filename, lineno, kvlist)
-        return Commodity(meta, date, currency)
+        return Commodity(meta, date, sys.intern(currency))
 
     def pad(self, filename, lineno, date, account, source_account, kvlist):
         """Process a pad directive.
@@ -702,7 +717,7 @@ class Builder(lexer.LexBuilder):
           A new Price object.
         """
         meta = new_metadata(filename, lineno, kvlist)
-        return Price(meta, date, currency, amount)
+        return Price(meta, date, sys.intern(currency), amount)
 
     def note(self, filename, lineno, date, account, comment, tags_links, kvlist):
         """Process a note directive.
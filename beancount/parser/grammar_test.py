@@ -1246,6 +1246,37 @@ class TestCurrencies(unittest.TestCase):
         """
 
 
+class TestInterning(unittest.TestCase):
+
+    def test_interned_strings(self):
+        input_string = textwrap.dedent("""
+          2014-01-01 open Assets:Investments   HOOL,USD
+          2014-01-01 commodity HOOL
+          2014-01-02 price HOOL  500.00 USD
+          2014-01-03 * "Buy"
+            Assets:Investments    10 HOOL {500.00 USD}
+            Assets:Investments
+        """)
+        # Build the strings dynamically, so they're not constants of the module.
+        filename = ''.join(['interned', '.beancount'])
+        entries1, _, _ = parser.parse_string(input_string, filename)
+        entries2, _, _ = parser.parse_string(input_string, ''.join(filename))
+        for entries in entries1, entries2:
+            open_, commodity, price, txn = entries
+            self.assertIs(open_.currencies[0], commodity.currency)
+            self.assertIs(open_.currencies[0], price.currency)
+            self.assertIs(open_.currencies[1], price.amount.currency)
+            self.assertIs(open_.currencies[0], txn.postings[0].units.currency)
+            self.assertIs(open_.currencies[1], txn.postings[0].cost.currency)
+            self.assertIs(open_.account, txn.postings[0].account)
+            self.assertIs(open_.account, txn.postings[1].account)
+
+        # The strings are also shared across separate parses.
+        self.assertIs(entries1[0].account, entries2[0].account)
+        self.assertIs(entries1[0].currencies[0], entries2[3].postings[0].units.currency)
+        self.assertIs(entries1[0].meta['filename'], entries2[0].meta['filename'])
+
+
 class TestTotalsAndSigns(unittest.TestCase):
 
     @parser.parse_doc(expect_errors=False)
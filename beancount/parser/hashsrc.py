@@ -3,8 +3,8 @@
 __copyright__ = "Copyright (C) 2015-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
-import argparse
 import hashlib
+import os
 import textwrap
 import types
 import warnings
@@ -49,6 +49,29 @@ def hash_parser_source_files():
     return md5.hexdigest()
 
 
+def sources_modified_since(filename):
+    """Check if any of the parser's source files is newer than a file.
+
+    Args:
+      filename: A string, the path of a file, or None.
+    Returns:
+      A boolean, true if a source file was modified after the file, or if the
+      file doesn't exist.
+    """
+    try:
+        mtime = os.stat(filename).st_mtime_ns
+    except (OSError, TypeError):
+        return True
+    for source_filename in PARSER_SOURCE_FILES:
+        fullname = path.join(path.dirname(__file__), source_filename)
+        try:
+            if os.stat(fullname).st_mtime_ns > mtime:
+                return True
+        except OSError:
+            pass
+    return False
+
+
 def check_parser_source_files(parser_module: types.ModuleType):
     """Check the extension module's source hash and issue a warning if the
     current source differs from that of the module.
@@ -57,7 +80,12 @@ def check_parser_source_files(parser_module: types.ModuleType):
     the warning, we're probably running this from an installed based, in which
     case we don't need to check anything (this check is useful only for people
     running directly from source).
+
+    The source files aren't read if they're all older than the extension module,
+    as they can't have changed since it was built.
     """
+    if not sources_modified_since(getattr(parser_module, '__file__', None)):
+        return
     parser_source_hash = hash_parser_source_files()
     if parser_source_hash is None:
         return
@@ -80,6 +108,7 @@ def gen_include():
 
 
 def main():
+    import argparse  # Only used when run as a program.
     parser = argparse.ArgumentParser(description=__doc__.strip())
     args = parser.parse_args()
     print(gen_include())
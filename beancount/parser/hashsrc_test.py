@@ -2,10 +2,13 @@ __copyright__ = "Copyright (C) 2015-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
 
+import os
 import unittest
+from os import path
 
 from beancount.parser import hashsrc
 from beancount.parser import _parser
+from beancount.utils import test_utils
 
 
 class TestHashSource(unittest.TestCase):
@@ -19,6 +22,17 @@ class TestHashSource(unittest.TestCase):
         self.assertTrue(len(_parser.SOURCE_HASH) >= 32)
         hashsrc.check_parser_source_files(_parser)
 
+    def test_sources_modified_since(self):
+        self.assertTrue(hashsrc.sources_modified_since(None))
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'module.so')
+            self.assertTrue(hashsrc.sources_modified_since(filename))
+            with open(filename, 'w'):
+                pass
+            self.assertFalse(hashsrc.sources_modified_since(filename))
+            os.utime(filename, ns=(0, 0))
+            self.assertTrue(hashsrc.sources_modified_since(filename))
+
 
 if __name__ == '__main__':
     unittest.main()
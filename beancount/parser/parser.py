@@ -109,12 +109,17 @@ corresponding expected values.
 __copyright__ = "Copyright (C) 2013-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
+import concurrent.futures
 import contextlib
 import functools
-import inspect
+import heapq
+import os
+import re
 import textwrap
 import io
 import sys
+from os import path
 
 from beancount.parser import _parser
 from beancount.parser import grammar
@@ -122,6 +127,7 @@ from beancount.parser import printer
 from beancount.parser import hashsrc
 from beancount.core import data
 from beancount.core.number import MISSING
+from beancount.utils import misc_utils
 
 # pylint: disable=unused-import
 from beancount.parser.grammar import ParserError
@@ -129,9 +135,14 @@ from beancount.parser.grammar import ParserSyntaxError
 from beancount.parser.grammar import DeprecatedError
 
 
-# When importing the module, always check that the compiled source matched the
-# installed source.
-hashsrc.check_parser_source_files(_parser)
+@functools.lru_cache(maxsize=None)
+def check_parser_source_files():
+    """Check that the compiled parser matches the installed source, once.
+
+    This is done on the first parse rather than when importing this module, so
+    that programs which import the parser without using it don't pay for it.
+    """
+    hashsrc.check_parser_source_files(_parser)
 
 
 def is_posting_incomplete(posting):
@@ -196,7 +207,14 @@ def parse_file(file, report_filename=None, report_firstline=1, **kw):
         # that does not work for io.BytesIO despite it implementing the
         # readinto() method.
         elif not isinstance(file, io.IOBase):
+            if report_filename is None and isinstance(file, str):
+                report_filename = file
             file = ctx.enter_context(open(file, 'rb'))
+        # Intern the filename, which is stored in the metadata of all the
+        # directives, so it is shared with the other uses of the same file.
+        if type(report_filename) is str:
+            report_filename = sys.intern(report_filename)
+        check_parser_source_files()
         builder = grammar.Builder()
         parser = _parser.Parser(builder)
         parser.parse(file, filename=report_filename, lineno=report_firstline, **kw)
@@ -227,6 +245,188 @@ def parse_string(string, report_filename=None, **kw):
     return parse_file(file, report_filename=report_filename, **kw)
 
 
+# The minimum size of a chunk of a file parsed with parse_file_chunked(), in
+# bytes. Smaller files are not split, as it would cost more than it saves.
+MIN_CHUNK_SIZE = 256 * 1024
+
+# A regular expression to scan the input for the lines at which it can be split.
+# Those start with a date or a keyword at column 0. String literals, which may
+# span multiple lines, and comments, are matched so as to skip over them. The
+# 'state' group captures the keywords of the directives which modify the state
+# of the parser for the rest of the input.
+_CHUNK_BOUNDARY_RE = re.compile(
+    rb'"(?:[^"\\]|\\.)*"|;[^\n]*'
+    rb'|^(?:(?P<state>option|pushtag|poptag|pushmeta|popmeta)\b'
+    rb'|(?=[0-9]|plugin\b|include\b))',
+    re.MULTILINE)
+
+
+def split_chunks(contents, num_chunks):
+    """Split the contents of an input file into chunks which can be parsed separately.
+
+    The input is split at the start of top-level directives. The parser's state
+    at the start of each chunk, which is set by the option, pushtag, poptag,
+    pushmeta and popmeta directives which precede it, is reproduced by a
+    prologue of those directives, to be parsed before the chunk.
+
+    Args:
+      contents: A bytes object, the contents of the file.
+      num_chunks: An integer, the desired number of chunks.
+    Returns:
+      A list of (prologue, chunk, lineno) triples, where 'prologue' and 'chunk'
+      are bytes, and 'lineno' is the line number of the start of the chunk in
+      the file. The chunks cover the contents, in order.
+    """
+    # Find the candidate boundaries, and the offsets of the state directives.
+    boundaries = []
+    state_indexes = []
+    for match in _CHUNK_BOUNDARY_RE.finditer(contents):
+        if match.group(0)[:1] in (b'"', b';'):
+            continue
+        if match.group('state'):
+            state_indexes.append(len(boundaries))
+        boundaries.append(match.start())
+
+    # Select the boundaries closest after evenly spaced offsets.
+    starts = [0]
+    for index in range(1, num_chunks):
+        bindex = bisect.bisect_left(boundaries, len(contents) * index // num_chunks)
+        if bindex < len(boundaries) and boundaries[bindex] > starts[-1]:
+            starts.append(boundaries[bindex])
+
+    chunks = []
+    prologue = []
+    state_iter = iter(state_indexes)
+    state_index = next(state_iter, None)
+    lineno = 1
+    for start, end in zip(starts, starts[1:] + [len(contents)]):
+        chunks.append((b''.join(prologue), contents[start:end], lineno))
+        lineno += contents.count(b'\n', start, end)
+
+        # Accumulate the state directives of the chunk, each of which extends to
+        # the next boundary.
+        while state_index is not None and boundaries[state_index] < end:
+            directive_end = (boundaries[state_index + 1]
+                             if state_index + 1 < len(boundaries)
+                             else len(contents))
+            directive = contents[boundaries[state_index]:directive_end]
+            if not directive.endswith(b'\n'):
+                directive += b'\n'
+            prologue.append(directive)
+            state_index = next(state_iter, None)
+    return chunks
+
+
+def _parse_chunk(prologue, chunk, lineno, report_filename, encoding):
+    """Parse a chunk of a file preceded by its prologue. This may run in a worker process.
+
+    Args:
+      prologue: A bytes object, the state directives preceding the chunk.
+      chunk: A bytes object, the chunk of the file.
+      lineno: An integer, the line number of the start of the chunk.
+      report_filename: A string, the name of the file.
+      encoding: A string or None, the encoding to decode the input with.
+    Returns:
+      A triple of (entries, errors, options_map), as per parse_file(). The
+      prologue is assigned the line numbers preceding the chunk.
+    """
+    with misc_utils.disabled_gc():
+        return parse_file(io.BytesIO(prologue + chunk),
+                          report_filename=report_filename,
+                          report_firstline=lineno - prologue.count(b'\n'),
+                          encoding=encoding)
+
+
+def parse_file_chunked(file, report_filename=None, encoding=None, num_chunks=None,
+                       executor=None):
+    """Parse a single beancount input file in chunks, in parallel processes.
+
+    The file is split with split_chunks() and the results of the chunks are
+    merged to produce the same output as parse_file(). The errors issued from
+    the prologue of a chunk, which are also issued from the directives it
+    replicates, and the errors about unbalanced tags and metadata at the end of
+    all chunks but the last one, are discarded.
+
+    Args:
+      file: file object or path to the file to be parsed.
+      report_filename: A string, the name of the file to report, or None, to
+        use the path of the file.
+      encoding: A string or None, the encoding to decode the input with.
+      num_chunks: An integer or None, the number of chunks to split the file
+        into, at most. If None, use the number of CPUs. The file is not split
+        if a single CPU is available.
+      executor: A concurrent.futures.Executor to parse the chunks with, or None,
+        to create a pool of num_chunks processes.
+    Returns:
+      Same as the output of parse_file().
+    """
+    if isinstance(file, str):
+        if report_filename is None:
+            report_filename = file
+        with open(file, 'rb') as infile:
+            contents = infile.read()
+    else:
+        contents = file.read()
+
+    # Parsing in chunks costs about three times the CPU time of a serial parse,
+    # which only pays off with several processors.
+    num_cpus = os.cpu_count() or 1
+    if num_chunks is None or num_cpus < 2:
+        num_chunks = num_cpus
+    num_chunks = min(num_chunks, len(contents) // MIN_CHUNK_SIZE)
+    chunks = split_chunks(contents, num_chunks) if num_chunks > 1 else []
+    if len(chunks) < 2:
+        return parse_file(io.BytesIO(contents), report_filename=report_filename,
+                          encoding=encoding)
+
+    with contextlib.ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(
+                concurrent.futures.ProcessPoolExecutor(max_workers=len(chunks)))
+        # Unpickling the results creates many objects, which triggers useless
+        # collections.
+        stack.enter_context(misc_utils.disabled_gc())
+        results = list(executor.map(_parse_chunk, *zip(*chunks),
+                                    [report_filename] * len(chunks),
+                                    [encoding] * len(chunks)))
+
+    entries_list = []
+    errors = []
+    last_index = len(results) - 1
+    for index, ((_, _, lineno), (src_entries, src_errors, src_options_map)) in enumerate(
+            zip(chunks, results)):
+        entries_list.append(src_entries)
+        for error in src_errors:
+            source = error.source
+            if (source and source.get('filename') == report_filename and
+                source['lineno'] < lineno and
+                not (index == last_index and source['lineno'] == 0)):
+                continue
+            errors.append(error)
+        if index == 0:
+            include, plugin = src_options_map['include'], src_options_map['plugin']
+            dcontext = src_options_map['dcontext']
+        else:
+            include.extend(src_options_map['include'])
+            plugin.extend(src_options_map['plugin'])
+            dcontext.update_from(src_options_map['dcontext'])
+
+    # The options set by the replicated directives are all seen by the last
+    # chunk, and the others are accumulated over all of them.
+    options_map = src_options_map
+    options_map['include'] = include
+    options_map['plugin'] = plugin
+    options_map['dcontext'] = dcontext
+    dcontext.set_commas(options_map['render_commas'])
+
+    # Reproduce the side-effect the builder has in the worker processes.
+    if options_map['insert_pythonpath'] and report_filename:
+        sys.path.insert(0, path.dirname(report_filename))
+
+    entries = list(heapq.merge(*entries_list, key=data.entry_sortkey))
+    return entries, errors, options_map
+
+
 def parse_doc(expect_errors=False, allow_incomplete=False):
     """Factory of decorators that parse the function's docstring as an argument.
 
@@ -253,6 +453,7 @@ def parse_doc(expect_errors=False, allow_incomplete=False):
         Returns:
           A decorated test function.
         """
+        import inspect  # Only used by tests; slow to import.
         filename = inspect.getfile(fun)
         lines, lineno = inspect.getsourcelines(fun)
 
@@ -301,6 +502,8 @@ def parse_many(string, level=0):
     Raises:
       AssertionError: If there are any errors.
     """
+    import inspect  # Only used by tests; slow to import.
+
     # Get the locals in the stack for the callers and produce the final text.
     frame = inspect.stack()[level+1]
     varkwds = frame[0].f_locals
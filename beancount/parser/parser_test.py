@@ -10,6 +10,7 @@ import tempfile
 import textwrap
 import sys
 import subprocess
+from unittest import mock
 
 from pytest import mark
 
@@ -328,6 +329,132 @@ class TestReferenceCounting(unittest.TestCase):
         self.assertEqual(sys.getrefcount(f), 2)
 
 
+class TestParseFileChunked(unittest.TestCase):
+
+    INPUT = textwrap.dedent("""\
+        option "title" "Chunked"
+        option "operating_currency" "USD"
+        plugin "beancount.plugins.auto_accounts"
+
+        2014-01-01 open Assets:Cash
+        pushtag #trip
+        2014-01-02 * "Multi-line
+        2014-01-03 * not a directive
+        ; not a comment"
+          Assets:Cash   1.00 USD
+          Expenses:Food
+        ; A comment with a "quote
+        2014-01-04 * "Lunch" ; "another
+          Assets:Cash   2.000 USD
+          Expenses:Food
+
+        pushmeta location: "Paris"
+        2014-01-05 * "Dinner"
+          Assets:Cash   3 USD
+          Expenses:Food
+        poptag #trip
+        option "operating_currency" "CAD"
+        option "invalid_option" "foo"
+        2014-01-06 * "Breakfast"
+          Assets:Cash   3 USD
+          Expenses:Food
+        poptag #absent
+        popmeta location:
+        include "other.beancount"
+        option "name_assets" "Actifs"
+        2014-01-07 open Actifs:Cash
+        2014-01-07 open Assets:Cash
+        pushtag #leftover
+        2014-01-08 * "Snack"
+          Actifs:Cash   3.1 EUR
+          Expenses:Food
+        2014-01-09 * invalid syntax
+    """).encode('utf8')
+
+    def test_split_chunks(self):
+        chunks = parser.split_chunks(self.INPUT, 100)
+        self.assertEqual(self.INPUT, b''.join(chunk for _, chunk, _ in chunks))
+        for prologue, chunk, lineno in chunks:
+            self.assertEqual(lineno, self.INPUT[:self.INPUT.index(chunk)].count(b'\n') + 1)
+            self.assertRegex(chunk, rb'^([0-9]|[a-z])')
+        starts = [chunk.split(b'\n')[0] for _, chunk, _ in chunks]
+        self.assertNotIn(b'2014-01-03 * not a directive', starts)
+        self.assertIn(b'2014-01-04 * "Lunch" ; "another', starts)
+
+        prologue = chunks[-1][0]
+        self.assertEqual([b'option "title" "Chunked"',
+                          b'option "operating_currency" "USD"',
+                          b'pushtag #trip',
+                          b'pushmeta location: "Paris"',
+                          b'poptag #trip',
+                          b'option "operating_currency" "CAD"',
+                          b'option "invalid_option" "foo"',
+                          b'poptag #absent',
+                          b'popmeta location:',
+                          b'option "name_assets" "Actifs"',
+                          b'pushtag #leftover'],
+                         [line for line in prologue.split(b'\n') if line])
+
+    def test_parse_file_chunked(self):
+        expected_entries, expected_errors, expected_options = parser.parse_file(
+            io.BytesIO(self.INPUT), report_filename='chunked.beancount')
+        self.assertEqual(6, len(expected_errors))
+
+        for num_chunks in 2, 5, 100:
+            with mock.patch.object(parser, 'MIN_CHUNK_SIZE', 1), \
+                 mock.patch.object(parser.os, 'cpu_count', return_value=4):
+                entries, errors, options_map = parser.parse_file_chunked(
+                    io.BytesIO(self.INPUT), report_filename='chunked.beancount',
+                    num_chunks=num_chunks)
+            self.assertEqual(expected_entries, entries)
+            self.assertEqual([(error.source, error.message) for error in expected_errors],
+                             [(error.source, error.message) for error in errors])
+            # Note: The DisplayContext instance does not compare by value.
+            self.assertEqual(str(expected_options['dcontext']),
+                             str(options_map['dcontext']))
+            self.assertEqual(dict(expected_options, dcontext=None),
+                             dict(options_map, dcontext=None))
+
+    def test_parse_file_chunked_small(self):
+        with mock.patch.object(parser, 'parse_file', wraps=parser.parse_file) as parse:
+            entries, errors, options_map = parser.parse_file_chunked(
+                io.BytesIO(self.INPUT), report_filename='chunked.beancount',
+                num_chunks=4)
+            self.assertEqual(1, parse.call_count)
+        self.assertEqual(8, len(entries))
+
+    def test_parse_file_chunked_single_cpu(self):
+        with mock.patch.object(parser, 'MIN_CHUNK_SIZE', 1), \
+             mock.patch.object(parser.os, 'cpu_count', return_value=1), \
+             mock.patch.object(parser, 'parse_file', wraps=parser.parse_file) as parse:
+            entries, errors, options_map = parser.parse_file_chunked(
+                io.BytesIO(self.INPUT), report_filename='chunked.beancount',
+                num_chunks=4)
+            self.assertEqual(1, parse.call_count)
+        self.assertEqual(8, len(entries))
+
+    def test_parse_file_chunked_render_commas(self):
+        # The option is only seen by the last chunk.
+        input_string = textwrap.dedent("""\
+            2014-01-01 open Assets:Cash
+            2014-01-02 * "Lunch"
+              Assets:Cash     -1,234.00 USD
+              Expenses:Food
+            option "render_commas" "TRUE"
+            2014-01-03 * "Dinner"
+              Assets:Cash     -5.00 USD
+              Expenses:Food
+        """).encode('utf8')
+        with mock.patch.object(parser, 'MIN_CHUNK_SIZE', 1), \
+             mock.patch.object(parser.os, 'cpu_count', return_value=4):
+            chunks = parser.split_chunks(input_string, 3)
+            self.assertNotIn(b'render_commas', chunks[0][1])
+            _, _, options_map = parser.parse_file_chunked(
+                io.BytesIO(input_string), num_chunks=3)
+        self.assertTrue(options_map['render_commas'])
+        self.assertTrue(options_map['dcontext'].commas)
+
+
 class TestLineno(unittest.TestCase):
 
     def test_lex(self):
@@ -11,6 +11,8 @@ from beancount.core import getters
 
 __plugins__ = ('auto_insert_open',)
 
+__plugins_ordering__ = 'sorted'
+
 
 def auto_insert_open(entries, unused_options_map):
     """Insert implicitly defined prices from Transactions.
@@ -23,6 +23,10 @@ from beancount.core import inventory
 
 __plugins__ = ('validate_average_cost',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 MatchBasisError = collections.namedtuple('MatchBasisError', 'source message entry')
 
@@ -15,6 +15,10 @@ from beancount.core.amount import CURRENCY_RE
 
 __plugins__ = ('validate_commodity_directives',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 CheckCommodityError = collections.namedtuple('CheckCommodityError', 'source message entry')
 
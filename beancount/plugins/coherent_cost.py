@@ -12,6 +12,10 @@ from beancount.core import data
 
 __plugins__ = ('validate_coherent_cost',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 CoherentCostError = collections.namedtuple('CoherentCostError', 'source message entry')
 
@@ -24,6 +24,10 @@ from beancount.core import data
 
 __plugins__ = ('validate_commodity_attr',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 ConfigError = collections.namedtuple('ConfigError', 'source message entry')
 CommodityError = collections.namedtuple('CommodityError', 'source message entry')
 
@@ -17,6 +17,10 @@ from beancount.core import realization
 
 __plugins__ = ('validate_leaf_only',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 LeafOnlyError = collections.namedtuple('LeafOnlyError', 'source message entry')
 
@@ -10,6 +10,10 @@ from beancount.core import getters
 
 __plugins__ = ('validate_unused_accounts',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 UnusedAccountError = collections.namedtuple('UnusedAccountError', 'source message entry')
 
@@ -27,6 +27,10 @@ from beancount.core import data
 
 __plugins__ = ('validate_one_commodity',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 OneCommodityError = collections.namedtuple('OneCommodityError', 'source message entry')
 
@@ -25,3 +25,7 @@ __plugins__ = loader.combine_plugins(
     onecommodity,
     sellgains,
     unique_prices)
+
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
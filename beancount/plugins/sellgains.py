@@ -72,6 +72,10 @@ from beancount.parser import options
 
 __plugins__ = ('validate_sell_gains',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 SellGainsError = collections.namedtuple('SellGainsError', 'source message entry')
 
@@ -20,6 +20,10 @@ from beancount.core import data
 
 __plugins__ = ('validate_unique_prices',)
 
+__plugins_ordering__ = 'sorted'
+
+__plugins_validator__ = True
+
 
 UniquePricesError = collections.namedtuple('UniquePricesError', 'source message entry')
 
@@ -0,0 +1,426 @@
+"""Columnar execution of queries on data rows.
+
+This is an alternative to the row engine of query_execute, which evaluates the
+tree of expressions of a query once per posting. Here, the values of each column
+are computed once per list of entries and kept, and each node of the expressions
+is evaluated over a whole list of rows at a time, from the lists of the values
+of its children: operators are mapped over these lists, rows are selected by
+the WHERE clause in a single pass, grouped in a dict, and the common aggregates
+are computed over the values of each group in batch. Repeated queries over the
+same entries, e.g. in an interactive session, thus only pay for the computation
+of the columns they use once.
+
+The results are identical to those of the row engine. Queries which use the
+running balance column, which depends on the order in which the rows are
+evaluated, are executed by the row engine.
+"""
+__copyright__ = "Copyright (C) 2014-2016  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import collections
+import copy
+import itertools
+
+from beancount.core import data
+from beancount.query import query_compile
+from beancount.query import query_env
+from beancount.query import query_execute
+from beancount.utils import misc_utils
+
+
+class Table:
+    """The rows of the postings of a list of entries, and their column values.
+
+    The values of a column are computed the first time they are requested, and
+    kept for later queries.
+    """
+
+    def __init__(self, entries, context):
+        """Create a table of the postings of transactions.
+
+        Args:
+          entries: A list of directives.
+          context: A RowContext instance with the global properties of the
+            entries, used to compute the values of the columns.
+        """
+        self.entries = []
+        self.postings = []
+        for entry in misc_utils.filter_type(entries, data.Transaction):
+            for posting in entry.postings:
+                self.entries.append(entry)
+                self.postings.append(posting)
+        self.context = context
+        self.columns = {}
+
+        # The indexes of the entries, whose rows are numbered as those of the
+        # table.
+        self.index = query_execute.EntryIndex(entries)
+
+    def __len__(self):
+        return len(self.postings)
+
+    def column(self, c_column):
+        """Get the values of a column for all the rows.
+
+        Args:
+          c_column: An EvalColumn node.
+        Returns:
+          A list of the values of the column, one for each row.
+        """
+        column_type = type(c_column)
+        try:
+            return self.columns[column_type]
+        except KeyError:
+            pass
+        context = copy.copy(self.context)
+        values = []
+        for entry, posting in zip(self.entries, self.postings):
+            context.entry = entry
+            context.posting = posting
+            values.append(c_column(context))
+        self.columns[column_type] = values
+        return values
+
+
+class TableCache:
+    """A cache of the table of the postings of a ledger.
+
+    This holds the table for the last list of entries it was created for; clear
+    it when the entries are modified, e.g. when the ledger is reloaded.
+    """
+
+    def __init__(self):
+        self.entries = None
+        self.table = None
+
+    def clear(self):
+        """Forget the cached table."""
+        self.entries = None
+        self.table = None
+
+    def get(self, entries, context):
+        """Get the table of a ledger, creating it if needed.
+
+        Args:
+          entries: A list of directives.
+          context: A RowContext instance with the global properties of the
+            entries.
+        Returns:
+          A Table instance.
+        """
+        if self.table is None or entries is not self.entries:
+            self.table = Table(entries, context)
+            self.entries = entries
+        return self.table
+
+
+class _Argument:
+    """A placeholder for an operand of a node evaluated over a row of values.
+
+    The values of the operands of the row are set as the 'args' attribute of the
+    context the node is evaluated with.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __call__(self, context):
+        return context.args[self.index]
+
+
+def evaluate_rows(c_expr, table, rows, context):
+    """Evaluate an expression over some rows of a table.
+
+    Args:
+      c_expr: A compiled expression tree (an EvalNode node), which doesn't use
+        the balance column nor aggregates.
+      table: A Table instance.
+      rows: A sequence of the integer indexes of the rows to evaluate.
+      context: A RowContext instance with the global properties of the entries.
+    Returns:
+      A list of the values of the expression, one for each of the rows.
+    """
+    if isinstance(c_expr, query_compile.EvalConstant):
+        return [c_expr.value] * len(rows)
+
+    if isinstance(c_expr, query_compile.EvalColumn):
+        values = table.column(c_expr)
+        if len(rows) == len(values):
+            return values
+        return [values[row] for row in rows]
+
+    node_type = type(c_expr)
+    if node_type.__call__ is query_compile.EvalUnaryOp.__call__:
+        return list(map(c_expr.operator,
+                        evaluate_rows(c_expr.operand, table, rows, context)))
+
+    if node_type.__call__ is query_compile.EvalBinaryOp.__call__:
+        return list(map(c_expr.operator,
+                        evaluate_rows(c_expr.left, table, rows, context),
+                        evaluate_rows(c_expr.right, table, rows, context)))
+
+    if isinstance(c_expr, query_compile.EvalContains):
+        # Note: we need to reverse the arguments.
+        return list(map(c_expr.operator,
+                        evaluate_rows(c_expr.right, table, rows, context),
+                        evaluate_rows(c_expr.left, table, rows, context)))
+
+    # Evaluate any other node once per row, with its operands replaced by the
+    # values computed over all the rows, if it is a function.
+    if isinstance(c_expr, query_compile.EvalFunction) and c_expr.operands:
+        args_list = zip(*[evaluate_rows(operand, table, rows, context)
+                          for operand in c_expr.operands])
+        c_expr = copy.copy(c_expr)
+        c_expr.operands = [_Argument(index) for index in range(len(c_expr.operands))]
+    else:
+        args_list = itertools.repeat(())
+
+    context = copy.copy(context)
+    entries, postings = table.entries, table.postings
+    values = []
+    for row, args in zip(rows, args_list):
+        context.entry = entries[row]
+        context.posting = postings[row]
+        context.args = args
+        values.append(c_expr(context))
+    return values
+
+
+def _update_count(c_aggregate, store, values):
+    store[c_aggregate.handle] += len(values)
+
+def _update_sum(c_aggregate, store, values):
+    total = store[c_aggregate.handle]
+    for value in values:
+        if value is not None:
+            total += value
+    store[c_aggregate.handle] = total
+
+def _update_sum_amount(c_aggregate, store, values):
+    add_amount = store[c_aggregate.handle].add_amount
+    for value in values:
+        add_amount(value)
+
+def _update_sum_position(c_aggregate, store, values):
+    add_position = store[c_aggregate.handle].add_position
+    for value in values:
+        add_position(value)
+
+def _update_sum_inventory(c_aggregate, store, values):
+    add_inventory = store[c_aggregate.handle].add_inventory
+    for value in values:
+        add_inventory(value)
+
+def _update_first(c_aggregate, store, values):
+    if store[c_aggregate.handle] is None:
+        store[c_aggregate.handle] = next(
+            (value for value in values if value is not None), None)
+
+def _update_last(c_aggregate, store, values):
+    if values:
+        store[c_aggregate.handle] = values[-1]
+
+
+# A mapping of the types of aggregates to functions updating their store with
+# the values of their operand over all the rows of a group at once. The others
+# are updated once per row.
+BATCH_UPDATES = {
+    query_env.Count: _update_count,
+    query_env.Sum: _update_sum,
+    query_env.SumAmount: _update_sum_amount,
+    query_env.SumPosition: _update_sum_position,
+    query_env.SumInventory: _update_sum_inventory,
+    query_env.First: _update_first,
+    query_env.Last: _update_last,
+}
+
+
+def update_aggregate(c_aggregate, groups, table, rows, context):
+    """Update the stores of the groups of rows with the values of an aggregate.
+
+    Args:
+      c_aggregate: An EvalAggregator node, with its handle allocated.
+      groups: A list of (store, positions) pairs, where positions is a list of
+        the indexes in 'rows' of the rows of the group.
+      table: A Table instance.
+      rows: A sequence of the integer indexes of the rows of the table.
+      context: A RowContext instance with the global properties of the entries.
+    """
+    operand_values = [evaluate_rows(operand, table, rows, context)
+                      for operand in c_aggregate.operands]
+
+    batch_update = BATCH_UPDATES.get(type(c_aggregate))
+    if batch_update is not None and len(operand_values) == 1:
+        values = operand_values[0]
+        for store, positions in groups:
+            batch_update(c_aggregate, store, [values[position]
+                                              for position in positions])
+        return
+
+    # Update the store once per row, with the values of the operands.
+    c_aggregate = copy.copy(c_aggregate)
+    c_aggregate.operands = [_Argument(index)
+                            for index in range(len(c_aggregate.operands))]
+    context = copy.copy(context)
+    args_list = list(zip(*operand_values)) or [()] * len(rows)
+    for store, positions in groups:
+        for position in positions:
+            row = rows[position]
+            context.entry = table.entries[row]
+            context.posting = table.postings[row]
+            context.args = args_list[position]
+            c_aggregate.update(store, context)
+
+
+def execute_query(query, entries, options_map, context_cache=None, table_cache=None):
+    """Given a compiled select statement, execute the query over columns.
+
+    Args:
+      query: An instance of a query_compile.Query
+      entries: A list of directives.
+      options_map: A parser's option_map.
+      context_cache: An optional RowContextCache for these entries.
+      table_cache: An optional TableCache for these entries.
+    Returns:
+      A pair of:
+        result_types: A list of (name, data-type) item pairs.
+        result_rows: A list of ResultRow tuples of length and types described by
+          'result_types'.
+    """
+    c_target_exprs = [c_target.c_expr for c_target in query.c_targets]
+
+    # The running balance depends on the order of evaluation of the rows.
+    if any(query_execute.uses_balance_column(c_expr)
+           for c_expr in itertools.chain(c_target_exprs,
+                                         [query.c_where] if query.c_where else [])):
+        return query_execute.execute_query(query, entries, options_map, context_cache)
+
+    # Figure out the result types that describe what we return.
+    result_types = [(target.name, target.c_expr.dtype)
+                    for target in query.c_targets
+                    if target.name is not None]
+
+    # Create a class for each final result.
+    # pylint: disable=invalid-name
+    ResultRow = collections.namedtuple('ResultRow',
+                                       [target.name
+                                        for target in query.c_targets
+                                        if target.name is not None])
+
+    # Indexes of the columns for result rows and order rows.
+    result_indexes = [index
+                      for index, c_target in enumerate(query.c_targets)
+                      if c_target.name]
+    order_indexes = query.order_indexes
+
+    context = query_execute.create_row_context(entries, options_map, context_cache)
+
+    # Get the table of the entries, or of those filtered by the FROM clause.
+    if query.c_from is not None:
+        index = (context_cache.get_index(entries)
+                 if context_cache is not None
+                 else None)
+        filt_entries = query_execute.filter_entries(query.c_from, entries,
+                                                    options_map, context, index)
+        table = Table(filt_entries, context)
+    elif table_cache is not None:
+        table = table_cache.get(entries, context_cache.get(entries, options_map)
+                                if context_cache is not None else context)
+        context = table.context
+    else:
+        table = Table(entries, context)
+
+    # Select the rows with the WHERE clause, among those which may satisfy it.
+    rows = range(len(table))
+    if query.c_where is not None:
+        restriction = query_compile.plan_restriction(query.c_where)
+        if restriction is not None:
+            rows = table.index.select_rows(restriction)
+        rows = [row
+                for row, value in zip(rows, evaluate_rows(query.c_where, table,
+                                                          rows, context))
+                if value]
+
+    schwartz_rows = []
+    if query.group_indexes is None:
+        # This is a non-aggregated query. Only evaluate the rows which would be
+        # kept by a limit, if they aren't reordered nor uniquified.
+        if query.limit is not None and order_indexes is None and not query.distinct:
+            rows = rows[:query.limit]
+        columns = [evaluate_rows(c_expr, table, rows, context)
+                   for c_expr in c_target_exprs]
+
+        # Produce the schwartzian rows lazily, so that they don't have to be
+        # held at once.
+        def generate_rows():
+            for values in zip(*columns):
+                result = ResultRow._make(values[index] for index in result_indexes)
+                sortkey = query_execute.row_sortkey(order_indexes, values,
+                                                    c_target_exprs)
+                yield (sortkey, result)
+        schwartz_rows = generate_rows()
+    else:
+        # This is an aggregated query.
+        group_indexes = set(query.group_indexes)
+        c_nonaggregate_exprs = []
+        c_aggregate_exprs = []
+        for index, c_expr in enumerate(c_target_exprs):
+            if index in group_indexes:
+                c_nonaggregate_exprs.append(c_expr)
+            else:
+                _, aggregate_exprs = query_compile.get_columns_and_aggregates(c_expr)
+                c_aggregate_exprs.extend(aggregate_exprs)
+
+        # Pre-allocate handles in aggregation nodes.
+        allocator = query_execute.Allocator()
+        for c_expr in c_aggregate_exprs:
+            c_expr.allocate(allocator)
+
+        # Group the positions of the rows by the values of the non-aggregates.
+        row_keys = (zip(*[evaluate_rows(c_expr, table, rows, context)
+                          for c_expr in c_nonaggregate_exprs])
+                    if c_nonaggregate_exprs else
+                    itertools.repeat((), len(rows)))
+        positions_map = {}
+        for position, row_key in enumerate(row_keys):
+            try:
+                positions_map[row_key].append(position)
+            except KeyError:
+                positions_map[row_key] = [position]
+
+        # Create a store for each group and update the aggregates.
+        agg_store = {}
+        for row_key in positions_map:
+            store = agg_store[row_key] = allocator.create_store()
+            for c_expr in c_aggregate_exprs:
+                c_expr.initialize(store)
+        groups = [(agg_store[row_key], positions)
+                  for row_key, positions in positions_map.items()]
+        for c_expr in c_aggregate_exprs:
+            update_aggregate(c_expr, groups, table, rows, context)
+
+        # Iterate over all the aggregations to produce the schwartzian rows.
+        context = copy.copy(context)
+        for key, store in agg_store.items():
+            key_iter = iter(key)
+            values = []
+
+            # Finalize the store.
+            for c_expr in c_aggregate_exprs:
+                c_expr.finalize(store)
+            context.store = store
+
+            for index, c_expr in enumerate(c_target_exprs):
+                if index in group_indexes:
+                    value = next(key_iter)
+                else:
+                    value = c_expr(context)
+                values.append(value)
+
+            # Compute result and sort-key objects.
+            result = ResultRow._make(values[index]
+                                     for index in result_indexes)
+            sortkey = query_execute.row_sortkey(order_indexes, values, c_target_exprs)
+            schwartz_rows.append((sortkey, result))
+
+    return query_execute.finalize_results(query, result_types, schwartz_rows)
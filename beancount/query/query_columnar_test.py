@@ -0,0 +1,150 @@
+__copyright__ = "Copyright (C) 2014-2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import unittest
+from unittest import mock
+
+from beancount.query import query_columnar
+from beancount.query import query_compile
+from beancount.query import query_env
+from beancount.query import query_execute
+from beancount.query import query_parser
+from beancount import loader
+
+
+INPUT = """
+  2010-01-01 open Assets:Bank:Checking
+  2010-01-01 open Assets:Cash
+  2010-01-01 open Assets:Investments  "FIFO"
+  2010-01-01 open Expenses:Food
+  2010-01-01 open Expenses:Home
+  2010-01-01 open Income:Salary
+
+  2010-01-01 price HOOL  100.00 USD
+
+  2010-02-01 * "Employer" "Salary"
+    Income:Salary          -2000.00 USD
+    Assets:Bank:Checking    2000.00 USD
+
+  2010-02-03 * "Grocery" "Food" #groceries
+    code: 1
+    Expenses:Food            45.30 USD
+      note: "a"
+    Assets:Cash
+
+  2010-02-05 * "Rent"
+    Expenses:Home           800.00 USD
+    Assets:Bank:Checking
+
+  2010-03-01 * "Buy"
+    Assets:Investments       5 HOOL {110.00 USD}
+    Assets:Bank:Checking
+
+  2010-03-04 * "Grocery" "Food" #groceries
+    Expenses:Food            12.00 USD
+    Assets:Cash
+
+  2011-01-10 * "Sell"
+    Assets:Investments      -2 HOOL {110.00 USD} @ 120.00 USD
+    Assets:Bank:Checking    240.00 USD
+    Income:Salary           -20.00 USD
+"""
+
+
+class TestColumnarExecute(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.entries, _, cls.options_map = loader.load_string(INPUT, dedent=True)
+
+    def setUp(self):
+        self.parser = query_parser.Parser()
+
+    def compile(self, bql_string):
+        return query_compile.compile(self.parser.parse(bql_string),
+                                     query_env.TargetsEnvironment(),
+                                     query_env.FilterPostingsEnvironment(),
+                                     query_env.FilterEntriesEnvironment())
+
+    def check_same(self, bql_string, table_cache=None):
+        expected = query_execute.execute_query(self.compile(bql_string),
+                                               self.entries, self.options_map)
+        result = query_columnar.execute_query(self.compile(bql_string),
+                                              self.entries, self.options_map,
+                                              table_cache=table_cache)
+        self.assertEqual(expected, result)
+        self.assertEqual([row._fields for row in expected[1]],
+                         [row._fields for row in result[1]])
+        self.assertTrue(expected[1])
+        return result
+
+    def test_select(self):
+        self.check_same("SELECT date, account, position")
+        self.check_same("SELECT date, narration, position LIMIT 3")
+        self.check_same("SELECT DISTINCT account")
+        self.check_same("SELECT date, account, number WHERE number > 100 "
+                        "ORDER BY date DESC LIMIT 2")
+        self.check_same("SELECT account, meta('note'), entry_meta('code'), any_meta('code')")
+        self.check_same("SELECT account, today(), length(narration)")
+
+    def test_where(self):
+        self.check_same("SELECT account WHERE account ~ 'Expenses'")
+        self.check_same("SELECT account WHERE 'groceries' IN tags OR number < 0")
+        self.check_same("SELECT account WHERE NOT (year = 2010 AND month = 2)")
+        self.check_same("SELECT account, number * 2, number + 1 WHERE number > 0")
+
+    def test_aggregate(self):
+        self.check_same("SELECT account, sum(position) GROUP BY account")
+        self.check_same("SELECT year, month, sum(cost(position)), count(position) "
+                        "GROUP BY year, month ORDER BY year, month")
+        self.check_same("SELECT root(account, 1) AS r, sum(units(position)), "
+                        "sum(number), sum(cost(position)) GROUP BY r")
+        self.check_same("SELECT account, first(narration), last(narration), "
+                        "min(date), max(date), sum(number) GROUP BY account")
+        self.check_same("SELECT count(position), sum(number)")
+        self.check_same("SELECT account, sum(convert(position, 'USD')) "
+                        "GROUP BY account ORDER BY 2 DESC LIMIT 3")
+
+    def test_aggregate__first_skips_none(self):
+        result = self.check_same("SELECT first(meta('note')), last(meta('note'))")
+        self.assertEqual([('a', None)], [tuple(row) for row in result[1]])
+
+    def test_from(self):
+        self.check_same("SELECT account, sum(position) FROM year = 2010 "
+                        "GROUP BY account")
+        self.check_same("SELECT account, sum(position) FROM OPEN ON 2010-03-01 "
+                        "CLOSE ON 2011-01-01 CLEAR GROUP BY account")
+
+    def test_balance(self):
+        with mock.patch.object(query_columnar, 'Table') as table_mock:
+            self.check_same("SELECT date, account, balance "
+                            "WHERE account ~ 'Checking'")
+            table_mock.assert_not_called()
+
+    def test_table_cache(self):
+        table_cache = query_columnar.TableCache()
+        self.check_same("SELECT account, sum(position) GROUP BY account",
+                        table_cache)
+        table = table_cache.get(self.entries, None)
+        self.assertEqual(13, len(table))
+        self.assertEqual({query_env.AccountColumn, query_env.PositionColumn},
+                         set(table.columns))
+
+        # The columns are reused by later queries.
+        query = "SELECT account WHERE account ~ 'Assets'"
+        expected = query_execute.execute_query(self.compile(query),
+                                               self.entries, self.options_map)
+        with mock.patch.object(query_env.AccountColumn, '__call__') as call_mock:
+            result = query_columnar.execute_query(self.compile(query),
+                                                  self.entries, self.options_map,
+                                                  table_cache=table_cache)
+            call_mock.assert_not_called()
+        self.assertEqual(expected, result)
+        self.assertIs(table, table_cache.get(self.entries, None))
+
+        table_cache.clear()
+        self.assertIsNot(table, table_cache.get(self.entries, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
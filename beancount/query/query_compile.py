@@ -10,6 +10,7 @@ __license__ = "GNU GPLv2"
 import collections
 import copy
 import datetime
+import functools
 import re
 import operator
 from decimal import Decimal
@@ -170,6 +171,51 @@ class EvalMatch(EvalBinaryOp):
                 "Invalid data type for RHS of match: '{}'; must be a string".format(
                     right.dtype))
 
+        # Compile a constant pattern once, rather than looking it up per row.
+        regexp = compile_constant_regexp(right, re.IGNORECASE)
+        if regexp is not None:
+            self.operator = _get_constant_match(regexp)
+
+@functools.lru_cache(maxsize=128)
+def _get_constant_match(regexp):
+    """Create the operator of a match against a compiled regular expression.
+
+    The same function is returned for the same expression, so that nodes
+    matching the same pattern compare equal. The cache is bounded, like that of
+    the re module, so that long-running processes don't keep all the patterns
+    ever queried alive.
+
+    Args:
+      regexp: A compiled regular expression object.
+    Returns:
+      A function of the left and right operands of a match, which ignores the
+      right operand, the pattern, and searches the compiled expression instead.
+    """
+    search = regexp.search
+    def match(left, unused_right):
+        if left is None:
+            return False
+        return bool(search(left))
+    return match
+
+def compile_constant_regexp(c_operand, flags=0):
+    """Compile the regular expression of an operand, if it is a constant.
+
+    Args:
+      c_operand: A compiled operand (an EvalNode node) of a pattern string.
+      flags: The flags of the regular expression.
+    Returns:
+      A compiled regular expression object, or None, if the operand isn't a
+      constant or isn't a valid regular expression, in which case the pattern
+      has to be compiled as the rows are evaluated.
+    """
+    if not (isinstance(c_operand, EvalConstant) and isinstance(c_operand.value, str)):
+        return None
+    try:
+        return re.compile(c_operand.value, flags)
+    except re.error:
+        return None
+
 class EvalContains(EvalBinaryOp):
 
     def __init__(self, left, right):
@@ -270,6 +316,11 @@ class EvalFunction(EvalNode):
 class EvalColumn(EvalNode):
     "Base class for all column accessors."
 
+    # The name of the attribute of the row the column returns, if the query
+    # planner can answer predicates on it from an index: one of 'date', 'year',
+    # 'month', 'account', 'tags' or 'links'.
+    __indexed__ = None
+
 class EvalAggregator(EvalFunction):
     "Base class for all aggregator evaluator types."
 
@@ -424,7 +475,44 @@ def compile_expression(expr, environ):
     else:
         assert False, "Invalid expression to compile: {}".format(expr)
 
-    return c_expr
+    return fold_constant(c_expr)
+
+
+# The context constant expressions are evaluated with. It has no attributes, so
+# that the evaluation of nodes using the context fails.
+_EMPTY_CONTEXT = object()
+
+def fold_constant(c_expr):
+    """Evaluate an expression of constants once, at compile time.
+
+    Operators and functions whose operands are all constants are replaced by
+    the constant of their value, if they can be evaluated without a row
+    context. Functions without operands, e.g. today(), aggregates, functions
+    which use the context, e.g. those using the price map, and expressions which
+    fail to evaluate or evaluate to mutable values are left to be evaluated per
+    row.
+
+    Args:
+      c_expr: A compiled expression tree (an EvalNode node), whose operands have
+        already been folded.
+    Returns:
+      An EvalConstant node of the same data type, or the expression itself.
+    """
+    if not (isinstance(c_expr, (EvalUnaryOp, EvalBinaryOp, EvalFunction)) and
+            not isinstance(c_expr, EvalAggregator)):
+        return c_expr
+    c_operands = list(c_expr.childnodes())
+    if not c_operands or not all(isinstance(c_operand, EvalConstant)
+                                 for c_operand in c_operands):
+        return c_expr
+    try:
+        value = c_expr(_EMPTY_CONTEXT)
+        hash(value)
+    except Exception:  # pylint: disable=broad-except
+        return c_expr
+    c_constant = EvalConstant(value)
+    c_constant.dtype = c_expr.dtype
+    return c_constant
 
 
 def get_columns_and_aggregates(node):
@@ -793,6 +881,168 @@ def compile_from(from_clause, environ):
     return c_from
 
 
+# A restriction of the rows which may satisfy a predicate, which can be answered
+# from indexes of the entries and postings. Every row satisfying the predicate
+# satisfies its restriction; the predicate still needs to be evaluated on the
+# rows selected by it.
+#
+# Attributes:
+#   begin: The date from which the rows may match, inclusive, or None.
+#   end: The date before which the rows may match, exclusive, or None.
+#   accounts: A list of predicates functions on account names which the account
+#     of a posting has to satisfy.
+#   tags: A set of tags the rows have to have.
+#   links: A set of links the rows have to have.
+Restriction = collections.namedtuple('Restriction', 'begin end accounts tags links')
+
+# The comparison nodes of the date predicates, and the operations their
+# mirrors, if their constant operand is on the left.
+_MIRRORED_COMPARISONS = {
+    EvalEqual: EvalEqual,
+    EvalGreater: EvalLess,
+    EvalGreaterEq: EvalLessEq,
+    EvalLess: EvalGreater,
+    EvalLessEq: EvalGreaterEq,
+}
+
+def get_conjuncts(c_expr):
+    """Split a predicate into conjuncts, which all hold where it does.
+
+    Args:
+      c_expr: A compiled expression tree (an EvalNode node).
+    Returns:
+      A list of EvalNode nodes.
+    """
+    if (isinstance(c_expr, EvalAnd) and
+        c_expr.left.dtype is bool and c_expr.right.dtype is bool):
+        return get_conjuncts(c_expr.left) + get_conjuncts(c_expr.right)
+    return [c_expr]
+
+def _get_column_constant(c_expr):
+    """Match a binary operation between an indexed column and a constant.
+
+    Args:
+      c_expr: A compiled expression tree (an EvalNode node).
+    Returns:
+      A triple of the name of the indexed attribute, the constant value and a
+      boolean, true if the constant is the left operand; or None, if the node
+      doesn't match.
+    """
+    if not isinstance(c_expr, EvalBinaryOp):
+        return None
+    left, right = c_expr.left, c_expr.right
+    if isinstance(left, EvalColumn) and isinstance(right, EvalConstant):
+        return left.__indexed__, right.value, False
+    if isinstance(left, EvalConstant) and isinstance(right, EvalColumn):
+        return right.__indexed__, left.value, True
+    return None
+
+def _get_date_range(name, node_type, value):
+    """Compute the range of dates satisfying a comparison of a date or year.
+
+    Args:
+      name: A string, 'date' or 'year', the name of the compared attribute.
+      node_type: The type of the comparison node, with the attribute on its left.
+      value: The constant the attribute is compared to.
+    Returns:
+      A pair of the begin and end dates, either of which may be None.
+    Raises:
+      ValueError or OverflowError: If the bounds aren't valid dates.
+    """
+    if name == 'date':
+        first = value
+        after = value + datetime.timedelta(days=1)
+    else:
+        first = datetime.date(value, 1, 1)
+        after = datetime.date(value + 1, 1, 1)
+    if node_type is EvalEqual:
+        return first, after
+    if node_type is EvalGreater:
+        return after, None
+    if node_type is EvalGreaterEq:
+        return first, None
+    if node_type is EvalLess:
+        return None, first
+    assert node_type is EvalLessEq
+    return None, after
+
+def plan_restriction(c_expr):
+    """Find the restriction of the rows which may satisfy a predicate.
+
+    This recognizes the conjuncts of the predicate which compare the date or
+    the year of the rows to a constant, the conjuncts requiring equality of the
+    month along with that of the year, those comparing the account to a
+    constant for equality or by regular expression, and those testing the
+    presence of a constant tag or link.
+
+    Args:
+      c_expr: A compiled expression tree (an EvalNode node) of a predicate.
+    Returns:
+      A Restriction instance, or None, if the predicate isn't restricted by any
+      of its conjuncts.
+    """
+    begins, ends = [], []
+    accounts = []
+    tags, links = set(), set()
+    years, months = set(), set()
+    for c_conjunct in get_conjuncts(c_expr):
+        match = _get_column_constant(c_conjunct)
+        if match is None:
+            continue
+        name, value, mirrored = match
+        node_type = type(c_conjunct)
+
+        if name in ('date', 'year') and node_type in _MIRRORED_COMPARISONS:
+            if type(value) is not (datetime.date if name == 'date' else int):
+                continue
+            if mirrored:
+                node_type = _MIRRORED_COMPARISONS[node_type]
+            try:
+                begin, end = _get_date_range(name, node_type, value)
+            except (ValueError, OverflowError):
+                continue
+            if begin is not None:
+                begins.append(begin)
+            if end is not None:
+                ends.append(end)
+            if name == 'year' and node_type is EvalEqual:
+                years.add(value)
+
+        elif name == 'month' and node_type is EvalEqual and type(value) is int:
+            months.add(value)
+
+        elif (name == 'account' and node_type in (EvalEqual, EvalMatch) and
+              isinstance(value, str)):
+            function = c_conjunct.operator
+            accounts.append(
+                (lambda account, function=function, value=value:
+                 function(value, account))
+                if mirrored else
+                (lambda account, function=function, value=value:
+                 function(account, value)))
+
+        elif (name in ('tags', 'links') and node_type is EvalContains and
+              mirrored and isinstance(value, str)):
+            (tags if name == 'tags' else links).add(value)
+
+    # Restrict the dates to a month of a single year.
+    if len(years) == 1 and len(months) == 1:
+        year, month = years.pop(), months.pop()
+        if 1 <= month <= 12:
+            try:
+                begins.append(datetime.date(year, month, 1))
+                ends.append(datetime.date(year + month // 12, month % 12 + 1, 1))
+            except ValueError:
+                pass
+
+    if not (begins or ends or accounts or tags or links):
+        return None
+    return Restriction(max(begins) if begins else None,
+                       min(ends) if ends else None,
+                       accounts,
+                       tags,
+                       links)
+
 # A compiled query, ready for execution.
 #
 # Attributes:
@@ -45,6 +45,57 @@ class TestCompileExpression(unittest.TestCase):
                          qc.compile_expression(qp.Constant(D(17)), qe.TargetsEnvironment()))
 
 
+class TestFoldConstant(unittest.TestCase):
+
+    def compile(self, expr):
+        return qc.compile_expression(expr, qe.TargetsEnvironment())
+
+    def test_fold_operators(self):
+        c_expr = self.compile(qp.Add(qp.Constant(1), qp.Constant(2)))
+        self.assertEqual(qc.EvalConstant(D(3)), c_expr)
+        c_expr = self.compile(qp.Not(qp.Equal(qp.Constant('a'), qp.Constant('b'))))
+        self.assertEqual(qc.EvalConstant(True), c_expr)
+        c_expr = self.compile(qp.Equal(qp.Column('date'),
+                                       qp.Function('date', [qp.Constant(2014),
+                                                            qp.Constant(1),
+                                                            qp.Constant(2)])))
+        self.assertEqual(qc.EvalEqual(qe.DateColumn(),
+                                      qc.EvalConstant(datetime.date(2014, 1, 2))),
+                         c_expr)
+
+    def test_fold_keeps_dtype(self):
+        c_expr = self.compile(qp.Function('grep', [qp.Constant('x'), qp.Constant('y')]))
+        self.assertIsInstance(c_expr, qc.EvalConstant)
+        self.assertIsNone(c_expr.value)
+        self.assertEqual(str, c_expr.dtype)
+
+    def test_no_fold(self):
+        for expr in [
+                qp.Function('today', []),
+                qp.Function('meta', [qp.Constant('x')]),
+                qp.Function('open_date', [qp.Constant('Assets:Cash')]),
+                qp.Function('sum', [qp.Constant(1)]),
+                qp.Div(qp.Constant(1), qp.Constant(0)),
+                qp.Add(qp.Column('number'), qp.Constant(1))]:
+            self.assertNotIsInstance(self.compile(expr), qc.EvalConstant)
+
+    def test_match_constant_pattern(self):
+        c_match = self.compile(qp.Match(qp.Column('account'), qp.Constant('^assets:')))
+        self.assertIsNot(qc.EvalMatch.match, c_match.operator)
+        self.assertEqual(c_match, self.compile(qp.Match(qp.Column('account'),
+                                                         qp.Constant('^assets:'))))
+        self.assertTrue(c_match.operator('Assets:Cash', '^assets:'))
+        self.assertFalse(c_match.operator('Income:Assets', '^assets:'))
+        self.assertFalse(c_match.operator(None, '^assets:'))
+
+        # The operators of the patterns aren't all kept.
+        self.assertIsNotNone(qc._get_constant_match.cache_info().maxsize)
+
+        # Invalid and non-constant patterns are compiled as rows are evaluated.
+        for pattern in [qp.Constant('('), qp.Column('narration')]:
+            c_match = self.compile(qp.Match(qp.Column('account'), pattern))
+            self.assertIs(qc.EvalMatch.match, c_match.operator)
+
 class TestCompileExpressionDataTypes(unittest.TestCase):
 
     def test_expr_function_arity(self):
@@ -743,6 +794,58 @@ class TestTranslationBalance(CompileSelectBase):
             select)
 
 
+class TestPlanRestriction(CompileSelectBase):
+
+    def plan(self, where_clause):
+        c_query = self.compile("SELECT account WHERE {};".format(where_clause))
+        return qc.plan_restriction(c_query.c_where)
+
+    def test_unrestricted(self):
+        self.assertIsNone(self.plan("number > 100"))
+        self.assertIsNone(self.plan("year = 2014 OR account ~ 'Assets'"))
+        self.assertIsNone(self.plan("NOT year = 2014"))
+        self.assertIsNone(self.plan("month = 2"))
+        self.assertIsNone(self.plan("year = number"))
+
+    def test_dates(self):
+        self.assertEqual((datetime.date(2014, 1, 1), datetime.date(2015, 1, 1)),
+                         self.plan("year = 2014")[:2])
+        self.assertEqual((datetime.date(2015, 1, 1), None),
+                         self.plan("year > 2014")[:2])
+        self.assertEqual((None, datetime.date(2015, 1, 1)),
+                         self.plan("2014 >= year")[:2])
+        self.assertEqual((datetime.date(2014, 3, 1), datetime.date(2014, 3, 2)),
+                         self.plan("date = 2014-03-01")[:2])
+        self.assertEqual((datetime.date(2014, 3, 2), datetime.date(2014, 6, 1)),
+                         self.plan("2014-03-01 < date AND date < 2014-06-01 "
+                                   "AND number > 0")[:2])
+        self.assertEqual((datetime.date(2014, 12, 1), datetime.date(2015, 1, 1)),
+                         self.plan("year = 2014 AND month = 12")[:2])
+        self.assertEqual((datetime.date(2014, 1, 1), datetime.date(2015, 1, 1)),
+                         self.plan("year = 2014 AND month = 13")[:2])
+        self.assertIsNone(self.plan("date > 9999-12-31"))
+
+    def test_accounts(self):
+        restriction = self.plan("account ~ '^assets:' AND account != 'Assets:Cash'")
+        self.assertEqual(1, len(restriction.accounts))
+        self.assertTrue(restriction.accounts[0]('Assets:Cash'))
+        self.assertFalse(restriction.accounts[0]('Liabilities:Assets'))
+
+        restriction = self.plan("'Assets:Cash' = account")
+        self.assertTrue(restriction.accounts[0]('Assets:Cash'))
+        self.assertFalse(restriction.accounts[0]('Assets:Cash:Other'))
+
+    def test_tags_links(self):
+        restriction = self.plan("'trip' IN tags AND 'invoice' IN links")
+        self.assertEqual(({'trip'}, {'invoice'}), restriction[3:])
+
+    def test_from(self):
+        c_query = self.compile("SELECT account FROM year = 2014 AND 'trip' IN tags;")
+        self.assertEqual(qc.Restriction(datetime.date(2014, 1, 1),
+                                        datetime.date(2015, 1, 1),
+                                        [], {'trip'}, set()),
+                         qc.plan_restriction(c_query.c_from.c_expr))
+
 class TestCompilePrint(CompileSelectBase):
 
     def test_print(self):
@@ -287,10 +287,13 @@ class Grep(query_compile.EvalFunction):
 
     def __init__(self, operands):
         super().__init__(operands, str)
+        self.regexp = query_compile.compile_constant_regexp(operands[0])
 
     def __call__(self, context):
         args = self.eval_args(context)
-        match = re.search(args[0], args[1])
+        match = (self.regexp.search(args[1])
+                 if self.regexp is not None
+                 else re.search(args[0], args[1]))
         if match:
             return match.group(0)
 
@@ -300,10 +303,13 @@ class GrepN(query_compile.EvalFunction):
 
     def __init__(self, operands):
         super().__init__(operands, str)
+        self.regexp = query_compile.compile_constant_regexp(operands[0])
 
     def __call__(self, context):
         args = self.eval_args(context)
-        match = re.search(args[0], args[1])
+        match = (self.regexp.search(args[1])
+                 if self.regexp is not None
+                 else re.search(args[0], args[1]))
         if match:
             return match.group(args[2])
 
@@ -313,11 +319,14 @@ class Subst(query_compile.EvalFunction):
 
     def __init__(self, operands):
         super().__init__(operands, str)
+        self.regexp = query_compile.compile_constant_regexp(operands[0])
 
     def __call__(self, context):
         args = self.eval_args(context)
         if any([arg is None for arg in args]):
             return None
+        if self.regexp is not None:
+            return self.regexp.sub(args[1], args[2])
         return re.sub(args[0], args[1], args[2])
 
 class Upper(query_compile.EvalFunction):
@@ -719,14 +728,18 @@ class FindFirst(query_compile.EvalFunction):
 
     def __init__(self, operands):
         super().__init__(operands, str)
+        self.regexp = query_compile.compile_constant_regexp(operands[0])
 
     def __call__(self, context):
         args = self.eval_args(context)
         values = args[1]
         if not values:
             return
+        match = (self.regexp.match
+                 if self.regexp is not None
+                 else lambda value: re.match(args[0], value))
         for value in sorted(values):
-            if re.match(args[0], value):
+            if match(value):
                 return value
 
 class JoinStr(query_compile.EvalFunction):
@@ -1210,6 +1223,7 @@ class DateEntryColumn(query_compile.EvalColumn):
     "The date of the directive."
     __equivalent__ = 'entry.date'
     __intypes__ = [data.Transaction]
+    __indexed__ = 'date'
 
     def __init__(self):
         super().__init__(datetime.date)
@@ -1221,6 +1235,7 @@ class YearEntryColumn(query_compile.EvalColumn):
     "The year of the date of the directive."
     __equivalent__ = 'entry.date.year'
     __intypes__ = [data.Transaction]
+    __indexed__ = 'year'
 
     def __init__(self):
         super().__init__(int)
@@ -1232,6 +1247,7 @@ class MonthEntryColumn(query_compile.EvalColumn):
     "The month of the date of the directive."
     __equivalent__ = 'entry.date.month'
     __intypes__ = [data.Transaction]
+    __indexed__ = 'month'
 
     def __init__(self):
         super().__init__(int)
@@ -1312,6 +1328,7 @@ class TagsEntryColumn(query_compile.EvalColumn):
     "The set of tags of the transaction."
     __equivalent__ = 'entry.tags'
     __intypes__ = [data.Transaction]
+    __indexed__ = 'tags'
 
     def __init__(self):
         super().__init__(set)
@@ -1325,6 +1342,7 @@ class LinksEntryColumn(query_compile.EvalColumn):
     "The set of links of the transaction."
     __equivalent__ = 'entry.links'
     __intypes__ = [data.Transaction]
+    __indexed__ = 'links'
 
     def __init__(self):
         super().__init__(set)
@@ -1343,10 +1361,11 @@ class MatchAccount(query_compile.EvalFunction):
 
     def __init__(self, operands):
         super().__init__(operands, bool)
+        self.regexp = query_compile.compile_constant_regexp(operands[0], re.IGNORECASE)
 
     def __call__(self, context):
         pattern = self.eval_args(context)[0]
-        search = re.compile(pattern, re.IGNORECASE).search
+        search = (self.regexp or re.compile(pattern, re.IGNORECASE)).search
         return any(search(account) for account in getters.get_entry_accounts(context.entry))
 
 
@@ -1450,6 +1469,7 @@ class DateColumn(query_compile.EvalColumn):
     "The date of the parent transaction for this posting."
     __equivalent__ = 'entry.date'
     __intypes__ = [data.Posting]
+    __indexed__ = 'date'
 
     def __init__(self):
         super().__init__(datetime.date)
@@ -1461,6 +1481,7 @@ class YearColumn(query_compile.EvalColumn):
     "The year of the date of the parent transaction for this posting."
     __equivalent__ = 'entry.date.year'
     __intypes__ = [data.Posting]
+    __indexed__ = 'year'
 
     def __init__(self):
         super().__init__(int)
@@ -1472,6 +1493,7 @@ class MonthColumn(query_compile.EvalColumn):
     "The month of the date of the parent transaction for this posting."
     __equivalent__ = 'entry.date.month'
     __intypes__ = [data.Posting]
+    __indexed__ = 'month'
 
     def __init__(self):
         super().__init__(int)
@@ -1542,6 +1564,7 @@ class TagsColumn(query_compile.EvalColumn):
     "The set of tags of the parent transaction for this posting."
     __equivalent__ = 'entry.tags'
     __intypes__ = [data.Posting]
+    __indexed__ = 'tags'
 
     def __init__(self):
         super().__init__(set)
@@ -1553,6 +1576,7 @@ class LinksColumn(query_compile.EvalColumn):
     "The set of links of the parent transaction for this posting."
     __equivalent__ = 'entry.links'
     __intypes__ = [data.Posting]
+    __indexed__ = 'links'
 
     def __init__(self):
         super().__init__(set)
@@ -1575,6 +1599,7 @@ class AccountColumn(query_compile.EvalColumn):
     "The account of the posting."
     __equivalent__ = 'posting.account'
     __intypes__ = [data.Posting]
+    __indexed__ = 'account'
 
     def __init__(self):
         super().__init__(str)
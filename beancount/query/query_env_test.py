@@ -168,6 +168,24 @@ class TestEnv(unittest.TestCase):
         ''')
         self.assertEqual([('at',)], rrows)
 
+    @parser.parse_doc()
+    def test_Grep_patterns(self, entries, _, options_map):
+        """
+        2016-11-20 * "Store" "Bought at the store" #storefront
+          Assets:Banking          1 USD
+        """
+        self.assertIsNotNone(qe.Grep([qc.EvalConstant('st.re'),
+                                      qe.NarrationColumn()]).regexp)
+        self.assertIsNone(qe.Grep([qe.PayeeColumn(), qe.NarrationColumn()]).regexp)
+
+        rtypes, rrows = query.run_query(entries, options_map, '''
+          SELECT GREP(lower(payee), narration) as m,
+                 GREP("st.re", narration) as n,
+                 SUBST(lower(payee), "shop", narration) as s,
+                 FINDFIRST(lower(payee), tags) as f
+        ''')
+        self.assertEqual([('store', 'store', 'Bought at the shop', 'storefront')], rrows)
+
     @parser.parse_doc()
     def test_Subst(self, entries, _, options_map):
         """
@@ -3,9 +3,11 @@
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import bisect
 import copy
 import collections
 import datetime
+import heapq
 import itertools
 import operator
 from decimal import Decimal
@@ -25,7 +27,7 @@ from beancount.core import prices
 from beancount.utils import misc_utils
 
 
-def filter_entries(c_from, entries, options_map, context):
+def filter_entries(c_from, entries, options_map, context, index=None):
     """Filter the entries by the given compiled FROM clause.
 
     Args:
@@ -33,6 +35,7 @@ def filter_entries(c_from, entries, options_map, context):
       entries: A list of directives.
       options_map: A parser's option_map.
       context: A prototype of RowContext to use for evaluation.
+      index: An optional EntryIndex of 'entries'.
     Returns:
       A list of filtered entries.
     """
@@ -44,31 +47,43 @@ def filter_entries(c_from, entries, options_map, context):
     if c_from is None:
         return entries
 
+    # The index doesn't cover the entries summarized by the clauses below.
+    if c_from.open is not None or c_from.close is not None or c_from.clear is not None:
+        index = None
+
     # Process the OPEN clause.
     if c_from.open is not None:
         assert isinstance(c_from.open, datetime.date)
         open_date = c_from.open
-        entries, index = summarize.open_opt(entries, open_date, options_map)
+        entries, _ = summarize.open_opt(entries, open_date, options_map)
 
     # Process the CLOSE clause.
     if c_from.close is not None:
         if isinstance(c_from.close, datetime.date):
             close_date = c_from.close
-            entries, index = summarize.close_opt(entries, close_date, options_map)
+            entries, _ = summarize.close_opt(entries, close_date, options_map)
         elif c_from.close is True:
-            entries, index = summarize.close_opt(entries, None, options_map)
+            entries, _ = summarize.close_opt(entries, None, options_map)
 
     # Process the CLEAR clause.
     if c_from.clear is not None:
-        entries, index = summarize.clear_opt(entries, None, options_map)
+        entries, _ = summarize.clear_opt(entries, None, options_map)
 
     # Filter the entries with the FROM clause's expression.
     c_expr = c_from.c_expr
     if c_expr is not None:
         # A simple function receives a context; how come close_date() is
         # accepted in the context of a FROM clause? It shouldn't be.
+        # Only evaluate the expression on the entries which may satisfy it.
+        restriction = query_compile.plan_restriction(c_expr)
+        candidates = entries
+        if restriction is not None:
+            if index is None:
+                index = EntryIndex(entries)
+            candidates = index.select_entries(restriction)
+
         new_entries = []
-        for entry in entries:
+        for entry in candidates:
             context.entry = entry
             if c_expr(context):
                 new_entries.append(entry)
@@ -77,7 +92,7 @@ def filter_entries(c_from, entries, options_map, context):
     return entries
 
 
-def execute_print(c_print, entries, options_map, file):
+def execute_print(c_print, entries, options_map, file, context_cache=None):
     """Print entries from a print statement specification.
 
     Args:
@@ -85,10 +100,12 @@ def execute_print(c_print, entries, options_map, file):
       entries: A list of directives.
       options_map: A parser's option_map.
       file: The output file to print to.
+      context_cache: An optional RowContextCache for these entries.
     """
     if c_print and c_print.c_from is not None:
-        context = create_row_context(entries, options_map)
-        entries = filter_entries(c_print.c_from, entries, options_map, context)
+        context = create_row_context(entries, options_map, context_cache)
+        index = context_cache.get_index(entries) if context_cache is not None else None
+        entries = filter_entries(c_print.c_from, entries, options_map, context, index)
 
     # Create a context that renders all numbers with their natural
     # precision, but honors the commas option. This is kept in sync with
@@ -98,6 +115,189 @@ def execute_print(c_print, entries, options_map, file):
     printer.print_entries(entries, dcontext, file=file)
 
 
+class EntryIndex:
+    """Indexes of a list of entries and of their postings, to select the rows
+    which may satisfy a query_compile.Restriction without going over all of them.
+
+    The rows of the postings are numbered in the order of the entries. The
+    indexes are built the first time they are needed. Dates can only be looked
+    up if the entries are sorted by date, as loaded ledgers are.
+    """
+
+    def __init__(self, entries):
+        """Create the indexes of a list of entries.
+
+        Args:
+          entries: A list of directives.
+        """
+        self.entries = entries
+        self._dates = None
+        self._entry_sets = None
+        self._row_starts = None
+        self._rows = None
+        self._account_rows = None
+
+    def _get_dates(self):
+        """Get the list of the dates of the entries, if they're sorted by date.
+
+        Returns:
+          A list of dates, or None, if the entries aren't sorted by date.
+        """
+        if self._dates is None:
+            dates = [entry.date for entry in self.entries]
+            self._dates = (dates
+                           if all(map(operator.le, dates, itertools.islice(dates, 1, None)))
+                           else False)
+        return self._dates or None
+
+    def _get_entry_sets(self):
+        """Get the indexes of the transactions by tag and by link.
+
+        Returns:
+          A dict of ('tags' or 'links', tag or link string) pairs to the sorted
+          lists of the indexes of the transactions which have them.
+        """
+        if self._entry_sets is None:
+            entry_sets = collections.defaultdict(list)
+            for index, entry in enumerate(self.entries):
+                if isinstance(entry, data.Transaction):
+                    for tag in entry.tags or ():
+                        entry_sets[('tags', tag)].append(index)
+                    for link in entry.links or ():
+                        entry_sets[('links', link)].append(index)
+            self._entry_sets = entry_sets
+        return self._entry_sets
+
+    def _get_row_starts(self):
+        """Get the numbers of the first rows of the postings of each entry.
+
+        Returns:
+          A list of integers, of one more element than the entries, the last of
+          which is the number of rows.
+        """
+        if self._row_starts is None:
+            row_starts = [0]
+            num_rows = 0
+            for entry in self.entries:
+                if isinstance(entry, data.Transaction):
+                    num_rows += len(entry.postings)
+                row_starts.append(num_rows)
+            self._row_starts = row_starts
+        return self._row_starts
+
+    def get_rows(self):
+        """Get the list of the rows of the postings.
+
+        Returns:
+          A list of (entry, posting) pairs, in the order of the entries.
+        """
+        if self._rows is None:
+            self._rows = [(entry, posting)
+                          for entry in misc_utils.filter_type(self.entries,
+                                                              data.Transaction)
+                          for posting in entry.postings]
+        return self._rows
+
+    def _get_account_rows(self):
+        """Get the numbers of the rows of the postings by account.
+
+        Returns:
+          A dict of account name strings to sorted lists of row numbers.
+        """
+        if self._account_rows is None:
+            account_rows = collections.defaultdict(list)
+            for row, (_, posting) in enumerate(self.get_rows()):
+                account_rows[posting.account].append(row)
+            self._account_rows = account_rows
+        return self._account_rows
+
+    def _select(self, begin, end, index_lists):
+        """Select the indexes in a range which are in all of some sorted lists.
+
+        Args:
+          begin: The first index of the range.
+          end: The index after the last of the range.
+          index_lists: A list of sorted lists of indexes.
+        Returns:
+          A sorted sequence of indexes.
+        """
+        if not index_lists:
+            return range(begin, end)
+        index_lists = sorted(index_lists, key=len)
+        others = [set(index_list) for index_list in index_lists[1:]]
+        return [index
+                for index in index_lists[0][bisect.bisect_left(index_lists[0], begin):
+                                            bisect.bisect_left(index_lists[0], end)]
+                if all(index in other for other in others)]
+
+    def _select_entry_indexes(self, restriction):
+        """Select the indexes of the entries which may satisfy a restriction.
+
+        The accounts of the restriction are ignored.
+
+        Args:
+          restriction: A query_compile.Restriction instance.
+        Returns:
+          A sorted sequence of entry indexes.
+        """
+        begin, end = 0, len(self.entries)
+        if restriction.begin is not None or restriction.end is not None:
+            dates = self._get_dates()
+            if dates is not None:
+                if restriction.begin is not None:
+                    begin = bisect.bisect_left(dates, restriction.begin)
+                if restriction.end is not None:
+                    end = bisect.bisect_left(dates, restriction.end)
+
+        entry_sets = self._get_entry_sets()
+        index_lists = [entry_sets.get((name, value), [])
+                       for name, values in [('tags', restriction.tags),
+                                            ('links', restriction.links)]
+                       for value in values]
+        return self._select(begin, end, index_lists)
+
+    def select_entries(self, restriction):
+        """Select the entries which may satisfy a restriction.
+
+        Args:
+          restriction: A query_compile.Restriction instance.
+        Returns:
+          A list of entries, in their original order.
+        """
+        return [self.entries[index]
+                for index in self._select_entry_indexes(restriction)]
+
+    def select_rows(self, restriction):
+        """Select the rows of the postings which may satisfy a restriction.
+
+        Args:
+          restriction: A query_compile.Restriction instance.
+        Returns:
+          A sorted sequence of row numbers, which index the list returned by
+          get_rows().
+        """
+        row_starts = self._get_row_starts()
+        entry_indexes = self._select_entry_indexes(restriction)
+        if isinstance(entry_indexes, range):
+            # The entries are only restricted by date.
+            begin, end = row_starts[entry_indexes.start], row_starts[entry_indexes.stop]
+            index_lists = []
+        else:
+            begin, end = 0, row_starts[-1]
+            index_lists = [[row
+                            for index in entry_indexes
+                            for row in range(row_starts[index], row_starts[index + 1])]]
+
+        if restriction.accounts:
+            account_rows = self._get_account_rows()
+            index_lists.append(sorted(itertools.chain.from_iterable(
+                rows
+                for account, rows in account_rows.items()
+                if all(predicate(account) for predicate in restriction.accounts))))
+
+        return self._select(begin, end, index_lists)
+
+
 class Allocator:
     """A helper class to count slot allocations and return unique handles to them.
     """
@@ -194,10 +394,68 @@ def row_sortkey(order_indexes, values, c_exprs):
     return tuple(key)
 
 
-def create_row_context(entries, options_map):
-    """Create the context container which we will use to evaluate rows."""
+class RowContextCache:
+    """A cache of the global properties of the row context of a ledger.
+
+    Computing these requires going over all the entries, which is redundant
+    across the queries of an interactive session. This holds them for the last
+    list of entries the context was created for; clear it when the entries are
+    modified, e.g. when the ledger is reloaded.
+    """
+
+    def __init__(self):
+        self.entries = None
+        self.options_map = None
+        self.context = None
+        self.index = None
+
+    def clear(self):
+        """Forget the cached context."""
+        self.entries = None
+        self.options_map = None
+        self.context = None
+        self.index = None
+
+    def get(self, entries, options_map):
+        """Get a prototype of the row context of a ledger, computing it if needed.
+
+        Args:
+          entries: A list of directives.
+          options_map: A parser's option_map.
+        Returns:
+          A RowContext instance, which should not be modified.
+        """
+        if (self.context is None or
+            entries is not self.entries or
+            options_map is not self.options_map):
+            self.context = _create_global_context(entries, options_map)
+            self.entries = entries
+            self.options_map = options_map
+        return self.context
+
+    def get_index(self, entries):
+        """Get the indexes of the entries of a ledger, creating them if needed.
+
+        Args:
+          entries: A list of directives.
+        Returns:
+          An EntryIndex instance.
+        """
+        if self.index is None or entries is not self.index.entries:
+            self.index = EntryIndex(entries)
+        return self.index
+
+
+def _create_global_context(entries, options_map):
+    """Create a row context with the global properties of a ledger.
+
+    Args:
+      entries: A list of directives.
+      options_map: A parser's option_map.
+    Returns:
+      A RowContext instance.
+    """
     context = RowContext()
-    context.balance = inventory.Inventory()
 
     # Initialize some global properties for use by some of the accessors.
     context.options_map = options_map
@@ -209,13 +467,57 @@ def create_row_context(entries, options_map):
     return context
 
 
-def execute_query(query, entries, options_map):
+def create_row_context(entries, options_map, context_cache=None):
+    """Create the context container which we will use to evaluate rows.
+
+    Args:
+      entries: A list of directives.
+      options_map: A parser's option_map.
+      context_cache: An optional RowContextCache to get the global properties of
+        the context from.
+    Returns:
+      A new RowContext instance.
+    """
+    if context_cache is None:
+        context = _create_global_context(entries, options_map)
+    else:
+        context = copy.copy(context_cache.get(entries, options_map))
+    context.balance = inventory.Inventory()
+    return context
+
+
+def get_postings(c_where, entries, index=None):
+    """Get the postings which may satisfy a WHERE clause.
+
+    Args:
+      c_where: A compiled expression tree (an EvalNode node) of a predicate on
+        postings, or None.
+      entries: A list of directives.
+      index: An optional EntryIndex of 'entries'.
+    Returns:
+      An iterable of (entry, posting) pairs, in the order of the entries.
+    """
+    restriction = (query_compile.plan_restriction(c_where)
+                   if c_where is not None
+                   else None)
+    if restriction is None:
+        return ((entry, posting)
+                for entry in misc_utils.filter_type(entries, data.Transaction)
+                for posting in entry.postings)
+    if index is None:
+        index = EntryIndex(entries)
+    rows = index.get_rows()
+    return (rows[row] for row in index.select_rows(restriction))
+
+
+def execute_query(query, entries, options_map, context_cache=None):
     """Given a compiled select statement, execute the query.
 
     Args:
       query: An instance of a query_compile.Query
       entries: A list of directives.
       options_map: A parser's option_map.
+      context_cache: An optional RowContextCache for these entries.
     Returns:
       A pair of:
         result_types: A list of (name, data-type) item pairs.
@@ -251,13 +553,18 @@ def execute_query(query, entries, options_map):
                                [c_target.c_expr for c_target in query.c_targets],
                                [query.c_where] if query.c_where else []))
 
-    context = create_row_context(entries, options_map)
+    context = create_row_context(entries, options_map, context_cache)
+    index = context_cache.get_index(entries) if context_cache is not None else None
 
     # Filter the entries using the FROM clause.
-    filt_entries = (filter_entries(query.c_from, entries, options_map, context)
+    filt_entries = (filter_entries(query.c_from, entries, options_map, context, index)
                     if query.c_from is not None else
                     entries)
 
+    # Only go over the postings which may satisfy the WHERE clause.
+    postings = get_postings(query.c_where, filt_entries,
+                            index if filt_entries is entries else None)
+
     # Dispatch between the non-aggregated queries and aggregated queries.
     c_where = query.c_where
     schwartz_rows = []
@@ -268,10 +575,12 @@ def execute_query(query, entries, options_map):
     if query.group_indexes is None:
         # This is a non-aggregated query.
 
-        # Iterate over all the postings once and produce schwartzian rows.
-        for entry in misc_utils.filter_type(filt_entries, data.Transaction):
-            context.entry = entry
-            for posting in entry.postings:
+        # Iterate over all the postings once and produce schwartzian rows. This
+        # is done lazily, so that rows beyond a limit aren't computed, and so
+        # that all the rows don't have to be held at once.
+        def generate_rows():
+            for entry, posting in postings:
+                context.entry = entry
                 context.posting = posting
                 if c_where is None or c_where(context):
                     # Compute the balance.
@@ -285,7 +594,8 @@ def execute_query(query, entries, options_map):
                     result = ResultRow._make(values[index]
                                              for index in result_indexes)
                     sortkey = row_sortkey(order_indexes, values, c_target_exprs)
-                    schwartz_rows.append((sortkey, result))
+                    yield (sortkey, result)
+        schwartz_rows = generate_rows()
     else:
         # This is an aggregated query.
 
@@ -310,32 +620,31 @@ def execute_query(query, entries, options_map):
 
         # Iterate over all the postings to evaluate the aggregates.
         agg_store = {}
-        for entry in misc_utils.filter_type(filt_entries, data.Transaction):
+        for entry, posting in postings:
             context.entry = entry
-            for posting in entry.postings:
-                context.posting = posting
-                if c_where is None or c_where(context):
-                    # Compute the balance.
-                    if uses_balance:
-                        context.balance.add_position(posting)
-
-                    # Compute the non-aggregate expressions.
-                    row_key = tuple(c_expr(context)
-                                    for c_expr in c_nonaggregate_exprs)
-
-                    # Get an appropriate store for the unique key of this row.
-                    try:
-                        store = agg_store[row_key]
-                    except KeyError:
-                        # This is a row; create a new store.
-                        store = allocator.create_store()
-                        for c_expr in c_aggregate_exprs:
-                            c_expr.initialize(store)
-                        agg_store[row_key] = store
-
-                    # Update the aggregate expressions.
+            context.posting = posting
+            if c_where is None or c_where(context):
+                # Compute the balance.
+                if uses_balance:
+                    context.balance.add_position(posting)
+
+                # Compute the non-aggregate expressions.
+                row_key = tuple(c_expr(context)
+                                for c_expr in c_nonaggregate_exprs)
+
+                # Get an appropriate store for the unique key of this row.
+                try:
+                    store = agg_store[row_key]
+                except KeyError:
+                    # This is a row; create a new store.
+                    store = allocator.create_store()
                     for c_expr in c_aggregate_exprs:
-                        c_expr.update(store, context)
+                        c_expr.initialize(store)
+                    agg_store[row_key] = store
+
+                # Update the aggregate expressions.
+                for c_expr in c_aggregate_exprs:
+                    c_expr.update(store, context)
 
         # Iterate over all the aggregations to produce the schwartzian rows.
         for key, store in agg_store.items():
@@ -360,21 +669,49 @@ def execute_query(query, entries, options_map):
             sortkey = row_sortkey(order_indexes, values, c_target_exprs)
             schwartz_rows.append((sortkey, result))
 
+    return finalize_results(query, result_types, schwartz_rows)
+
+
+def finalize_results(query, result_types, schwartz_rows):
+    """Order, uniquify, limit and flatten the rows of a query.
+
+    Args:
+      query: An instance of a query_compile.Query
+      result_types: A list of (name, data-type) item pairs.
+      schwartz_rows: An iterable of (sortkey, ResultRow) pairs, in the order
+        they were produced.
+    Returns:
+      A pair of:
+        result_types: A list of (name, data-type) item pairs.
+        result_rows: A list of ResultRow tuples of length and types described by
+          'result_types'.
+    """
     # Order results if requested.
-    if order_indexes is not None:
-        schwartz_rows.sort(key=operator.itemgetter(0),
-                           reverse=(query.ordering == 'DESC'))
+    if query.order_indexes is not None:
+        if query.limit is not None and not query.distinct:
+            # Only keep the first rows in order, in a heap bounded by the limit.
+            # This is equivalent to sorting all the rows, stably.
+            select_rows = (heapq.nlargest
+                           if query.ordering == 'DESC'
+                           else heapq.nsmallest)
+            schwartz_rows = select_rows(query.limit, schwartz_rows,
+                                        key=operator.itemgetter(0))
+        else:
+            schwartz_rows = sorted(schwartz_rows, key=operator.itemgetter(0),
+                                   reverse=(query.ordering == 'DESC'))
 
     # Extract final results, in sorted order at this point.
-    result_rows = [x[1] for x in schwartz_rows]
+    result_rows = (x[1] for x in schwartz_rows)
 
     # Apply distinct.
     if query.distinct:
-        result_rows = list(misc_utils.uniquify(result_rows))
+        result_rows = misc_utils.uniquify(result_rows)
 
-    # Apply limit.
+    # Apply limit, stopping the production of the rows early if they're not
+    # ordered.
     if query.limit is not None:
-        result_rows = result_rows[:query.limit]
+        result_rows = itertools.islice(result_rows, query.limit)
+    result_rows = list(result_rows)
 
     # Flatten inventories if requested.
     if query.flatten:
@@ -7,6 +7,7 @@ import io
 import unittest
 import textwrap
 from decimal import Decimal
+from unittest import mock
 
 from beancount.core.number import D
 from beancount.core import inventory
@@ -290,6 +291,132 @@ class TestExecutePrint(CommonInputBase, QueryBase):
         self.assertEqualEntries(self.INPUT, oss.getvalue())
 
 
+class TestRowContextCache(CommonInputBase, QueryBase):
+
+    def test_cache(self):
+        cache = qx.RowContextCache()
+        with mock.patch.object(qx.prices, 'build_price_map',
+                                        wraps=qx.prices.build_price_map) as build:
+            context = qx.create_row_context(self.entries, self.options_map, cache)
+            other_context = qx.create_row_context(self.entries, self.options_map, cache)
+            self.assertEqual(1, build.call_count)
+
+            # The global properties are shared, not the running balance.
+            self.assertIs(context.open_close_map, other_context.open_close_map)
+            self.assertIs(context.price_map, other_context.price_map)
+            self.assertIsNot(context.balance, other_context.balance)
+            self.assertEqual(set(self.context.open_close_map),
+                             set(context.open_close_map))
+
+            # The context is recomputed for other entries, or once cleared.
+            qx.create_row_context(self.entries[:4], self.options_map, cache)
+            self.assertEqual(2, build.call_count)
+            cache.clear()
+            qx.create_row_context(self.entries[:4], self.options_map, cache)
+            self.assertEqual(3, build.call_count)
+
+    def test_execute(self):
+        cache = qx.RowContextCache()
+        c_query = self.compile("""
+          SELECT account, sum(position) FROM year(date) = 2012 GROUP BY account;
+        """)
+        expected = qx.execute_query(c_query, self.entries, self.options_map)
+        for _ in range(2):
+            self.assertEqual(expected, qx.execute_query(c_query, self.entries,
+                                                        self.options_map, cache))
+
+        statement = qc.EvalPrint(qc.EvalFrom(qc.EvalEqual(qe.YearEntryColumn(),
+                                                          qc.EvalConstant(2012)),
+                                             None, None, None))
+        oss, cached_oss = io.StringIO(), io.StringIO()
+        qx.execute_print(statement, self.entries, self.options_map, oss)
+        qx.execute_print(statement, self.entries, self.options_map, cached_oss, cache)
+        self.assertEqual(oss.getvalue(), cached_oss.getvalue())
+
+
+class TestEntryIndex(CommonInputBase, QueryBase):
+
+    def restriction(self, **kwds):
+        fields = dict(begin=None, end=None, accounts=[], tags=set(), links=set())
+        fields.update(kwds)
+        return qc.Restriction(**fields)
+
+    def test_select_entries(self):
+        index = qx.EntryIndex(self.entries)
+        entries = index.select_entries(self.restriction(
+            begin=datetime.date(2011, 1, 1), end=datetime.date(2013, 10, 10)))
+        self.assertEqual(["Dinner with Uno", "Dinner with Dos", "Dinner with Tres"],
+                         [entry.narration for entry in entries])
+
+        # Unsorted entries aren't restricted by date.
+        index = qx.EntryIndex(self.entries[::-1])
+        entries = index.select_entries(self.restriction(
+            begin=datetime.date(2011, 1, 1), end=datetime.date(2013, 10, 10)))
+        self.assertEqual(self.entries[::-1], entries)
+
+    def test_select_rows(self):
+        index = qx.EntryIndex(self.entries)
+        rows = index.get_rows()
+        self.assertEqual(12, len(rows))
+
+        selected = index.select_rows(self.restriction(
+            begin=datetime.date(2013, 1, 1),
+            accounts=[lambda account: account.endswith(':Checking')]))
+        self.assertEqual([(datetime.date(2013, 3, 3), 'Assets:Bank:Checking'),
+                          (datetime.date(2013, 10, 10), 'Assets:Bank:Checking'),
+                          (datetime.date(2013, 10, 10), 'Assets:ForeignBank:Checking'),
+                          (datetime.date(2014, 4, 4), 'Assets:Bank:Checking')],
+                         [(rows[row][0].date, rows[row][1].account) for row in selected])
+
+        self.assertEqual([], list(index.select_rows(self.restriction(tags={'trip'}))))
+
+    @loader.load_doc()
+    def test_select_rows__tags_links(self, entries, _, __):
+        """
+          2010-01-01 open Assets:Cash
+          2010-01-01 open Expenses:Food
+
+          2010-02-01 * "A" #trip
+            Expenses:Food    1.00 USD
+            Assets:Cash
+
+          2010-03-01 * "B" #trip ^invoice
+            Expenses:Food    2.00 USD
+            Assets:Cash
+
+          2010-04-01 * "C" ^invoice
+            Expenses:Food    3.00 USD
+            Assets:Cash
+        """
+        index = qx.EntryIndex(entries)
+        rows = index.get_rows()
+        selected = index.select_rows(self.restriction(tags={'trip'}, links={'invoice'}))
+        self.assertEqual([("B", 'Expenses:Food'), ("B", 'Assets:Cash')],
+                         [(rows[row][0].narration, rows[row][1].account)
+                          for row in selected])
+
+    def test_execute(self):
+        cache = qx.RowContextCache()
+        for query in [
+                "SELECT date, account, balance WHERE account ~ 'Checking' AND year > 2011",
+                "SELECT account, sum(position) WHERE year = 2013 AND month = 10 "
+                "GROUP BY account",
+                "SELECT account, sum(position) FROM year = 2013 WHERE account ~ 'Bank' "
+                "GROUP BY account"]:
+            c_query = self.compile(query)
+            expected = qx.execute_query(c_query, self.entries, self.options_map)
+            self.assertTrue(expected[1])
+            for _ in range(2):
+                self.assertEqual(expected, qx.execute_query(
+                    c_query, self.entries, self.options_map, cache))
+
+        # The index of the entries is kept in the cache.
+        index = cache.get_index(self.entries)
+        with mock.patch.object(index, 'select_rows', wraps=index.select_rows) as select:
+            qx.execute_query(self.compile("SELECT account WHERE year = 2013"),
+                             self.entries, self.options_map, cache)
+            self.assertEqual(1, select.call_count)
+
 class TestAllocation(unittest.TestCase):
 
     def test_allocator(self):
@@ -843,6 +970,66 @@ class TestExecuteOptions(QueryBase):
                 ('Assets:AssetD', D('2.00')),
                 ])
 
+    def test_limit_desc_ties(self):
+        # The first rows with equal sort keys are kept, in order, as with a full sort.
+        self.check_query(
+            """
+              2010-02-23 *
+                Assets:AssetA       5.00 USD
+                Assets:AssetB       2.00 USD
+                Assets:AssetC       5.00 USD
+                Assets:AssetD       2.00 USD
+                Assets:AssetE       5.00 USD
+                Equity:Rest
+            """,
+            """
+            SELECT account, number ORDER BY number DESC LIMIT 4;
+            """,
+            [
+                ('account', str),
+                ('number', Decimal),
+                ],
+            [
+                ('Assets:AssetA', D('5.00')),
+                ('Assets:AssetC', D('5.00')),
+                ('Assets:AssetE', D('5.00')),
+                ('Assets:AssetB', D('2.00')),
+                ])
+
+    def test_limit_top_rows(self):
+        entries, _, options_map = loader.load_string(self.INPUT, dedent=True)
+        for ordering in 'ASC', 'DESC':
+            query = self.compile("""
+              SELECT account, number ORDER BY account {};
+            """.format(ordering))
+            _, sorted_rows = qx.execute_query(query, entries, options_map)
+            for limit in range(8):
+                query = self.compile("""
+                  SELECT account, number ORDER BY account {} LIMIT {};
+                """.format(ordering, limit))
+                _, result_rows = qx.execute_query(query, entries, options_map)
+                self.assertEqual(sorted_rows[:limit], result_rows)
+
+    def test_limit_unordered(self):
+        # The rows beyond the limit are not computed.
+        entries, _, options_map = loader.load_string(self.INPUT, dedent=True)
+        query = self.compile("""
+          SELECT account, balance LIMIT 2;
+        """)
+        with mock.patch.object(qe.BalanceColumn, '__call__', autospec=True,
+                               side_effect=lambda _, context: context.balance.copy()
+                               ) as balance_column:
+            _, result_rows = qx.execute_query(query, entries, options_map)
+        self.assertEqual(['Assets:AssetA', 'Assets:AssetD'],
+                         [row.account for row in result_rows])
+        self.assertEqual(2, balance_column.call_count)
+
+        query = self.compile("""
+          SELECT DISTINCT length(account) LIMIT 1;
+        """)
+        _, result_rows = qx.execute_query(query, entries, options_map)
+        self.assertEqual([(13,)], result_rows)
+
 
 class TestArithmeticFunctions(QueryBase):
 
@@ -6,13 +6,9 @@ __license__ = "GNU GPLv2"
 import collections
 import datetime
 import io
+import os
 import re
 
-import dateutil.parser
-
-import ply.lex
-import ply.yacc
-
 from beancount.core.number import D
 from beancount.utils.misc_utils import cmptuple
 
@@ -217,7 +213,7 @@ class Lexer:
         'COMMA', 'SEMI', 'LPAREN', 'RPAREN', 'TILDE',
         'EQ', 'NE', 'GT', 'GTE', 'LT', 'LTE',
         'ASTERISK', 'SLASH', 'PLUS', 'MINUS',
-    ] + list(keywords)
+    ] + sorted(keywords)
 
     # An identifier, for a column or a dimension or whatever.
     def t_ID(self, token):
@@ -238,6 +234,7 @@ class Lexer:
     def t_DATE(self, token):
         r"(\#(\"[^\"]*\"|\'[^\']*\')|\d\d\d\d-\d\d-\d\d)"
         if token.value[0] == '#':
+            import dateutil.parser  # Slow to import; deferred to its first use.
             token.value = dateutil.parser.parse(token.value[2:-1]).date()
         else:
             token.value = datetime.datetime.strptime(token.value, '%Y-%m-%d').date()
@@ -285,11 +282,20 @@ class SelectParser(Lexer):
 
     start = 'select_statement'
 
+    # The name of the module of generated parsing tables for the grammar. If
+    # it is missing or was generated from a different grammar, the tables are
+    # built when the parser is created instead. See generate_tables().
+    tabmodule = 'beancount.query.select_parsetab'
+
     def __init__(self, **options):
+        # Deferred, so that the syntax tree nodes can be imported cheaply.
+        import ply.lex
+        import ply.yacc
         self.ply_lexer = ply.lex.lex(module=self,
                                      optimize=False,
                                      debuglog=None,
                                      debug=False)
+        options.setdefault('tabmodule', self.tabmodule)
         self.ply_parser = ply.yacc.yacc(module=self,
                                         optimize=False,
                                         write_tables=False,
@@ -652,6 +658,8 @@ class Parser(SelectParser):
     """
     start = 'top_statement'
 
+    tabmodule = 'beancount.query.query_parsetab'
+
     def p_regular_statement(self, p):
         "top_statement : statement delimiter"
         p[0] = p[1]
@@ -755,3 +763,25 @@ def get_expression_name(expr):
 
     else:
         assert False, "Unknown expression type."
+
+
+def generate_tables():
+    """Regenerate the modules of parsing tables of the parsers, if stale.
+
+    This needs to be run whenever the grammar is changed; otherwise the parsers
+    are slower to create, as they have to build the tables themselves.
+    """
+    import ply.yacc
+    outputdir = os.path.dirname(os.path.abspath(__file__))
+    for parser_class in SelectParser, Parser:
+        ply.yacc.yacc(module=parser_class(),
+                      tabmodule=parser_class.tabmodule,
+                      outputdir=outputdir,
+                      optimize=False,
+                      write_tables=True,
+                      debuglog=None,
+                      debug=False)
+
+
+if __name__ == '__main__':
+    generate_tables()
@@ -2,8 +2,11 @@ __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
 import datetime
+import importlib
 import unittest
 
+import ply.yacc
+
 from beancount.core.number import D
 from beancount.query import query_parser as qp
 
@@ -664,5 +667,24 @@ class TestExplain(QueryParserTestBase):
             ), "EXPLAIN JOURNAL 'Assets:ETrade' AT units;")
 
 
+class TestParseTables(unittest.TestCase):
+
+    def test_tables_current(self):
+        # If this fails, regenerate the tables with 'make query_parsetab'.
+        for parser_class in qp.SelectParser, qp.Parser:
+            parser = parser_class()
+            pinfo = ply.yacc.ParserReflect({name: getattr(parser, name)
+                                            for name in dir(parser)})
+            pinfo.get_all()
+            tables = importlib.import_module(parser_class.tabmodule)
+            self.assertEqual(pinfo.signature(), tables._lr_signature)
+
+    def test_tables_missing(self):
+        class MissingTablesParser(qp.Parser):
+            tabmodule = 'beancount.query.missing_parsetab'
+        parser = MissingTablesParser()
+        self.assertEqual(qp.Errors(), parser.parse('ERRORS;'))
+
+
 if __name__ == '__main__':
     unittest.main()
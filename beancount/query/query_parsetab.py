@@ -0,0 +1,133 @@
+
+# query_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'top_statementleftORleftANDleftNOTleftPLUSMINUSleftASTERISKSLASHleftEQNEGTGTELTLTETILDEINAND AS ASC ASTERISK AT BALANCES BY CLEAR CLOSE COMMA DATE DECIMAL DESC DISTINCT EQ ERRORS EXPLAIN FALSE FLATTEN FROM GROUP GT GTE HAVING ID IN INTEGER JOURNAL LIMIT LPAREN LT LTE MINUS NE NOT NULL ON OPEN OR ORDER PIVOT PLUS PRINT RELOAD RPAREN RUN SELECT SEMI SLASH STRING TILDE TRUE WHERE\n        account : STRING\n        \n        select_statement : SELECT distinct target_spec from_subselect where                            group_by order_by pivot_by limit flatten\n        \n        distinct : empty\n                 | DISTINCT\n        \n        target_spec : ASTERISK\n                    | target_list\n        \n        target_list : target\n                    | target_list COMMA target\n        \n        target : expression AS ID\n               | expression\n        \n        from : empty\n             | FROM opt_expression opt_open opt_close opt_clear\n        \n        from_subselect : from\n                       | FROM LPAREN select_statement RPAREN\n        \n        opt_open : empty\n                 | OPEN ON DATE\n        \n        opt_close : empty\n                  | CLOSE\n                  | CLOSE ON DATE\n        \n        opt_clear : empty\n                  | CLEAR\n        \n        where : empty\n              | WHERE expression\n        \n        expr_index_list : expr_index\n                        | expr_index_list COMMA expr_index\n        \n        expr_index : expression\n                   | INTEGER\n        \n        group_by : empty\n                 | GROUP BY expr_index_list having\n        \n        having : empty\n               | HAVING expression\n        \n        order_by : empty\n                 | ORDER BY expr_index_list ordering\n        \n        ordering : empty\n                 | ASC\n                 | DESC\n        \n        pivot_by : empty\n                 | PIVOT BY column_list\n        \n        limit : empty\n              | LIMIT INTEGER\n        \n        flatten : empty\n                | FLATTEN\n        expression : expression AND expressionexpression : expression OR expressionexpression : NOT expressionexpression : LPAREN expression RPARENexpression : expression EQ expressionexpression : expression NE expressionexpression : expression GT expressionexpression : expression GTE expressionexpression : expression LT expressionexpression : expression LTE expressionexpression : expression TILDE expressionexpression : expression IN expressionexpression : columnexpression : constantexpression : expression ASTERISK expressionexpression : expression SLASH expressionexpression : expression PLUS expressionexpression : expression MINUS expressionexpression : ID LPAREN expression_list_opt RPAREN\n        opt_expression : empty\n                       | expression\n        \n        expression_list_opt : empty\n                            | expression\n                            | expression_list COMMA expression\n        \n        expression_list : expression\n                        | expression_list COMMA expression\n        \n        column : ID\n        \n        column_list : column\n                    | column_list COMMA column\n        \n        constant : NULL\n                 | boolean\n                 | INTEGER\n                 | DECIMAL\n                 | STRING\n                 | DATE\n        \n        boolean : TRUE\n                | FALSE\n        \n        empty :\n        top_statement : statement delimitertop_statement : EXPLAIN statement delimiter\n        statement : select_statement\n                  | balances_statement\n                  | journal_statement\n                  | print_statement\n                  | run_statement\n                  | errors_statement\n                  | reload_statement\n        \n        delimiter : SEMI\n                  | empty\n        \n        balances_statement : BALANCES summary_func from where\n        \n        journal_statement : JOURNAL summary_func from\n                          | JOURNAL account summary_func from\n        \n        summary_func : empty\n                     | AT ID\n        \n        print_statement : PRINT from\n        \n        run_statement : RUN ID\n                      | RUN STRING\n                      | RUN ASTERISK\n                      | RUN empty\n        \n        errors_statement : ERRORS\n        \n        reload_statement : RELOAD\n        '
+    
+_lr_action_items = {'EXPLAIN':([0,],[3,]),'SELECT':([0,3,94,],[11,11,11,]),'BALANCES':([0,3,],[12,12,]),'JOURNAL':([0,3,],[13,13,]),'PRINT':([0,3,],[14,14,]),'RUN':([0,3,],[15,15,]),'ERRORS':([0,3,],[16,16,]),'RELOAD':([0,3,],[17,17,]),'$end':([1,2,4,5,6,7,8,9,10,12,13,14,15,16,17,18,19,20,21,25,26,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,84,86,87,89,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,116,117,118,119,121,122,125,127,128,129,131,132,133,136,138,139,140,143,144,145,146,147,148,151,152,154,156,157,158,159,160,161,162,163,164,165,166,167,168,170,],[0,-80,-83,-84,-85,-86,-87,-88,-89,-80,-80,-80,-80,-102,-103,-81,-90,-91,-80,-80,-95,-80,-80,-1,-97,-11,-80,-98,-99,-100,-101,-82,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-96,-93,-80,-80,-62,-63,-80,-13,-80,-45,-92,-22,-94,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,-80,-37,-80,-24,-26,-27,-80,-39,-80,-29,-30,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'SEMI':([2,4,5,6,7,8,9,10,12,13,14,15,16,17,21,25,26,28,29,30,31,32,33,34,35,36,37,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,84,86,87,89,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,116,117,118,119,121,122,125,127,128,129,131,132,133,136,138,139,140,143,144,145,146,147,148,151,152,154,156,157,158,159,160,161,162,163,164,165,166,167,168,170,],[19,-83,-84,-85,-86,-87,-88,-89,-80,-80,-80,-80,-102,-103,19,-80,-95,-80,-80,-1,-97,-11,-80,-98,-99,-100,-101,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-96,-93,-80,-80,-62,-63,-80,-13,-80,-45,-92,-22,-94,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,-80,-37,-80,-24,-26,-27,-80,-39,-80,-29,-30,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'DISTINCT':([11,],[24,]),'ASTERISK':([11,15,22,23,24,43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[-80,36,40,-3,-4,79,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,79,79,79,79,79,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,79,79,79,-46,79,-61,79,79,-74,79,]),'NOT':([11,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[-80,45,-3,-4,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,45,]),'LPAREN':([11,22,23,24,33,44,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[-80,46,-3,-4,46,83,46,46,94,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,46,]),'ID':([11,15,22,23,24,27,33,45,46,66,67,68,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,150,153,155,169,],[-80,34,44,-3,-4,58,44,44,44,44,44,96,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,44,162,44,44,162,]),'NULL':([11,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[-80,49,-3,-4,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,49,]),'INTEGER':([11,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,149,153,155,],[-80,51,-3,-4,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,51,146,146,159,146,51,]),'DECIMAL':([11,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[-80,52,-3,-4,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,52,]),'STRING':([11,13,15,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[-80,30,35,53,-3,-4,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,53,]),'DATE':([11,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,120,126,130,135,142,153,155,],[-80,54,-3,-4,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,54,131,54,138,54,54,54,54,]),'TRUE':([11,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[-80,55,-3,-4,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,55,]),'FALSE':([11,22,23,24,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[-80,56,-3,-4,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,56,]),'AT':([12,13,29,30,],[27,27,27,-1,]),'FROM':([12,13,14,25,26,28,29,30,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,58,60,84,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,125,],[-80,-80,33,33,-95,33,-80,-1,66,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-96,33,-45,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'WHERE':([12,25,26,32,33,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,57,58,61,62,63,64,65,66,84,90,91,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,117,118,119,125,127,128,129,131,136,138,],[-80,-80,-95,-11,-80,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,88,-96,-80,-62,-63,88,-13,-80,-45,-80,-15,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-17,-18,-61,-12,-20,-21,-16,-14,-19,]),'GROUP':([32,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,61,62,63,64,65,66,84,87,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,116,117,118,119,125,127,128,129,131,136,138,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,123,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-61,-12,-20,-21,-16,-14,-19,]),'ORDER':([32,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,61,62,63,64,65,66,84,87,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,116,117,118,119,121,122,125,127,128,129,131,136,138,143,144,145,146,152,154,167,168,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,134,-28,-61,-12,-20,-21,-16,-14,-19,-80,-24,-26,-27,-29,-30,-25,-31,]),'PIVOT':([32,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,61,62,63,64,65,66,84,87,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,116,117,118,119,121,122,125,127,128,129,131,132,133,136,138,143,144,145,146,151,152,154,163,164,165,166,167,168,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,141,-32,-14,-19,-80,-24,-26,-27,-80,-29,-30,-33,-34,-35,-36,-25,-31,]),'LIMIT':([32,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,61,62,63,64,65,66,84,87,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,116,117,118,119,121,122,125,127,128,129,131,132,133,136,138,139,140,143,144,145,146,151,152,154,160,161,162,163,164,165,166,167,168,170,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,149,-37,-80,-24,-26,-27,-80,-29,-30,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'FLATTEN':([32,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,61,62,63,64,65,66,84,87,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,116,117,118,119,121,122,125,127,128,129,131,132,133,136,138,139,140,143,144,145,146,147,148,151,152,154,159,160,161,162,163,164,165,166,167,168,170,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-45,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-17,-18,-80,-28,-61,-12,-20,-21,-16,-80,-32,-14,-19,-80,-37,-80,-24,-26,-27,158,-39,-80,-29,-30,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'RPAREN':([32,39,40,41,42,43,44,47,48,49,50,51,52,53,54,55,56,61,62,63,64,65,66,83,84,85,87,90,91,93,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,111,112,113,115,116,117,118,119,121,122,124,125,127,128,129,131,132,133,136,137,138,139,140,143,144,145,146,147,148,151,152,154,156,157,158,159,160,161,162,163,164,165,166,167,168,170,],[-11,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-13,-80,-80,-45,115,-22,-80,-15,-80,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,125,-64,-65,-46,-23,-80,-17,-18,-80,-28,136,-61,-12,-20,-21,-16,-80,-32,-14,-66,-19,-80,-37,-80,-24,-26,-27,-80,-39,-80,-29,-30,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'OPEN':([33,44,47,48,49,50,51,52,53,54,55,56,61,62,63,66,84,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,125,],[-80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,92,-62,-63,-80,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'CLOSE':([33,44,47,48,49,50,51,52,53,54,55,56,61,62,63,66,84,90,91,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,125,131,],[-80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-45,119,-15,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-16,]),'CLEAR':([33,44,47,48,49,50,51,52,53,54,55,56,61,62,63,66,84,90,91,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,117,118,119,125,131,138,],[-80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-62,-63,-80,-45,-80,-15,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,129,-17,-18,-61,-16,-19,]),'COMMA':([41,42,43,44,47,48,49,50,51,52,53,54,55,56,84,95,96,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,114,115,125,137,143,144,145,146,151,160,161,162,167,170,],[67,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-67,126,-46,-61,-68,153,-24,-26,-27,153,169,-70,-69,-25,-71,]),'AS':([43,44,47,48,49,50,51,52,53,54,55,56,84,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,125,],[68,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'AND':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[69,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,69,-45,69,-43,69,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,69,-46,69,-61,69,69,-74,69,]),'OR':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[70,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,70,-45,70,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,70,-46,70,-61,70,70,-74,70,]),'EQ':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[71,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,71,71,71,71,71,-47,-48,-49,-50,-51,-52,-53,-54,71,71,71,71,71,-46,71,-61,71,71,-74,71,]),'NE':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[72,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,72,72,72,72,72,-47,-48,-49,-50,-51,-52,-53,-54,72,72,72,72,72,-46,72,-61,72,72,-74,72,]),'GT':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[73,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,73,73,73,73,73,-47,-48,-49,-50,-51,-52,-53,-54,73,73,73,73,73,-46,73,-61,73,73,-74,73,]),'GTE':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[74,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,74,74,74,74,74,-47,-48,-49,-50,-51,-52,-53,-54,74,74,74,74,74,-46,74,-61,74,74,-74,74,]),'LT':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[75,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,75,75,75,75,75,-47,-48,-49,-50,-51,-52,-53,-54,75,75,75,75,75,-46,75,-61,75,75,-74,75,]),'LTE':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[76,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,76,76,76,76,76,-47,-48,-49,-50,-51,-52,-53,-54,76,76,76,76,76,-46,76,-61,76,76,-74,76,]),'TILDE':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[77,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,77,77,77,77,77,-47,-48,-49,-50,-51,-52,-53,-54,77,77,77,77,77,-46,77,-61,77,77,-74,77,]),'IN':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[78,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,78,78,78,78,78,-47,-48,-49,-50,-51,-52,-53,-54,78,78,78,78,78,-46,78,-61,78,78,-74,78,]),'SLASH':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[80,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,80,80,80,80,80,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,80,80,80,-46,80,-61,80,80,-74,80,]),'PLUS':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[81,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,81,81,81,81,81,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,81,-46,81,-61,81,81,-74,81,]),'MINUS':([43,44,47,48,49,50,51,52,53,54,55,56,63,84,85,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,115,116,125,137,145,146,168,],[82,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,82,82,82,82,82,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,82,-46,82,-61,82,82,-74,82,]),'HAVING':([44,47,48,49,50,51,52,53,54,55,56,84,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,125,143,144,145,146,167,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,155,-24,-26,-27,-25,]),'ASC':([44,47,48,49,50,51,52,53,54,55,56,84,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,125,144,145,146,151,167,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-24,-26,-27,165,-25,]),'DESC':([44,47,48,49,50,51,52,53,54,55,56,84,97,98,99,100,101,102,103,104,105,106,107,108,109,110,115,125,144,145,146,151,167,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-24,-26,-27,166,-25,]),'ON':([92,119,],[120,130,]),'BY':([123,134,141,],[135,142,150,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'top_statement':([0,],[1,]),'statement':([0,3,],[2,21,]),'select_statement':([0,3,94,],[4,4,124,]),'balances_statement':([0,3,],[5,5,]),'journal_statement':([0,3,],[6,6,]),'print_statement':([0,3,],[7,7,]),'run_statement':([0,3,],[8,8,]),'errors_statement':([0,3,],[9,9,]),'reload_statement':([0,3,],[10,10,]),'delimiter':([2,21,],[18,38,]),'empty':([2,11,12,13,14,15,21,25,28,29,33,39,57,60,61,64,66,83,90,93,117,121,132,139,143,147,151,],[20,23,26,26,32,37,20,32,32,26,62,32,87,32,91,87,62,112,118,122,128,133,140,148,154,157,164,]),'distinct':([11,],[22,]),'summary_func':([12,13,29,],[25,28,60,]),'account':([13,],[29,]),'from':([14,25,28,39,60,],[31,57,59,65,89,]),'target_spec':([22,],[39,]),'target_list':([22,],[41,]),'target':([22,67,],[42,95,]),'expression':([22,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[43,63,84,85,63,43,97,98,99,100,101,102,103,104,105,106,107,108,109,110,113,116,85,137,145,145,145,168,]),'column':([22,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,150,153,155,169,],[47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,47,161,47,47,170,]),'constant':([22,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,48,]),'boolean':([22,33,45,46,66,67,69,70,71,72,73,74,75,76,77,78,79,80,81,82,83,88,94,126,135,142,153,155,],[50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,50,]),'opt_expression':([33,66,],[61,61,]),'from_subselect':([39,],[64,]),'where':([57,64,],[86,93,]),'opt_open':([61,],[90,]),'expression_list_opt':([83,],[111,]),'expression_list':([83,],[114,]),'opt_close':([90,],[117,]),'group_by':([93,],[121,]),'opt_clear':([117,],[127,]),'order_by':([121,],[132,]),'pivot_by':([132,],[139,]),'expr_index_list':([135,142,],[143,151,]),'expr_index':([135,142,153,],[144,144,167,]),'limit':([139,],[147,]),'having':([143,],[152,]),'flatten':([147,],[156,]),'column_list':([150,],[160,]),'ordering':([151,],[163,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> top_statement","S'",1,None,None,None),
+  ('account -> STRING','account',1,'p_account','query_parser.py',341),
+  ('select_statement -> SELECT distinct target_spec from_subselect where group_by order_by pivot_by limit flatten','select_statement',10,'p_select_statement','query_parser.py',347),
+  ('distinct -> empty','distinct',1,'p_distinct','query_parser.py',354),
+  ('distinct -> DISTINCT','distinct',1,'p_distinct','query_parser.py',355),
+  ('target_spec -> ASTERISK','target_spec',1,'p_target_spec','query_parser.py',361),
+  ('target_spec -> target_list','target_spec',1,'p_target_spec','query_parser.py',362),
+  ('target_list -> target','target_list',1,'p_target_list','query_parser.py',368),
+  ('target_list -> target_list COMMA target','target_list',3,'p_target_list','query_parser.py',369),
+  ('target -> expression AS ID','target',3,'p_target','query_parser.py',375),
+  ('target -> expression','target',1,'p_target','query_parser.py',376),
+  ('from -> empty','from',1,'p_from','query_parser.py',382),
+  ('from -> FROM opt_expression opt_open opt_close opt_clear','from',5,'p_from','query_parser.py',383),
+  ('from_subselect -> from','from_subselect',1,'p_from_subselect','query_parser.py',394),
+  ('from_subselect -> FROM LPAREN select_statement RPAREN','from_subselect',4,'p_from_subselect','query_parser.py',395),
+  ('opt_open -> empty','opt_open',1,'p_opt_open','query_parser.py',404),
+  ('opt_open -> OPEN ON DATE','opt_open',3,'p_opt_open','query_parser.py',405),
+  ('opt_close -> empty','opt_close',1,'p_opt_close','query_parser.py',411),
+  ('opt_close -> CLOSE','opt_close',1,'p_opt_close','query_parser.py',412),
+  ('opt_close -> CLOSE ON DATE','opt_close',3,'p_opt_close','query_parser.py',413),
+  ('opt_clear -> empty','opt_clear',1,'p_opt_clear','query_parser.py',421),
+  ('opt_clear -> CLEAR','opt_clear',1,'p_opt_clear','query_parser.py',422),
+  ('where -> empty','where',1,'p_where','query_parser.py',428),
+  ('where -> WHERE expression','where',2,'p_where','query_parser.py',429),
+  ('expr_index_list -> expr_index','expr_index_list',1,'p_expr_index_list','query_parser.py',437),
+  ('expr_index_list -> expr_index_list COMMA expr_index','expr_index_list',3,'p_expr_index_list','query_parser.py',438),
+  ('expr_index -> expression','expr_index',1,'p_expr_index','query_parser.py',444),
+  ('expr_index -> INTEGER','expr_index',1,'p_expr_index','query_parser.py',445),
+  ('group_by -> empty','group_by',1,'p_group_by','query_parser.py',451),
+  ('group_by -> GROUP BY expr_index_list having','group_by',4,'p_group_by','query_parser.py',452),
+  ('having -> empty','having',1,'p_having','query_parser.py',458),
+  ('having -> HAVING expression','having',2,'p_having','query_parser.py',459),
+  ('order_by -> empty','order_by',1,'p_order_by','query_parser.py',465),
+  ('order_by -> ORDER BY expr_index_list ordering','order_by',4,'p_order_by','query_parser.py',466),
+  ('ordering -> empty','ordering',1,'p_ordering','query_parser.py',472),
+  ('ordering -> ASC','ordering',1,'p_ordering','query_parser.py',473),
+  ('ordering -> DESC','ordering',1,'p_ordering','query_parser.py',474),
+  ('pivot_by -> empty','pivot_by',1,'p_pivot_by','query_parser.py',480),
+  ('pivot_by -> PIVOT BY column_list','pivot_by',3,'p_pivot_by','query_parser.py',481),
+  ('limit -> empty','limit',1,'p_limit','query_parser.py',487),
+  ('limit -> LIMIT INTEGER','limit',2,'p_limit','query_parser.py',488),
+  ('flatten -> empty','flatten',1,'p_flatten','query_parser.py',494),
+  ('flatten -> FLATTEN','flatten',1,'p_flatten','query_parser.py',495),
+  ('expression -> expression AND expression','expression',3,'p_expression_and','query_parser.py',510),
+  ('expression -> expression OR expression','expression',3,'p_expression_or','query_parser.py',514),
+  ('expression -> NOT expression','expression',2,'p_expression_not','query_parser.py',518),
+  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_paren','query_parser.py',522),
+  ('expression -> expression EQ expression','expression',3,'p_expression_eq','query_parser.py',526),
+  ('expression -> expression NE expression','expression',3,'p_expression_ne','query_parser.py',530),
+  ('expression -> expression GT expression','expression',3,'p_expression_gt','query_parser.py',534),
+  ('expression -> expression GTE expression','expression',3,'p_expression_gte','query_parser.py',538),
+  ('expression -> expression LT expression','expression',3,'p_expression_lt','query_parser.py',542),
+  ('expression -> expression LTE expression','expression',3,'p_expression_lte','query_parser.py',546),
+  ('expression -> expression TILDE expression','expression',3,'p_expression_match','query_parser.py',550),
+  ('expression -> expression IN expression','expression',3,'p_expression_contains','query_parser.py',554),
+  ('expression -> column','expression',1,'p_expression_column','query_parser.py',558),
+  ('expression -> constant','expression',1,'p_expression_constant','query_parser.py',562),
+  ('expression -> expression ASTERISK expression','expression',3,'p_expression_mul','query_parser.py',566),
+  ('expression -> expression SLASH expression','expression',3,'p_expression_div','query_parser.py',570),
+  ('expression -> expression PLUS expression','expression',3,'p_expression_add','query_parser.py',574),
+  ('expression -> expression MINUS expression','expression',3,'p_expression_sub','query_parser.py',578),
+  ('expression -> ID LPAREN expression_list_opt RPAREN','expression',4,'p_expression_function','query_parser.py',582),
+  ('opt_expression -> empty','opt_expression',1,'p_opt_expression','query_parser.py',587),
+  ('opt_expression -> expression','opt_expression',1,'p_opt_expression','query_parser.py',588),
+  ('expression_list_opt -> empty','expression_list_opt',1,'p_expression_list_opt','query_parser.py',594),
+  ('expression_list_opt -> expression','expression_list_opt',1,'p_expression_list_opt','query_parser.py',595),
+  ('expression_list_opt -> expression_list COMMA expression','expression_list_opt',3,'p_expression_list_opt','query_parser.py',596),
+  ('expression_list -> expression','expression_list',1,'p_expression_list','query_parser.py',602),
+  ('expression_list -> expression_list COMMA expression','expression_list',3,'p_expression_list','query_parser.py',603),
+  ('column -> ID','column',1,'p_column','query_parser.py',609),
+  ('column_list -> column','column_list',1,'p_column_list','query_parser.py',615),
+  ('column_list -> column_list COMMA column','column_list',3,'p_column_list','query_parser.py',616),
+  ('constant -> NULL','constant',1,'p_constant','query_parser.py',622),
+  ('constant -> boolean','constant',1,'p_constant','query_parser.py',623),
+  ('constant -> INTEGER','constant',1,'p_constant','query_parser.py',624),
+  ('constant -> DECIMAL','constant',1,'p_constant','query_parser.py',625),
+  ('constant -> STRING','constant',1,'p_constant','query_parser.py',626),
+  ('constant -> DATE','constant',1,'p_constant','query_parser.py',627),
+  ('boolean -> TRUE','boolean',1,'p_boolean','query_parser.py',633),
+  ('boolean -> FALSE','boolean',1,'p_boolean','query_parser.py',634),
+  ('empty -> <empty>','empty',0,'p_empty','query_parser.py',640),
+  ('top_statement -> statement delimiter','top_statement',2,'p_regular_statement','query_parser.py',665),
+  ('top_statement -> EXPLAIN statement delimiter','top_statement',3,'p_explain_statement','query_parser.py',669),
+  ('statement -> select_statement','statement',1,'p_statement','query_parser.py',674),
+  ('statement -> balances_statement','statement',1,'p_statement','query_parser.py',675),
+  ('statement -> journal_statement','statement',1,'p_statement','query_parser.py',676),
+  ('statement -> print_statement','statement',1,'p_statement','query_parser.py',677),
+  ('statement -> run_statement','statement',1,'p_statement','query_parser.py',678),
+  ('statement -> errors_statement','statement',1,'p_statement','query_parser.py',679),
+  ('statement -> reload_statement','statement',1,'p_statement','query_parser.py',680),
+  ('delimiter -> SEMI','delimiter',1,'p_delimiter','query_parser.py',686),
+  ('delimiter -> empty','delimiter',1,'p_delimiter','query_parser.py',687),
+  ('balances_statement -> BALANCES summary_func from where','balances_statement',4,'p_balances_statement','query_parser.py',692),
+  ('journal_statement -> JOURNAL summary_func from','journal_statement',3,'p_journal_statement','query_parser.py',698),
+  ('journal_statement -> JOURNAL account summary_func from','journal_statement',4,'p_journal_statement','query_parser.py',699),
+  ('summary_func -> empty','summary_func',1,'p_summary_func','query_parser.py',705),
+  ('summary_func -> AT ID','summary_func',2,'p_summary_func','query_parser.py',706),
+  ('print_statement -> PRINT from','print_statement',2,'p_print_statement','query_parser.py',712),
+  ('run_statement -> RUN ID','run_statement',2,'p_run_statement','query_parser.py',718),
+  ('run_statement -> RUN STRING','run_statement',2,'p_run_statement','query_parser.py',719),
+  ('run_statement -> RUN ASTERISK','run_statement',2,'p_run_statement','query_parser.py',720),
+  ('run_statement -> RUN empty','run_statement',2,'p_run_statement','query_parser.py',721),
+  ('errors_statement -> ERRORS','errors_statement',1,'p_errors_statement','query_parser.py',727),
+  ('reload_statement -> RELOAD','reload_statement',1,'p_reload_statement','query_parser.py',733),
+]
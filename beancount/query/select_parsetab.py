@@ -0,0 +1,110 @@
+
+# select_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'select_statementleftORleftANDleftNOTleftPLUSMINUSleftASTERISKSLASHleftEQNEGTGTELTLTETILDEINAND AS ASC ASTERISK AT BALANCES BY CLEAR CLOSE COMMA DATE DECIMAL DESC DISTINCT EQ ERRORS EXPLAIN FALSE FLATTEN FROM GROUP GT GTE HAVING ID IN INTEGER JOURNAL LIMIT LPAREN LT LTE MINUS NE NOT NULL ON OPEN OR ORDER PIVOT PLUS PRINT RELOAD RPAREN RUN SELECT SEMI SLASH STRING TILDE TRUE WHERE\n        account : STRING\n        \n        select_statement : SELECT distinct target_spec from_subselect where                            group_by order_by pivot_by limit flatten\n        \n        distinct : empty\n                 | DISTINCT\n        \n        target_spec : ASTERISK\n                    | target_list\n        \n        target_list : target\n                    | target_list COMMA target\n        \n        target : expression AS ID\n               | expression\n        \n        from : empty\n             | FROM opt_expression opt_open opt_close opt_clear\n        \n        from_subselect : from\n                       | FROM LPAREN select_statement RPAREN\n        \n        opt_open : empty\n                 | OPEN ON DATE\n        \n        opt_close : empty\n                  | CLOSE\n                  | CLOSE ON DATE\n        \n        opt_clear : empty\n                  | CLEAR\n        \n        where : empty\n              | WHERE expression\n        \n        expr_index_list : expr_index\n                        | expr_index_list COMMA expr_index\n        \n        expr_index : expression\n                   | INTEGER\n        \n        group_by : empty\n                 | GROUP BY expr_index_list having\n        \n        having : empty\n               | HAVING expression\n        \n        order_by : empty\n                 | ORDER BY expr_index_list ordering\n        \n        ordering : empty\n                 | ASC\n                 | DESC\n        \n        pivot_by : empty\n                 | PIVOT BY column_list\n        \n        limit : empty\n              | LIMIT INTEGER\n        \n        flatten : empty\n                | FLATTEN\n        expression : expression AND expressionexpression : expression OR expressionexpression : NOT expressionexpression : LPAREN expression RPARENexpression : expression EQ expressionexpression : expression NE expressionexpression : expression GT expressionexpression : expression GTE expressionexpression : expression LT expressionexpression : expression LTE expressionexpression : expression TILDE expressionexpression : expression IN expressionexpression : columnexpression : constantexpression : expression ASTERISK expressionexpression : expression SLASH expressionexpression : expression PLUS expressionexpression : expression MINUS expressionexpression : ID LPAREN expression_list_opt RPAREN\n        opt_expression : empty\n                       | expression\n        \n        expression_list_opt : empty\n                            | expression\n                            | expression_list COMMA expression\n        \n        expression_list : expression\n                        | expression_list COMMA expression\n        \n        column : ID\n        \n        column_list : column\n                    | column_list COMMA column\n        \n        constant : NULL\n                 | boolean\n                 | INTEGER\n                 | DECIMAL\n                 | STRING\n                 | DATE\n        \n        boolean : TRUE\n                | FALSE\n        \n        empty :\n        '
+    
+_lr_action_items = {'SELECT':([0,50,],[2,2,]),'$end':([1,6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,45,47,48,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,75,76,78,80,81,83,85,86,89,90,91,92,95,96,99,100,101,102,103,104,105,107,108,109,112,113,115,117,118,119,120,121,122,123,124,125,126,127,128,129,130,132,],[0,-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-13,-80,-11,-45,-80,-22,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-28,-23,-80,-15,-61,-80,-32,-14,-80,-17,-18,-80,-37,-80,-24,-26,-27,-12,-20,-21,-16,-80,-39,-80,-29,-30,-19,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'DISTINCT':([2,],[5,]),'ASTERISK':([2,3,4,5,10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[-80,7,-3,-4,40,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,40,40,40,40,40,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,40,40,40,-46,40,-61,40,40,-74,40,]),'NOT':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[-80,12,-3,-4,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,12,]),'LPAREN':([2,3,4,5,11,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[-80,13,-3,-4,44,13,13,50,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,13,]),'ID':([2,3,4,5,12,13,26,28,29,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,111,114,116,131,],[-80,11,-3,-4,11,11,11,11,55,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,11,124,11,11,124,]),'NULL':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[-80,16,-3,-4,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,16,]),'INTEGER':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,110,114,116,],[-80,18,-3,-4,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,18,102,102,121,102,18,]),'DECIMAL':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[-80,19,-3,-4,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,19,]),'STRING':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[-80,20,-3,-4,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,20,]),'DATE':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,93,98,106,114,116,],[-80,21,-3,-4,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,21,107,21,117,21,21,]),'TRUE':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[-80,22,-3,-4,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,]),'FALSE':([2,3,4,5,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[-80,23,-3,-4,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,]),'FROM':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,45,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,83,],[26,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'WHERE':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,45,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,80,81,83,89,90,91,92,103,104,105,107,117,],[-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,49,-13,-80,-11,-45,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-15,-61,-14,-80,-17,-18,-12,-20,-21,-16,-19,]),'GROUP':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,45,47,48,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,78,80,81,83,89,90,91,92,103,104,105,107,117,],[-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-13,-80,-11,-45,77,-22,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-23,-80,-15,-61,-14,-80,-17,-18,-12,-20,-21,-16,-19,]),'ORDER':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,45,47,48,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,75,76,78,80,81,83,89,90,91,92,99,100,101,102,103,104,105,107,113,115,117,129,130,],[-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-13,-80,-11,-45,-80,-22,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,87,-28,-23,-80,-15,-61,-14,-80,-17,-18,-80,-24,-26,-27,-12,-20,-21,-16,-29,-30,-19,-25,-31,]),'PIVOT':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,45,47,48,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,75,76,78,80,81,83,85,86,89,90,91,92,99,100,101,102,103,104,105,107,112,113,115,117,125,126,127,128,129,130,],[-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-13,-80,-11,-45,-80,-22,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-28,-23,-80,-15,-61,97,-32,-14,-80,-17,-18,-80,-24,-26,-27,-12,-20,-21,-16,-80,-29,-30,-19,-33,-34,-35,-36,-25,-31,]),'LIMIT':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,45,47,48,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,75,76,78,80,81,83,85,86,89,90,91,92,95,96,99,100,101,102,103,104,105,107,112,113,115,117,122,123,124,125,126,127,128,129,130,132,],[-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-13,-80,-11,-45,-80,-22,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-28,-23,-80,-15,-61,-80,-32,-14,-80,-17,-18,110,-37,-80,-24,-26,-27,-12,-20,-21,-16,-80,-29,-30,-19,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'FLATTEN':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,45,47,48,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,75,76,78,80,81,83,85,86,89,90,91,92,95,96,99,100,101,102,103,104,105,107,108,109,112,113,115,117,121,122,123,124,125,126,127,128,129,130,132,],[-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-13,-80,-11,-45,-80,-22,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-28,-23,-80,-15,-61,-80,-32,-14,-80,-17,-18,-80,-37,-80,-24,-26,-27,-12,-20,-21,-16,120,-39,-80,-29,-30,-19,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'RPAREN':([6,7,8,9,10,11,14,15,16,17,18,19,20,21,22,23,24,25,26,27,44,45,46,47,48,51,52,53,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,70,71,72,74,75,76,78,79,80,81,83,85,86,89,90,91,92,94,95,96,99,100,101,102,103,104,105,107,108,109,112,113,115,117,118,119,120,121,122,123,124,125,126,127,128,129,130,132,],[-80,-5,-6,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-13,-80,-11,-80,-45,74,-80,-22,-80,-62,-63,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,83,-64,-65,-46,-80,-28,-23,89,-80,-15,-61,-80,-32,-14,-80,-17,-18,-66,-80,-37,-80,-24,-26,-27,-12,-20,-21,-16,-80,-39,-80,-29,-30,-19,-2,-41,-42,-40,-38,-70,-69,-33,-34,-35,-36,-25,-31,-71,]),'COMMA':([8,9,10,11,14,15,16,17,18,19,20,21,22,23,45,54,55,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,73,74,83,94,99,100,101,102,112,122,123,124,129,132,],[28,-7,-10,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-8,-9,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-67,84,-46,-61,-68,114,-24,-26,-27,114,131,-70,-69,-25,-71,]),'AS':([10,11,14,15,16,17,18,19,20,21,22,23,45,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,83,],[29,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'AND':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[30,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,30,30,-43,30,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,30,-46,30,-61,30,30,-74,30,]),'OR':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[31,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,31,31,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,31,-46,31,-61,31,31,-74,31,]),'EQ':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[32,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,32,32,32,32,32,-47,-48,-49,-50,-51,-52,-53,-54,32,32,32,32,32,-46,32,-61,32,32,-74,32,]),'NE':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[33,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,33,33,33,33,33,-47,-48,-49,-50,-51,-52,-53,-54,33,33,33,33,33,-46,33,-61,33,33,-74,33,]),'GT':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[34,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,34,34,34,34,34,-47,-48,-49,-50,-51,-52,-53,-54,34,34,34,34,34,-46,34,-61,34,34,-74,34,]),'GTE':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[35,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,35,35,35,35,35,-47,-48,-49,-50,-51,-52,-53,-54,35,35,35,35,35,-46,35,-61,35,35,-74,35,]),'LT':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[36,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,36,36,36,36,36,-47,-48,-49,-50,-51,-52,-53,-54,36,36,36,36,36,-46,36,-61,36,36,-74,36,]),'LTE':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[37,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,37,37,37,37,37,-47,-48,-49,-50,-51,-52,-53,-54,37,37,37,37,37,-46,37,-61,37,37,-74,37,]),'TILDE':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[38,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,38,38,38,38,38,-47,-48,-49,-50,-51,-52,-53,-54,38,38,38,38,38,-46,38,-61,38,38,-74,38,]),'IN':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[39,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,39,39,39,39,39,-47,-48,-49,-50,-51,-52,-53,-54,39,39,39,39,39,-46,39,-61,39,39,-74,39,]),'SLASH':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[41,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,41,41,41,41,41,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,41,41,41,-46,41,-61,41,41,-74,41,]),'PLUS':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[42,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,42,42,42,42,42,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,42,-46,42,-61,42,42,-74,42,]),'MINUS':([10,11,14,15,16,17,18,19,20,21,22,23,45,46,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,74,78,83,94,101,102,130,],[43,-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,43,43,43,43,43,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,43,-46,43,-61,43,43,-74,43,]),'OPEN':([11,14,15,16,17,18,19,20,21,22,23,26,45,51,52,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,83,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-45,82,-62,-63,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,]),'CLOSE':([11,14,15,16,17,18,19,20,21,22,23,26,45,51,52,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,80,81,83,107,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-45,-80,-62,-63,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,92,-15,-61,-16,]),'CLEAR':([11,14,15,16,17,18,19,20,21,22,23,26,45,51,52,53,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,80,81,83,90,91,92,107,117,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-80,-45,-80,-62,-63,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-80,-15,-61,105,-17,-18,-16,-19,]),'HAVING':([11,14,15,16,17,18,19,20,21,22,23,45,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,83,99,100,101,102,129,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,116,-24,-26,-27,-25,]),'ASC':([11,14,15,16,17,18,19,20,21,22,23,45,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,83,100,101,102,112,129,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-24,-26,-27,127,-25,]),'DESC':([11,14,15,16,17,18,19,20,21,22,23,45,56,57,58,59,60,61,62,63,64,65,66,67,68,69,74,83,100,101,102,112,129,],[-69,-55,-56,-72,-73,-74,-75,-76,-77,-78,-79,-45,-43,-44,-47,-48,-49,-50,-51,-52,-53,-54,-57,-58,-59,-60,-46,-61,-24,-26,-27,128,-25,]),'BY':([77,87,97,],[88,98,111,]),'ON':([82,92,],[93,106,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'select_statement':([0,50,],[1,79,]),'distinct':([2,],[3,]),'empty':([2,6,24,26,44,47,51,75,80,85,90,95,99,108,112,],[4,27,48,52,71,76,81,86,91,96,104,109,115,119,126,]),'target_spec':([3,],[6,]),'target_list':([3,],[8,]),'target':([3,28,],[9,54,]),'expression':([3,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[10,45,46,53,10,56,57,58,59,60,61,62,63,64,65,66,67,68,69,72,78,46,94,101,101,101,130,]),'column':([3,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,111,114,116,131,],[14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,14,123,14,14,132,]),'constant':([3,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,15,]),'boolean':([3,12,13,26,28,30,31,32,33,34,35,36,37,38,39,40,41,42,43,44,49,50,84,88,98,114,116,],[17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,17,]),'from_subselect':([6,],[24,]),'from':([6,],[25,]),'where':([24,],[47,]),'opt_expression':([26,],[51,]),'expression_list_opt':([44,],[70,]),'expression_list':([44,],[73,]),'group_by':([47,],[75,]),'opt_open':([51,],[80,]),'order_by':([75,],[85,]),'opt_close':([80,],[90,]),'pivot_by':([85,],[95,]),'expr_index_list':([88,98,],[99,112,]),'expr_index':([88,98,114,],[100,100,129,]),'opt_clear':([90,],[103,]),'limit':([95,],[108,]),'having':([99,],[113,]),'flatten':([108,],[118,]),'column_list':([111,],[122,]),'ordering':([112,],[125,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> select_statement","S'",1,None,None,None),
+  ('account -> STRING','account',1,'p_account','query_parser.py',341),
+  ('select_statement -> SELECT distinct target_spec from_subselect where group_by order_by pivot_by limit flatten','select_statement',10,'p_select_statement','query_parser.py',347),
+  ('distinct -> empty','distinct',1,'p_distinct','query_parser.py',354),
+  ('distinct -> DISTINCT','distinct',1,'p_distinct','query_parser.py',355),
+  ('target_spec -> ASTERISK','target_spec',1,'p_target_spec','query_parser.py',361),
+  ('target_spec -> target_list','target_spec',1,'p_target_spec','query_parser.py',362),
+  ('target_list -> target','target_list',1,'p_target_list','query_parser.py',368),
+  ('target_list -> target_list COMMA target','target_list',3,'p_target_list','query_parser.py',369),
+  ('target -> expression AS ID','target',3,'p_target','query_parser.py',375),
+  ('target -> expression','target',1,'p_target','query_parser.py',376),
+  ('from -> empty','from',1,'p_from','query_parser.py',382),
+  ('from -> FROM opt_expression opt_open opt_close opt_clear','from',5,'p_from','query_parser.py',383),
+  ('from_subselect -> from','from_subselect',1,'p_from_subselect','query_parser.py',394),
+  ('from_subselect -> FROM LPAREN select_statement RPAREN','from_subselect',4,'p_from_subselect','query_parser.py',395),
+  ('opt_open -> empty','opt_open',1,'p_opt_open','query_parser.py',404),
+  ('opt_open -> OPEN ON DATE','opt_open',3,'p_opt_open','query_parser.py',405),
+  ('opt_close -> empty','opt_close',1,'p_opt_close','query_parser.py',411),
+  ('opt_close -> CLOSE','opt_close',1,'p_opt_close','query_parser.py',412),
+  ('opt_close -> CLOSE ON DATE','opt_close',3,'p_opt_close','query_parser.py',413),
+  ('opt_clear -> empty','opt_clear',1,'p_opt_clear','query_parser.py',421),
+  ('opt_clear -> CLEAR','opt_clear',1,'p_opt_clear','query_parser.py',422),
+  ('where -> empty','where',1,'p_where','query_parser.py',428),
+  ('where -> WHERE expression','where',2,'p_where','query_parser.py',429),
+  ('expr_index_list -> expr_index','expr_index_list',1,'p_expr_index_list','query_parser.py',437),
+  ('expr_index_list -> expr_index_list COMMA expr_index','expr_index_list',3,'p_expr_index_list','query_parser.py',438),
+  ('expr_index -> expression','expr_index',1,'p_expr_index','query_parser.py',444),
+  ('expr_index -> INTEGER','expr_index',1,'p_expr_index','query_parser.py',445),
+  ('group_by -> empty','group_by',1,'p_group_by','query_parser.py',451),
+  ('group_by -> GROUP BY expr_index_list having','group_by',4,'p_group_by','query_parser.py',452),
+  ('having -> empty','having',1,'p_having','query_parser.py',458),
+  ('having -> HAVING expression','having',2,'p_having','query_parser.py',459),
+  ('order_by -> empty','order_by',1,'p_order_by','query_parser.py',465),
+  ('order_by -> ORDER BY expr_index_list ordering','order_by',4,'p_order_by','query_parser.py',466),
+  ('ordering -> empty','ordering',1,'p_ordering','query_parser.py',472),
+  ('ordering -> ASC','ordering',1,'p_ordering','query_parser.py',473),
+  ('ordering -> DESC','ordering',1,'p_ordering','query_parser.py',474),
+  ('pivot_by -> empty','pivot_by',1,'p_pivot_by','query_parser.py',480),
+  ('pivot_by -> PIVOT BY column_list','pivot_by',3,'p_pivot_by','query_parser.py',481),
+  ('limit -> empty','limit',1,'p_limit','query_parser.py',487),
+  ('limit -> LIMIT INTEGER','limit',2,'p_limit','query_parser.py',488),
+  ('flatten -> empty','flatten',1,'p_flatten','query_parser.py',494),
+  ('flatten -> FLATTEN','flatten',1,'p_flatten','query_parser.py',495),
+  ('expression -> expression AND expression','expression',3,'p_expression_and','query_parser.py',510),
+  ('expression -> expression OR expression','expression',3,'p_expression_or','query_parser.py',514),
+  ('expression -> NOT expression','expression',2,'p_expression_not','query_parser.py',518),
+  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_paren','query_parser.py',522),
+  ('expression -> expression EQ expression','expression',3,'p_expression_eq','query_parser.py',526),
+  ('expression -> expression NE expression','expression',3,'p_expression_ne','query_parser.py',530),
+  ('expression -> expression GT expression','expression',3,'p_expression_gt','query_parser.py',534),
+  ('expression -> expression GTE expression','expression',3,'p_expression_gte','query_parser.py',538),
+  ('expression -> expression LT expression','expression',3,'p_expression_lt','query_parser.py',542),
+  ('expression -> expression LTE expression','expression',3,'p_expression_lte','query_parser.py',546),
+  ('expression -> expression TILDE expression','expression',3,'p_expression_match','query_parser.py',550),
+  ('expression -> expression IN expression','expression',3,'p_expression_contains','query_parser.py',554),
+  ('expression -> column','expression',1,'p_expression_column','query_parser.py',558),
+  ('expression -> constant','expression',1,'p_expression_constant','query_parser.py',562),
+  ('expression -> expression ASTERISK expression','expression',3,'p_expression_mul','query_parser.py',566),
+  ('expression -> expression SLASH expression','expression',3,'p_expression_div','query_parser.py',570),
+  ('expression -> expression PLUS expression','expression',3,'p_expression_add','query_parser.py',574),
+  ('expression -> expression MINUS expression','expression',3,'p_expression_sub','query_parser.py',578),
+  ('expression -> ID LPAREN expression_list_opt RPAREN','expression',4,'p_expression_function','query_parser.py',582),
+  ('opt_expression -> empty','opt_expression',1,'p_opt_expression','query_parser.py',587),
+  ('opt_expression -> expression','opt_expression',1,'p_opt_expression','query_parser.py',588),
+  ('expression_list_opt -> empty','expression_list_opt',1,'p_expression_list_opt','query_parser.py',594),
+  ('expression_list_opt -> expression','expression_list_opt',1,'p_expression_list_opt','query_parser.py',595),
+  ('expression_list_opt -> expression_list COMMA expression','expression_list_opt',3,'p_expression_list_opt','query_parser.py',596),
+  ('expression_list -> expression','expression_list',1,'p_expression_list','query_parser.py',602),
+  ('expression_list -> expression_list COMMA expression','expression_list',3,'p_expression_list','query_parser.py',603),
+  ('column -> ID','column',1,'p_column','query_parser.py',609),
+  ('column_list -> column','column_list',1,'p_column_list','query_parser.py',615),
+  ('column_list -> column_list COMMA column','column_list',3,'p_column_list','query_parser.py',616),
+  ('constant -> NULL','constant',1,'p_constant','query_parser.py',622),
+  ('constant -> boolean','constant',1,'p_constant','query_parser.py',623),
+  ('constant -> INTEGER','constant',1,'p_constant','query_parser.py',624),
+  ('constant -> DECIMAL','constant',1,'p_constant','query_parser.py',625),
+  ('constant -> STRING','constant',1,'p_constant','query_parser.py',626),
+  ('constant -> DATE','constant',1,'p_constant','query_parser.py',627),
+  ('boolean -> TRUE','boolean',1,'p_boolean','query_parser.py',633),
+  ('boolean -> FALSE','boolean',1,'p_boolean','query_parser.py',634),
+  ('empty -> <empty>','empty',0,'p_empty','query_parser.py',640),
+]
@@ -24,6 +24,7 @@ import click
 from beancount.query import query_parser
 from beancount.query import query_compile
 from beancount.query import query_env
+from beancount.query import query_columnar
 from beancount.query import query_execute
 from beancount.query import query_render
 from beancount.query import numberify
@@ -126,6 +127,7 @@ class DispatchingShell(cmd.Cmd):
             'spaced': convert_bool,
             'expand': convert_bool,
             'numberify': convert_bool,
+            'columnar': convert_bool,
             }
         self.vars = {
             'pager': os.environ.get('PAGER', None),
@@ -134,6 +136,7 @@ class DispatchingShell(cmd.Cmd):
             'spaced': False,
             'expand': False,
             'numberify': do_numberify,
+            'columnar': False,
             }
 
     def add_help(self):
@@ -303,6 +306,13 @@ class BQLShell(DispatchingShell):
         self.errors = None
         self.options_map = None
 
+        # The global properties of the row context of the loaded entries.
+        self.context_cache = query_execute.RowContextCache()
+
+        # The columns of the postings of the loaded entries, for the columnar
+        # execution of the queries.
+        self.table_cache = query_columnar.TableCache()
+
         self.env_targets = query_env.TargetsEnvironment()
         self.env_entries = query_env.FilterEntriesEnvironment()
         self.env_postings = query_env.FilterPostingsEnvironment()
@@ -312,6 +322,8 @@ class BQLShell(DispatchingShell):
         Reload the input file without restarting the shell.
         """
         self.entries, self.errors, self.options_map = self.loadfun()
+        self.context_cache.clear()
+        self.table_cache.clear()
         if self.is_interactive:
             print_statistics(self.entries, self.options_map, self.outfile)
 
@@ -353,10 +365,12 @@ class BQLShell(DispatchingShell):
 
         if self.outfile is sys.stdout:
             query_execute.execute_print(c_print, self.entries, self.options_map,
-                                        file=self.outfile)
+                                        file=self.outfile,
+                                        context_cache=self.context_cache)
         else:
             with self.get_pager() as file:
-                query_execute.execute_print(c_print, self.entries, self.options_map, file)
+                query_execute.execute_print(c_print, self.entries, self.options_map, file,
+                                            self.context_cache)
 
     def on_Select(self, statement):
         """
@@ -413,9 +427,17 @@ class BQLShell(DispatchingShell):
             return
 
         # Execute it to obtain the result rows.
-        rtypes, rrows = query_execute.execute_query(c_query,
-                                                    self.entries,
-                                                    self.options_map)
+        if self.vars['columnar']:
+            rtypes, rrows = query_columnar.execute_query(c_query,
+                                                         self.entries,
+                                                         self.options_map,
+                                                         self.context_cache,
+                                                         self.table_cache)
+        else:
+            rtypes, rrows = query_execute.execute_query(c_query,
+                                                        self.entries,
+                                                        self.options_map,
+                                                        self.context_cache)
 
         # Output the resulting rows.
         if not rrows:
@@ -783,8 +805,16 @@ _SUPPORTED_FORMATS = ('text', 'csv')
               help="Output filename.")
 @click.option('--no-errors', '-q', is_flag=True,
               help="Do not report errors.")
+@click.option('--parse-jobs', '-j', type=click.IntRange(min=1),
+              help=("Parse included files, or chunks of a single large file, in "
+                    "parallel using this many processes."))
+@click.option('--incremental', is_flag=True,
+              help=("In an interactive session, keep the state of the loader in "
+                    "memory to reload the file incrementally. The initial load "
+                    "does not use the load cache."))
 @click.version_option(message=VERSION)
-def main(filename, query, numberify, format, output, no_errors):
+def main(filename, query, numberify, format, output, no_errors, parse_jobs,
+         incremental):
     """An interactive interpreter for the Beancount Query Language.
 
     Load Beancount ledger FILENAME and run Beancount Query Language
@@ -793,16 +823,26 @@ def main(filename, query, numberify, format, output, no_errors):
     inferred from the output file name, if specified.
 
     """
-    # Parse the input file.
+    # Parse the input file. In an interactive session, keep the loader's state
+    # around in order to reload incrementally, if requested.
+    is_interactive = sys.stdin.isatty() and not query
+    errors_file = None if no_errors else sys.stderr
+    incremental_loader = None
+    if is_interactive and incremental:
+        incremental_loader = loader.IncrementalLoader(filename,
+                                                      log_timings=logging.info,
+                                                      log_errors=errors_file,
+                                                      parse_jobs=parse_jobs)
     def load():
-        errors_file = None if no_errors else sys.stderr
         with misc_utils.log_time('beancount.loader (total)', logging.info):
+            if incremental_loader is not None:
+                return incremental_loader.load()
             return loader.load_file(filename,
                                     log_timings=logging.info,
-                                    log_errors=errors_file)
+                                    log_errors=errors_file,
+                                    parse_jobs=parse_jobs)
 
     # Create the shell.
-    is_interactive = sys.stdin.isatty() and not query
     shell_obj = BQLShell(is_interactive, load, output, format, numberify)
     shell_obj.on_Reload()
 
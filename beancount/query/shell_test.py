@@ -156,6 +156,23 @@ class TestUseCases(unittest.TestCase):
         ## FIXME: Here we need to finally support FLATTEN to make this happen properly.
 
 
+    def test_columnar(self):
+        query = """
+          SELECT account, sum(position) WHERE year = 2014
+          GROUP BY account ORDER BY account
+        """
+        outputs = []
+        for command in ['set columnar false', 'set columnar true']:
+            with test_utils.capture('stdout') as stdout:
+                shell_obj = shell.BQLShell(False, lambda: (entries, errors, options_map),
+                                           sys.stdout)
+                shell_obj.on_Reload()
+                shell_obj.onecmd(command)
+                shell_obj.onecmd(query)
+            outputs.append(stdout.getvalue().split('\n', 1)[1])
+        self.assertRegex(outputs[0], 'Expenses:Food:Groceries')
+        self.assertEqual(outputs[0], outputs[1])
+
 class TestRun(unittest.TestCase):
 
     @runshell
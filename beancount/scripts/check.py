@@ -9,6 +9,7 @@ import click
 from beancount import loader
 from beancount.ops import validation
 from beancount.utils import misc_utils
+from beancount.utils import profiler
 from beancount.parser.version import VERSION
 
 @click.command()
@@ -16,31 +17,52 @@ from beancount.parser.version import VERSION
 @click.option('--verbose', '-v', is_flag=True, help='Print timings.')
 @click.option('--no-cache', '-C', is_flag=True, help='Disable the cache.')
 @click.option('--cache-filename', type=click.Path(), help='Override the cache filename.')
+@click.option('--checkpoints', is_flag=True,
+              help='Cache the state after each stage of the loader.')
+@click.option('--parse-jobs', '-j', type=click.IntRange(min=1),
+              help=('Parse included files, or chunks of a single large file, in '
+                    'parallel using this many processes.'))
+@click.option('--validation-jobs', type=click.IntRange(min=1),
+              help=('Run the validator plugins and the validations concurrently '
+                    'using this many processes.'))
+@click.option('--profile', type=click.Path(),
+              help=('Write a JSON profile of the time, entries and peak memory '
+                    'of each stage to this file. This disables the cache.'))
 @click.version_option(message=VERSION)
-def main(filename, verbose, no_cache, cache_filename):
+def main(filename, verbose, no_cache, cache_filename, checkpoints, parse_jobs,
+         validation_jobs, profile):
     """Parse, check and realize a beancount ledger.
 
     This also measures the time it takes to run all these steps.
 
     """
-    use_cache = not no_cache
+    # Profiling a load from the cache would be pointless.
+    use_cache = not no_cache and not profile
 
     if verbose:
         logging.basicConfig(level=logging.INFO, format='%(levelname)-8s: %(message)s')
 
     # Override loader caching setup.
-    if use_cache or cache_filename:
-        loader.initialize(use_cache, cache_filename)
+    if use_cache or cache_filename or profile:
+        loader.initialize(use_cache, cache_filename, checkpoints or None)
 
-    with misc_utils.log_time('beancount.loader (total)', logging.info):
+    # Record the stages of the load, tracing memory only if a profile is requested.
+    prof = profiler.Profiler(logging.info, trace_memory=bool(profile))
+    with misc_utils.log_time('beancount.loader (total)', logging.info), prof:
         # Load up the file, print errors, checking and validation are invoked
         # automatically.
         entries, errors, _ = loader.load_file(
             filename,
-            log_timings=logging.info,
+            log_timings=prof,
             log_errors=sys.stderr,
             # Force slow and hardcore validations, just for check.
-            extra_validations=validation.HARDCORE_VALIDATIONS)
+            extra_validations=validation.HARDCORE_VALIDATIONS,
+            parse_jobs=parse_jobs,
+            validation_jobs=validation_jobs)
+
+    if profile:
+        with open(profile, 'w') as file:
+            prof.dump(file)
 
     # Exit with an error code if there were any errors.
     sys.exit(1 if errors else 0)
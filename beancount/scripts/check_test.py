@@ -1,7 +1,11 @@
 __copyright__ = "Copyright (C) 2014, 2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import json
+import textwrap
 import unittest
+from os import path
+
 import click.testing
 
 from beancount.utils import test_utils
@@ -44,6 +48,40 @@ class TestScriptCheck(test_utils.ClickTestCase):
         self.assertRegex(result.output, "Balance failed")
         self.assertRegex(result.output, "Assets:Cash")
 
+    def test_profile(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'input.beancount')
+            with open(filename, 'w') as file:
+                file.write(textwrap.dedent("""
+                  plugin "beancount.plugins.auto_accounts"
+
+                  2014-03-02 * "Something"
+                    Expenses:Restaurant   50.02 USD
+                    Assets:Cash
+                """))
+            profile_filename = path.join(tmp, 'profile.json')
+            result = self.run_with_args(check.main, '--profile', profile_filename,
+                                        filename)
+            self.assertLines("", result.stdout)
+            with open(profile_filename) as file:
+                profile = json.load(file)
+
+        self.assertEqual('total', profile['name'])
+        stages = {stage['name']: stage for stage in profile['children']}
+        self.assertEqual(['parse', 'booking', 'run_transformations',
+                          'beancount.ops.validate'], list(stages))
+        self.assertEqual(1, stages['parse']['entries_out'])
+        self.assertEqual(1, stages['booking']['entries_in'])
+        self.assertEqual(3, stages['run_transformations']['entries_out'])
+        self.assertIn('beancount.plugins.auto_accounts',
+                      [stage['name']
+                       for stage in stages['run_transformations']['children']])
+        self.assertTrue(all(stage['name'].startswith('function: ')
+                            for stage in stages['beancount.ops.validate']['children']))
+        for stage in profile['children']:
+            self.assertIsInstance(stage['time'], float)
+            self.assertIsInstance(stage['peak_memory'], int)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,136 @@
+"""A compact, versioned serialization format for the loader's cache.
+
+A raw pickle of a loaded ledger is large and slow to load, because it holds many
+equal but distinct objects: every directive has its own copy of its filename and
+account strings, and equal numbers, dates and amounts are each pickled and
+reconstructed separately. Before pickling, this format canonicalizes the data so
+that equal immutable values are shared, which the pickle memo then writes only
+once and loads as a single object. The stream is compressed and preceded by a
+header with a version number, so that caches written by another version of the
+format are rejected rather than misinterpreted.
+"""
+__copyright__ = "Copyright (C) 2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import datetime
+import pickle
+import struct
+import zlib
+
+from decimal import Decimal
+
+from beancount.utils import misc_utils
+
+
+# The magic string that starts a cache file in this format.
+MAGIC = b'BEANCACHE'
+
+# The version of the format. Bump this on any change to the layout of the file
+# or to the canonicalization of the data.
+VERSION = 1
+
+# The header, following the magic string: the version and the length of the
+# compressed payload.
+_HEADER = struct.Struct('!HQ')
+
+# The zlib compression level. A low level compresses most of the redundancy
+# left after canonicalization and keeps the writing of the cache fast.
+COMPRESSION_LEVEL = 1
+
+
+class FormatError(ValueError):
+    """An error raised when a stream isn't in the current version of the format."""
+
+
+def dump(obj, file):
+    """Serialize an object to a file.
+
+    Args:
+      obj: The object to serialize, e.g. an (entries, errors, options_map) triple.
+      file: A binary file object to write to.
+    """
+    with misc_utils.disabled_gc():
+        data = pickle.dumps(canonicalize(obj), protocol=pickle.HIGHEST_PROTOCOL)
+    compressed = zlib.compress(data, COMPRESSION_LEVEL)
+    file.write(MAGIC)
+    file.write(_HEADER.pack(VERSION, len(compressed)))
+    file.write(compressed)
+
+
+def load(file):
+    """Deserialize an object from a file.
+
+    Args:
+      file: A binary file object to read from, positioned at the start of a
+        stream written by dump().
+    Returns:
+      The deserialized object.
+    Raises:
+      FormatError: If the stream isn't in the current version of the format.
+    """
+    if file.read(len(MAGIC)) != MAGIC:
+        raise FormatError("Invalid cache format")
+    header = file.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise FormatError("Truncated cache header")
+    version, length = _HEADER.unpack(header)
+    if version != VERSION:
+        raise FormatError("Unsupported cache version: {}".format(version))
+    compressed = file.read(length)
+    if len(compressed) != length:
+        raise FormatError("Truncated cache")
+    data = zlib.decompress(compressed)
+    with misc_utils.disabled_gc():
+        return pickle.loads(data)
+
+
+def canonicalize(obj):
+    """Make equal immutable values in a tree of objects shared.
+
+    Strings, numbers and dates are replaced by a single instance per value, and
+    lists, dicts and tuples, including named tuples, are rebuilt from their
+    canonical contents. Decimal values are only shared if their representations
+    are identical, e.g. 1.0 and 1.00 are kept distinct. Tuples are shared if
+    their elements are, e.g. equal amounts. Objects of other types are left as
+    they are. An object reachable from multiple places is rebuilt once, so the
+    sharing of the input is preserved.
+
+    Args:
+      obj: An object.
+    Returns:
+      An equal object, with its equal values shared.
+    """
+    values = {}
+    containers = {}
+
+    def canon(obj):
+        otype = type(obj)
+        if otype is str or otype is datetime.date:
+            return values.setdefault((otype, obj), obj)
+        if otype is Decimal:
+            return values.setdefault((otype, str(obj)), obj)
+        if otype in (list, dict) or isinstance(obj, tuple):
+            try:
+                return containers[id(obj)][1]
+            except KeyError:
+                pass
+            if otype is list:
+                new_obj = [canon(elem) for elem in obj]
+            elif otype is dict:
+                new_obj = {canon(key): canon(value) for key, value in obj.items()}
+            elif otype is tuple or hasattr(otype, '_make'):
+                elems = [canon(elem) for elem in obj]
+                # Tuples of the same shared elements are themselves shared.
+                key = (otype, tuple(map(id, elems)))
+                new_obj = values.get(key)
+                if new_obj is None:
+                    new_obj = tuple(elems) if otype is tuple else obj._make(elems)
+                    values[key] = new_obj
+            else:
+                new_obj = obj
+            # Keep a reference to the original object, so its id isn't reused.
+            containers[id(obj)] = (obj, new_obj)
+            return new_obj
+        return obj
+
+    return canon(obj)
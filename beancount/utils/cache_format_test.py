@@ -0,0 +1,78 @@
+__copyright__ = "Copyright (C) 2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import datetime
+import io
+import unittest
+
+from decimal import Decimal
+
+from beancount.core import data
+from beancount.parser import cmptest
+from beancount.utils import cache_format
+from beancount import loader
+
+
+class TestCacheFormat(unittest.TestCase):
+
+    @loader.load_doc()
+    def test_round_trip(self, entries, errors, options_map):
+        """
+          2014-01-01 open Assets:Cash
+          2014-01-01 open Assets:Investments
+
+          2014-02-01 * "Buy"
+            Assets:Investments    10 HOOL {500.00 USD}
+            Assets:Cash
+
+          2014-02-01 * "Buy again"
+            Assets:Investments    10 HOOL {500.00 USD}
+            Assets:Cash
+
+          2014-03-01 price HOOL 510.0 USD
+        """
+        oss = io.BytesIO()
+        cache_format.dump((entries, errors, options_map), oss)
+        new_entries, new_errors, new_options_map = cache_format.load(
+            io.BytesIO(oss.getvalue()))
+        cmptest.assertEqualEntries(entries, new_entries)
+        self.assertEqual(errors, new_errors)
+        self.assertEqual(options_map['operating_currency'],
+                         new_options_map['operating_currency'])
+
+        # Equal postings and their filenames are shared.
+        txn1, txn2 = data.filter_txns(new_entries)
+        self.assertIs(txn1.postings[0].cost, txn2.postings[0].cost)
+        self.assertIs(txn1.meta['filename'], txn2.meta['filename'])
+
+    def test_canonicalize(self):
+        date = datetime.date(2014, 1, 1)
+        obj = [('a' * 10, Decimal('1.0'), date),
+               (''.join(['a'] * 10), Decimal('1.0'), datetime.date(2014, 1, 1)),
+               Decimal('1.00')]
+        shared = {'key': 'value'}
+        obj.append([shared, shared])
+        new_obj = cache_format.canonicalize(obj)
+        self.assertEqual(obj, new_obj)
+        self.assertIs(new_obj[0], new_obj[1])
+        self.assertEqual('1.00', str(new_obj[2]))
+        self.assertIs(new_obj[3][0], new_obj[3][1])
+
+    def test_invalid(self):
+        oss = io.BytesIO()
+        cache_format.dump([1, 2], oss)
+        contents = oss.getvalue()
+        self.assertEqual([1, 2], cache_format.load(io.BytesIO(contents)))
+
+        with self.assertRaises(cache_format.FormatError):
+            cache_format.load(io.BytesIO(b'\x80\x04' + contents))
+        with self.assertRaises(cache_format.FormatError):
+            cache_format.load(io.BytesIO(contents[:-1]))
+        header = cache_format.MAGIC + cache_format._HEADER.pack(
+            cache_format.VERSION + 1, 0)
+        with self.assertRaises(cache_format.FormatError):
+            cache_format.load(io.BytesIO(header))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,8 +8,6 @@ import datetime
 import os
 import time
 
-import dateutil.parser
-
 
 def iter_dates(start_date, end_date):
     """Yield all the dates between 'start_date' and 'end_date'.
@@ -40,6 +38,7 @@ def parse_date_liberally(string, parse_kwargs_dict=None):
       A datetime.date object.
     """
     # At the moment, rely on the most excellent dateutil.
+    import dateutil.parser  # Slow to import; deferred to its first use.
     if parse_kwargs_dict is None:
         parse_kwargs_dict = {}
     return dateutil.parser.parse(string, **parse_kwargs_dict).date()
@@ -4,12 +4,12 @@ __copyright__ = "Copyright (C) 2015-2017  Martin Blais"
 __license__ = "GNU GPLv2"
 
 import re
-import subprocess
 from os import path
 
 
 def is_gpg_installed():
     """Return true if GPG 1.4.x or 2.x are installed, which is what we use and support."""
+    import subprocess  # Slow to import; only needed for encrypted files.
     try:
         pipe = subprocess.Popen(['gpg', '--version'], shell=0,
                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -49,6 +49,7 @@ def read_encrypted_file(filename):
     Raises:
       OSError: If we could not properly decrypt the file.
     """
+    import subprocess  # Slow to import; only needed for encrypted files.
     command = ['gpg', '--batch', '--decrypt', path.realpath(filename)]
     pipe = subprocess.Popen(command,
                             shell=False,
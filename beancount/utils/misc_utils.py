@@ -9,6 +9,7 @@ from time import time
 import collections
 import contextlib
 import functools
+import gc
 import io
 import re
 import sys
@@ -93,6 +94,26 @@ def swallow(*exception_types):
             raise
 
 
+@contextlib.contextmanager
+def disabled_gc():
+    """Disable the garbage collector in a block.
+
+    Creating a large number of objects, e.g. when parsing or unpickling a
+    ledger, triggers many collections, which are useless if the objects do not
+    form reference cycles.
+
+    Yields:
+      None.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 def groupby(keyfun, elements):
     """Group the elements as a dict of lists, where the key is computed using the
     function 'keyfun'.
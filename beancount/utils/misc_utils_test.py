@@ -4,6 +4,7 @@ Tests for general utils.
 __copyright__ = "Copyright (C) 2014-2016  Martin Blais"
 __license__ = "GNU GPLv2"
 
+import gc
 import unittest
 from unittest import mock
 import time
@@ -77,6 +78,15 @@ class TestMiscUtils(unittest.TestCase):
             with misc_utils.swallow(IOError):
                 raise ValueError("Should not trickle out")
 
+    def test_disabled_gc(self):
+        self.assertTrue(gc.isenabled())
+        with misc_utils.disabled_gc():
+            self.assertFalse(gc.isenabled())
+            with misc_utils.disabled_gc():
+                self.assertFalse(gc.isenabled())
+            self.assertFalse(gc.isenabled())
+        self.assertTrue(gc.isenabled())
+
     def test_groupby(self):
         data = [('a', 1), ('b', 2), ('c', 3), ('d', 4)]
         grouped = misc_utils.groupby(lambda x: x[0], data)
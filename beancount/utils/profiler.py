@@ -0,0 +1,244 @@
+"""A structured profiler for the stages of loading a ledger.
+
+A Profiler instance can be passed anywhere a 'log_timings' function is accepted,
+e.g. to loader.load_file(). It forwards the text timing lines to an optional
+function and records a tree of the stages, with their running time, their number
+of input and output entries, and optionally, their peak memory usage, which can
+be dumped as JSON.
+"""
+__copyright__ = "Copyright (C) 2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import contextlib
+import time
+import tracemalloc
+
+from beancount.utils import misc_utils
+
+
+class Stage:
+    """The profiling record of a stage.
+
+    Attributes:
+      name: A string, the name of the stage.
+      time: A float, the running time of the stage, in seconds.
+      entries_in: An integer, the number of entries input to the stage, or None.
+      entries_out: An integer, the number of entries output by the stage, or None.
+      peak_memory: An integer, the peak size of the memory blocks traced during
+        the stage, in bytes, or None, if memory isn't traced.
+      memory_delta: An integer, the difference of the size of the traced memory
+        blocks between the end and the start of the stage, in bytes, or None.
+      children: A list of Stage instances, the nested stages.
+    """
+
+    def __init__(self, name, entries_in=None):
+        self.name = name
+        self.time = None
+        self.entries_in = entries_in
+        self.entries_out = None
+        self.peak_memory = None
+        self.memory_delta = None
+        self.children = []
+
+        # The maximum of the peak memory over the children stages and the
+        # portions of this stage between them.
+        self._running_peak = 0
+
+    def set_output(self, entries):
+        """Record the output entries of the stage.
+
+        Args:
+          entries: A list of directives.
+        """
+        self.entries_out = len(entries)
+
+    def to_dict(self):
+        """Convert the stage and its children to a JSON-compatible dict.
+
+        Returns:
+          A dict of the attributes of the stage.
+        """
+        return {'name': self.name,
+                'time': self.time,
+                'entries_in': self.entries_in,
+                'entries_out': self.entries_out,
+                'peak_memory': self.peak_memory,
+                'memory_delta': self.memory_delta,
+                'children': [child.to_dict() for child in self.children]}
+
+
+class Profiler:
+    """A callable which records the stages it gets timed through stage().
+
+    Attributes:
+      root: The root Stage, which holds all the top-level stages.
+    """
+
+    def __init__(self, log_timings=None, trace_memory=False):
+        """Create a profiler.
+
+        Args:
+          log_timings: A function to forward the text timing lines to, or None.
+          trace_memory: A boolean, true if the peak memory usage of the stages
+            should be traced. This slows down execution significantly.
+        """
+        self.log_timings = log_timings
+        self.trace_memory = trace_memory
+        self.root = Stage('total')
+        self.stack = [self.root]
+
+    def __call__(self, message):
+        """Forward a text timing line.
+
+        Args:
+          message: A string, the line to log.
+        """
+        if self.log_timings is not None:
+            self.log_timings(message)
+
+    def __enter__(self):
+        """Start profiling, with the root stage.
+
+        Returns:
+          The profiler itself.
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        self._start(self.root)
+        return self
+
+    def __exit__(self, *unused_exc_info):
+        """Stop profiling and close the root stage."""
+        self._stop(self.root)
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def stage(self, name, entries=None):
+        """A context manager which records the block as a new nested stage.
+
+        Args:
+          name: A string, the name of the stage.
+          entries: The list of directives input to the stage, if relevant.
+        Yields:
+          The new Stage instance, to set its output upon.
+        """
+        stage = Stage(name, None if entries is None else len(entries))
+        self.stack[-1].children.append(stage)
+        self.stack.append(stage)
+        self._start(stage)
+        try:
+            yield stage
+        finally:
+            self._stop(stage)
+            self.stack.pop()
+
+    def add_stage(self, name, elapsed, entries=None):
+        """Record a nested stage whose running time was measured separately.
+
+        Args:
+          name: A string, the name of the stage.
+          elapsed: A float, the running time of the stage, in seconds.
+          entries: The list of directives input to the stage, if relevant.
+        Returns:
+          The new Stage instance, to set its output upon.
+        """
+        stage = Stage(name, None if entries is None else len(entries))
+        stage.time = elapsed
+        self.stack[-1].children.append(stage)
+        return stage
+
+    def _start(self, stage):
+        """Start measuring a stage.
+
+        Args:
+          stage: A Stage instance.
+        """
+        if self.trace_memory and tracemalloc.is_tracing():
+            # Account for the peak so far into the enclosing stage, then restart
+            # the measurement of the peak.
+            current, peak = tracemalloc.get_traced_memory()
+            if len(self.stack) > 1:
+                parent = self.stack[-2]
+                parent._running_peak = max(parent._running_peak, peak)
+            if hasattr(tracemalloc, 'reset_peak'):  # Python >= 3.9
+                tracemalloc.reset_peak()
+            stage.memory_delta = -current
+        stage.time = -time.perf_counter()
+
+    def _stop(self, stage):
+        """Stop measuring a stage.
+
+        Args:
+          stage: A Stage instance.
+        """
+        stage.time += time.perf_counter()
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            stage.peak_memory = max(stage._running_peak, peak)
+            stage.memory_delta += current
+            if len(self.stack) > 1:
+                parent = self.stack[-2]
+                parent._running_peak = max(parent._running_peak, stage.peak_memory)
+
+    def to_dict(self):
+        """Convert the profile to a JSON-compatible dict.
+
+        Returns:
+          A dict, as per Stage.to_dict().
+        """
+        return self.root.to_dict()
+
+    def dump(self, file):
+        """Write the profile as JSON.
+
+        Args:
+          file: A file object to write to.
+        """
+        import json  # Only needed when writing a profile.
+        json.dump(self.to_dict(), file, indent=2)
+
+
+@contextlib.contextmanager
+def log_stage(operation_name, log_timings, indent=0, entries=None):
+    """A context manager that times a stage, recording it if profiling.
+
+    This behaves like misc_utils.log_time(), and also records the block as a
+    stage if 'log_timings' is a Profiler instance.
+
+    Args:
+      operation_name: A string, a label for the name of the operation.
+      log_timings: A function to write log messages to, a Profiler instance, or
+        None, if no timings should be logged.
+      indent: An integer, the indentation level for the format of the timing line.
+      entries: The list of directives input to the stage, if relevant.
+    Yields:
+      A Stage instance, to set its output upon.
+    """
+    with misc_utils.log_time(operation_name, log_timings, indent):
+        if isinstance(log_timings, Profiler):
+            with log_timings.stage(operation_name, entries) as stage:
+                yield stage
+        else:
+            yield Stage(operation_name)
+
+
+def log_elapsed(operation_name, elapsed, log_timings, indent=0, entries=None):
+    """Log the running time of a stage measured separately, recording it if profiling.
+
+    This is useful for stages whose work is interleaved with that of others, and
+    whose time is thus accumulated over many calls.
+
+    Args:
+      operation_name: A string, a label for the name of the operation.
+      elapsed: A float, the running time of the stage, in seconds.
+      log_timings: A function to write log messages to, a Profiler instance, or
+        None, if no timings should be logged.
+      indent: An integer, the indentation level for the format of the timing line.
+      entries: The list of directives input to the stage, if relevant.
+    """
+    if log_timings:
+        log_timings("Operation: {:48} Time: {}{:6.0f} ms".format(
+            "'{}'".format(operation_name), '      '*indent, elapsed * 1000))
+    if isinstance(log_timings, Profiler):
+        log_timings.add_stage(operation_name, elapsed, entries)
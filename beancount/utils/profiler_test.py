@@ -0,0 +1,84 @@
+__copyright__ = "Copyright (C) 2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import io
+import json
+import unittest
+
+from beancount.utils import profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_stages(self):
+        lines = []
+        with profiler.Profiler(lines.append) as prof:
+            with profiler.log_stage('outer', prof, entries=[1, 2, 3]) as stage:
+                with profiler.log_stage('inner1', prof, indent=1):
+                    pass
+                with profiler.log_stage('inner2', prof, indent=1) as inner:
+                    inner.set_output([1])
+                stage.set_output([1, 2])
+
+        self.assertEqual(3, len(lines))
+        self.assertRegex(lines[0], "'inner1'")
+        self.assertRegex(lines[2], "'outer'")
+
+        profile = prof.to_dict()
+        self.assertEqual('total', profile['name'])
+        self.assertIsInstance(profile['time'], float)
+        outer, = profile['children']
+        self.assertEqual('outer', outer['name'])
+        self.assertEqual((3, 2), (outer['entries_in'], outer['entries_out']))
+        self.assertIsNone(outer['peak_memory'])
+        self.assertEqual(['inner1', 'inner2'],
+                         [child['name'] for child in outer['children']])
+        self.assertEqual((None, 1), (outer['children'][1]['entries_in'],
+                                     outer['children'][1]['entries_out']))
+
+        oss = io.StringIO()
+        prof.dump(oss)
+        self.assertEqual(profile, json.loads(oss.getvalue()))
+
+    def test_trace_memory(self):
+        with profiler.Profiler(trace_memory=True) as prof:
+            with prof.stage('small'):
+                data = [0] * 1000
+            with prof.stage('large'):
+                with prof.stage('nested'):
+                    data = [0] * 100000
+                del data
+        small, large = prof.root.children
+        nested, = large.children
+        self.assertGreater(nested.peak_memory, 800000)
+        self.assertLess(small.peak_memory, nested.peak_memory)
+        self.assertGreaterEqual(large.peak_memory, nested.peak_memory)
+        self.assertGreaterEqual(prof.root.peak_memory, large.peak_memory)
+        self.assertLess(large.memory_delta, nested.memory_delta)
+
+    def test_log_elapsed(self):
+        lines = []
+        with profiler.Profiler(lines.append) as prof:
+            with profiler.log_stage('outer', prof):
+                profiler.log_elapsed('inner', 0.25, prof, indent=1, entries=[1, 2])
+        self.assertEqual(2, len(lines))
+        self.assertRegex(lines[0], "'inner'.*250 ms")
+        inner, = prof.root.children[0].children
+        self.assertEqual(('inner', 0.25, 2), (inner.name, inner.time, inner.entries_in))
+
+        profiler.log_elapsed('inner', 0.25, None)
+        profiler.log_elapsed('inner', 0.25, lines.append)
+        self.assertEqual(3, len(lines))
+
+    def test_log_stage_without_profiler(self):
+        lines = []
+        with profiler.log_stage('op', lines.append, entries=[1]) as stage:
+            stage.set_output([])
+        self.assertEqual(1, len(lines))
+        with profiler.log_stage('op', None) as stage:
+            pass
+        self.assertIsInstance(stage, profiler.Stage)
+
+
+if __name__ == '__main__':
+    unittest.main()
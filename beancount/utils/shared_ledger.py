@@ -0,0 +1,262 @@
+"""A read-only ledger shared across processes through a memory-mapped file.
+
+One process publishes a loaded ledger to a file, and any number of processes
+attach to it. Attaching maps the file in memory and only decodes the options and
+errors; the directives are decoded individually when accessed, from the pages of
+the file, which the operating system shares between all the processes which map
+it. The memory used by a ledger thus remains that of a single copy of its
+encoding, regardless of the number of processes reading it, e.g. the workers of
+a web server.
+
+The file holds a table of the strings repeated across directives, e.g. account
+names, currencies and filenames, which is decoded once when attaching, followed
+by a pickle of each directive referring to the strings of the table, and an
+index of the offsets of the directives. Publishing replaces the file atomically,
+so processes attached to a previous version of the file can keep reading it.
+"""
+__copyright__ = "Copyright (C) 2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import collections
+import collections.abc
+import contextlib
+import io
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from os import path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# The magic string that starts a shared ledger file.
+MAGIC = b'BEANSHARED'
+
+# The version of the format. Bump this on any change to its layout.
+VERSION = 1
+
+# The header, following the magic string: the version, the number of entries,
+# and the offsets of the options and errors, and of the index of the entries.
+_HEADER = struct.Struct('<HQQQ')
+
+# The format of an offset in the index.
+_OFFSET = struct.Struct('<Q')
+
+
+class FormatError(ValueError):
+    """An error raised when a file isn't in the current version of the format."""
+
+
+class _TablePickler(pickle.Pickler):
+    """A pickler which refers to the strings of a table by index."""
+
+    def __init__(self, file, table):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.table = table
+
+    def persistent_id(self, obj):
+        if type(obj) is str:
+            return self.table.get(obj)
+        return None
+
+
+class _CountingPickler(pickle.Pickler):
+    """A pickler which counts the strings it goes through, and writes nothing."""
+
+    def __init__(self, counts):
+        super().__init__(_NullFile(), protocol=pickle.HIGHEST_PROTOCOL)
+        self.counts = counts
+
+    def persistent_id(self, obj):
+        if type(obj) is str:
+            self.counts[obj] += 1
+        return None
+
+
+class _NullFile:
+    """A file object which discards what is written to it."""
+
+    def write(self, data):
+        return len(data)
+
+
+class _TableUnpickler(pickle.Unpickler):
+    """An unpickler which resolves the strings referred to by index."""
+
+    def __init__(self, file, table):
+        super().__init__(file)
+        self.table = table
+
+    def persistent_load(self, pid):
+        return self.table[pid]
+
+
+def publish(filename, entries, errors, options_map):
+    """Write a ledger to a file to be shared, replacing it atomically.
+
+    Args:
+      filename: A string, the name of the file to write.
+      entries: A list of directives.
+      errors: A list of errors.
+      options_map: An options dict.
+    """
+    # Collect the strings which occur more than once.
+    counts = collections.Counter()
+    counter = _CountingPickler(counts)
+    for entry in entries:
+        counter.dump(entry)
+        counter.clear_memo()
+    strings = [string for string, count in counts.items() if count > 1]
+    table = {string: index for index, string in enumerate(strings)}
+
+    dirname = path.dirname(path.abspath(filename))
+    with tempfile.NamedTemporaryFile('wb', dir=dirname, delete=False) as file:
+        try:
+            file.write(MAGIC)
+            file.write(_HEADER.pack(VERSION, 0, 0, 0))
+            pickle.dump(strings, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            meta_offset = file.tell()
+            pickler = _TablePickler(file, table)
+            pickler.dump((errors, options_map))
+
+            offsets = []
+            for entry in entries:
+                offsets.append(file.tell())
+                pickler.clear_memo()
+                pickler.dump(entry)
+            offsets.append(file.tell())
+
+            index_offset = file.tell()
+            for offset in offsets:
+                file.write(_OFFSET.pack(offset))
+            file.seek(len(MAGIC))
+            file.write(_HEADER.pack(VERSION, len(entries), meta_offset, index_offset))
+        except BaseException:
+            os.remove(file.name)
+            raise
+    os.replace(file.name, filename)
+
+
+def attach(filename):
+    """Attach to a shared ledger file.
+
+    Args:
+      filename: A string, the name of a file written by publish().
+    Returns:
+      A triple of a SharedEntries instance, the list of errors and the options
+      dict of the ledger.
+    Raises:
+      OSError: If the file cannot be read.
+      FormatError: If the file isn't in the current version of the format.
+    """
+    with open(filename, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise FormatError("Invalid shared ledger format")
+        header = file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise FormatError("Truncated shared ledger header")
+        version, num_entries, meta_offset, index_offset = _HEADER.unpack(header)
+        if version != VERSION:
+            raise FormatError("Unsupported shared ledger version: {}".format(version))
+        if num_entries == 0 and index_offset == 0:
+            raise FormatError("Incomplete shared ledger")
+        if os.fstat(file.fileno()).st_size < (index_offset +
+                                              (num_entries + 1) * _OFFSET.size):
+            raise FormatError("Truncated shared ledger")
+        try:
+            table = pickle.load(file)
+            file.seek(meta_offset)
+            errors, options_map = _TableUnpickler(file, table).load()
+        except (EOFError, IndexError, struct.error, pickle.UnpicklingError) as exc:
+            raise FormatError("Corrupted shared ledger: {}".format(exc)) from exc
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    entries = SharedEntries(mapping, num_entries, index_offset, table)
+    return entries, errors, options_map
+
+
+@contextlib.contextmanager
+def lock(filename):
+    """A context manager holding an exclusive lock on a shared ledger file.
+
+    This serializes the processes which publish the file, so that only the first
+    of those starting together loads and publishes the ledger, and the others
+    attach to it once they get the lock. The lock is held on a separate file
+    next to the shared file, which isn't replaced. Locking is not supported on
+    platforms without fcntl, where this does nothing.
+
+    Args:
+      filename: A string, the name of the shared ledger file.
+    Yields:
+      None.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(filename + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SharedEntries(collections.abc.Sequence):
+    """A read-only sequence of the directives of a shared ledger file.
+
+    Each access decodes the directive from the mapped file; no decoded
+    directive is retained, so hold on to those which are used repeatedly.
+    """
+
+    def __init__(self, mapping, num_entries, index_offset, table):
+        """Create a sequence of shared entries.
+
+        Args:
+          mapping: An mmap instance of the shared ledger file.
+          num_entries: An integer, the number of directives.
+          index_offset: An integer, the offset of the index of the directives
+            in the file.
+          table: A list of the strings referred to by the directives.
+        """
+        self._mapping = mapping
+        self._num_entries = num_entries
+        self._index_offset = index_offset
+        self._table = table
+
+    def __len__(self):
+        return self._num_entries
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(i) for i in range(*index.indices(self._num_entries))]
+        if index < 0:
+            index += self._num_entries
+        if not 0 <= index < self._num_entries:
+            raise IndexError("Shared entries index out of range")
+        return self._decode(index)
+
+    def __iter__(self):
+        for index in range(self._num_entries):
+            yield self._decode(index)
+
+    def _decode(self, index):
+        """Decode a directive.
+
+        Args:
+          index: A valid integer index.
+        Returns:
+          A directive.
+        """
+        offset = self._index_offset + index * _OFFSET.size
+        begin, end = struct.unpack_from('<QQ', self._mapping, offset)
+        file = io.BytesIO(self._mapping[begin:end])
+        return _TableUnpickler(file, self._table).load()
+
+    def close(self):
+        """Unmap the shared ledger file. The sequence can't be used anymore."""
+        self._mapping.close()
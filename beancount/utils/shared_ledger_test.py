@@ -0,0 +1,111 @@
+__copyright__ = "Copyright (C) 2017  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import os
+import unittest
+from os import path
+
+from beancount.utils import shared_ledger
+from beancount.utils import test_utils
+from beancount import loader
+
+
+class TestSharedLedger(unittest.TestCase):
+
+    @loader.load_doc(expect_errors=True)
+    def test_publish_attach(self, entries, errors, options_map):
+        """
+          2014-01-01 open Assets:Cash
+          2014-01-01 open Expenses:Food
+
+          2014-02-01 * "Lunch"
+            Expenses:Food    10.00 USD
+            Assets:Cash
+
+          2014-02-02 * "Dinner"
+            Expenses:Food    25.00 USD
+            Assets:Cash
+
+          2014-03-01 balance Assets:Cash  0 USD
+        """
+        self.assertEqual(1, len(errors))
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'ledger.shared')
+            shared_ledger.publish(filename, entries, errors, options_map)
+            self.assertEqual([filename], [path.join(tmp, name)
+                                          for name in os.listdir(tmp)])
+
+            shared_entries, shared_errors, shared_options_map = (
+                shared_ledger.attach(filename))
+            self.assertEqual(len(entries), len(shared_entries))
+            self.assertEqual(entries, list(shared_entries))
+            self.assertEqual(entries[2], shared_entries[2])
+            self.assertEqual(entries[-1], shared_entries[-1])
+            self.assertEqual(entries[1:4], shared_entries[1:4])
+            with self.assertRaises(IndexError):
+                shared_entries[len(entries)]
+            self.assertEqual(errors, shared_errors)
+            self.assertEqual(options_map['input_hash'],
+                             shared_options_map['input_hash'])
+
+            # Publishing again doesn't affect the attached ledger.
+            shared_ledger.publish(filename, entries[:2], [], options_map)
+            self.assertEqual(entries, list(shared_entries))
+            shared_entries.close()
+            shared_entries, _, _ = shared_ledger.attach(filename)
+            self.assertEqual(entries[:2], list(shared_entries))
+            shared_entries.close()
+
+    def test_attach_invalid(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'ledger.shared')
+            with open(filename, 'wb') as file:
+                file.write(b'Not a ledger')
+            with self.assertRaises(shared_ledger.FormatError):
+                shared_ledger.attach(filename)
+
+            with open(filename, 'wb') as file:
+                file.write(shared_ledger.MAGIC)
+                file.write(shared_ledger._HEADER.pack(shared_ledger.VERSION + 1,
+                                                      0, 0, 0))
+            with self.assertRaises(shared_ledger.FormatError):
+                shared_ledger.attach(filename)
+
+    @loader.load_doc()
+    def test_attach_corrupted(self, entries, errors, options_map):
+        """
+        2014-01-01 open Assets:Apples
+        2014-01-02 open Assets:Oranges
+        """
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'ledger.shared')
+            shared_ledger.publish(filename, entries, errors, options_map)
+            with open(filename, 'rb') as file:
+                contents = file.read()
+            header_size = len(shared_ledger.MAGIC) + shared_ledger._HEADER.size
+
+            # A truncated file.
+            for size in header_size + 2, len(contents) - 1:
+                with open(filename, 'wb') as file:
+                    file.write(contents[:size])
+                with self.assertRaises(shared_ledger.FormatError):
+                    shared_ledger.attach(filename)
+
+            # A corrupted table of strings.
+            with open(filename, 'wb') as file:
+                file.write(contents[:header_size] + b'\xff' * 16 +
+                           contents[header_size + 16:])
+            with self.assertRaises(shared_ledger.FormatError):
+                shared_ledger.attach(filename)
+
+    def test_lock(self):
+        with test_utils.tempdir() as tmp:
+            filename = path.join(tmp, 'ledger.shared')
+            with shared_ledger.lock(filename):
+                self.assertTrue(path.exists(filename + '.lock'))
+            with shared_ledger.lock(filename):
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
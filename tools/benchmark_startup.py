@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Measure the time it takes to import the modules of the programs.
+
+This runs the interpreter with '-X importtime' on the modules of the entry
+points, repeatedly, and reports the best total import time of each, along with
+the modules which take the most time to import themselves, excluding their own
+imports.
+"""
+__copyright__ = "Copyright (C) 2020  Martin Blais"
+__license__ = "GNU GPLv2"
+
+import argparse
+import collections
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+# The modules of the main functions of the programs in bin/.
+ENTRY_POINT_MODULES = [
+    'beancount.scripts.check',
+    'beancount.scripts.doctor',
+    'beancount.scripts.example',
+    'beancount.scripts.format',
+    'beancount.scripts.sql',
+    'beancount.query.shell',
+]
+
+
+# A line of the output of -X importtime, e.g.
+#   import time:       905 |       6204 |     beancount.parser.parser
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure_imports(module: str) -> Tuple[int, Dict[str, int]]:
+    """Import a module in a new interpreter and measure the time it takes.
+
+    Args:
+      module: A string, the name of a module.
+    Returns:
+      A pair of the total time in microseconds to import the module and a dict
+      of the time to import each module by itself, by module name.
+    """
+    command = [sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)]
+    pipe = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          check=True)
+    total = 0
+    self_times = {}
+    for line in pipe.stderr.decode('utf8').splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_time, cumulative_time, _, name = match.groups()
+        self_times[name] = int(self_time)
+        if name == module:
+            total = int(cumulative_time)
+    return total, self_times
+
+
+def benchmark_module(module: str, num_runs: int) -> Tuple[int, List[Tuple[str, int]]]:
+    """Measure the best time to import a module over a number of runs.
+
+    Args:
+      module: A string, the name of a module.
+      num_runs: An integer, the number of runs.
+    Returns:
+      A pair of the best total time in microseconds and a list of (module name,
+      best time in microseconds) pairs of the modules imported, slowest first.
+    """
+    best_total = None
+    best_self_times = collections.defaultdict(lambda: sys.maxsize)
+    for _ in range(num_runs):
+        total, self_times = measure_imports(module)
+        if best_total is None or total < best_total:
+            best_total = total
+        for name, self_time in self_times.items():
+            best_self_times[name] = min(best_self_times[name], self_time)
+    return best_total, sorted(best_self_times.items(), key=lambda item: -item[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('modules', nargs='*', default=ENTRY_POINT_MODULES,
+                        help="Modules to import. Default to those of the programs.")
+    parser.add_argument('-n', '--num-runs', type=int, default=10,
+                        help="Number of imports of each module.")
+    parser.add_argument('-t', '--top', type=int, default=10,
+                        help="Number of the slowest imported modules to list.")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        total, self_times = benchmark_module(module, args.num_runs)
+        print("{:<40} {:8.1f} ms".format(module, total / 1000))
+        for name, self_time in self_times[:args.top]:
+            print("  {:<38} {:8.1f} ms".format(name, self_time / 1000))
+        print()
+
+
+if __name__ == '__main__':
+    main()